@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for analyze_listening_day
+
+Compares the old multi-pass analysis (group_songs_by_hour, then separate
+walks for hourly totals, each top-item kind, popularity, peak hour and
+energy/mood) against the single-pass DailyAccumulator, and checks that both
+produce the same result. With pandas installed, the columnar backend
+(spotispy.frame_analysis) is timed as well.
+
+Usage:
+    python benchmarks/bench_daily_analysis.py [--rows 10000 100000 1000000]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to Python path so we can import spotispy modules
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from spotispy.analysis import (
+    analyze_listening_day, calculate_hourly_totals, find_top_items, calculate_total_listening_time,
+    find_most_popular_song, find_peak_listening_hour, calculate_daily_energy, calculate_daily_mood,
+    format_listening_duration
+)
+from spotispy.database import add_time_fields, group_songs_by_hour
+
+
+def make_songs(count, seed=7):
+    """Generate one day of plays over a realistic-sized library"""
+    rng = random.Random(seed)
+    start = datetime(2025, 3, 15, 5, tzinfo=timezone.utc)
+    artists = [f"Artist {i}" for i in range(max(10, count // 200))]
+    songs = []
+    for _ in range(count):
+        artist = rng.choice(artists)
+        songs.append({
+            'song': f"Song {rng.randrange(20)} of {artist}",
+            'artist': artist,
+            'album': f"Album {rng.randrange(3)} of {artist}",
+            'duration': rng.randrange(90, 420),
+            'played_at': (start + timedelta(seconds=rng.randrange(86400))).isoformat(),
+            'song_popularity': rng.randrange(100),
+            'energy': rng.random(),
+            'valence': rng.random(),
+        })
+    return add_time_fields(songs)
+
+
+def multi_pass(raw_songs):
+    """The analysis as it ran before the single-pass accumulator"""
+    day_data = group_songs_by_hour(raw_songs)
+    calculate_hourly_totals(day_data)
+    peak_hour, peak_minutes = find_peak_listening_hour(day_data['history'])
+    return {
+        'total_songs': len(raw_songs),
+        'total_time': calculate_total_listening_time(day_data),
+        'total_time_formatted': format_listening_duration(raw_songs),
+        'top_songs': find_top_items(day_data, 'song'),
+        'top_artists': find_top_items(day_data, 'artist'),
+        'top_albums': find_top_items(day_data, 'album'),
+        'most_popular': find_most_popular_song(day_data['history']),
+        'peak_hour': peak_hour,
+        'peak_minutes': peak_minutes,
+        'energy_level': calculate_daily_energy(raw_songs),
+        'mood_level': calculate_daily_mood(raw_songs),
+        'raw_data': raw_songs,
+        'structured_data': day_data
+    }
+
+
+def timed(function, songs):
+    start = time.perf_counter()
+    result = function(songs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multi-pass against single-pass daily analysis')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Row counts to generate (default: 10000 100000 1000000)')
+    args = parser.parse_args()
+
+    for count in args.rows:
+        songs = make_songs(count)
+        old_seconds, old_result = timed(multi_pass, songs)
+        new_seconds, new_result = timed(analyze_listening_day, songs)
+
+        assert old_result == new_result
+        for key in ('top_songs', 'top_artists', 'top_albums'):
+            assert list(old_result[key]) == list(new_result[key])
+
+        print(f"{count} rows")
+        print(f"  multi-pass:  {old_seconds:.3f}s")
+        print(f"  single-pass: {new_seconds:.3f}s ({old_seconds / new_seconds:.1f}x)")
+
+        try:
+            frame_seconds, frame_result = timed(lambda rows: analyze_listening_day(rows, backend='pandas'), songs)
+        except RuntimeError:
+            continue
+        assert frame_result['top_songs'] == new_result['top_songs']
+        print(f"  pandas:      {frame_seconds:.3f}s ({old_seconds / frame_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for Play records
+
+Decodes a generated PostgREST response (one string object per value, as
+json.loads returns) and keeps it as compact dictionaries, as the readers did
+before, and as pooled Play records. Reports memory held per row (tracemalloc)
+and the time to analyze each form.
+
+Usage:
+    python benchmarks/bench_play_records.py [--rows N]
+"""
+
+import sys
+import os
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to Python path so we can import spotispy modules
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from spotispy.analysis import analyze_listening_day, DAILY_ANALYSIS_COLUMNS
+from spotispy.database import add_time_fields
+from spotispy.records import to_plays
+
+
+def make_payload(count, seed=7):
+    """JSON text for a year of plays over a few hundred artists"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(count):
+        artist = f"Artist {rng.randrange(300)}"
+        rows.append({
+            'song': f"Song {rng.randrange(25)} of {artist}",
+            'artist': artist,
+            'album': f"Album {rng.randrange(3)} of {artist}",
+            'duration': rng.randrange(90, 420),
+            'played_at': (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+            'song_popularity': rng.randrange(100),
+            'energy': round(rng.random(), 3),
+            'valence': round(rng.random(), 3),
+        })
+    return json.dumps(rows)
+
+
+def compact_dicts(rows):
+    """The readers' compact mode before Play records"""
+    return [{key: row[key] for key in DAILY_ANALYSIS_COLUMNS if row.get(key) is not None} for row in rows]
+
+
+def held_bytes(payload, convert):
+    """Bytes still allocated after decoding and converting (the decoded rows are dropped)"""
+    gc.collect()
+    tracemalloc.start()
+    rows = convert(json.loads(payload))
+    add_time_fields(rows)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, rows
+
+
+def timed(function, rows):
+    start = time.perf_counter()
+    function(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory of dict rows against Play records')
+    parser.add_argument('--rows', type=int, default=200_000, help='Rows to generate (default: 200000)')
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows)
+    dict_bytes, dict_rows = held_bytes(payload, compact_dicts)
+    play_bytes, play_rows = held_bytes(payload, lambda rows: to_plays(rows, DAILY_ANALYSIS_COLUMNS))
+
+    dict_seconds = timed(lambda rows: analyze_listening_day(rows, lean=True), dict_rows)
+    play_seconds = timed(lambda rows: analyze_listening_day(rows, lean=True), play_rows)
+
+    print(f"{args.rows} rows")
+    print(f"  compact dicts: {dict_bytes / args.rows:.0f} bytes/row, analysis {dict_seconds:.3f}s")
+    print(f"  play records:  {play_bytes / args.rows:.0f} bytes/row ({dict_bytes / play_bytes:.1f}x smaller), "
+          f"analysis {play_seconds:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for played_at handling
+
+Compares the old per-row string parsing (fromisoformat + astimezone for the
+hour, parse_datetime_robust for dedup, ISO strings for sorting) against
+add_time_fields once followed by integer operations.
+
+Usage:
+    python benchmarks/bench_timestamps.py [--rows N]
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to Python path so we can import spotispy modules
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from spotispy.database import CENTRAL_TZ, add_time_fields, parse_datetime_robust
+
+
+def make_rows(count, seed=7):
+    """Generate rows with the timestamp formats Supabase and Spotify return"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    formats = (
+        lambda dt: dt.isoformat(),
+        lambda dt: dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+        lambda dt: dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+    )
+    return [{'played_at': rng.choice(formats)(start + timedelta(seconds=rng.randrange(365 * 86400)))}
+            for _ in range(count)]
+
+
+def string_path(rows):
+    hours = {}
+    for song in rows:
+        local = datetime.fromisoformat(song['played_at'].replace('Z', '+00:00')).astimezone(CENTRAL_TZ)
+        hours[local.hour] = hours.get(local.hour, 0) + 1
+    seen = {parse_datetime_robust(song['played_at']) for song in rows}
+    ordered = sorted(rows, key=lambda song: song['played_at'])
+    return hours, len(seen), ordered
+
+
+def epoch_path(rows):
+    add_time_fields(rows)
+    hours = {}
+    for song in rows:
+        hours[song['local_hour']] = hours.get(song['local_hour'], 0) + 1
+    seen = {song['played_ts'] for song in rows}
+    ordered = sorted(rows, key=lambda song: song['played_ts'])
+    return hours, len(seen), ordered
+
+
+def timed(function, rows):
+    start = time.perf_counter()
+    result = function(rows)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark played_at parsing against epoch integers')
+    parser.add_argument('--rows', type=int, default=100_000, help='Rows to generate (default: 100000)')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    string_seconds, (string_hours, string_unique, _) = timed(string_path, [dict(row) for row in rows])
+    epoch_seconds, (epoch_hours, epoch_unique, _) = timed(epoch_path, [dict(row) for row in rows])
+
+    # Sorting once fields exist is the common case for later passes
+    prepared = add_time_fields([dict(row) for row in rows])
+    repeat_seconds, _ = timed(epoch_path, prepared)
+
+    assert string_hours == epoch_hours and string_unique == epoch_unique
+
+    print(f"{args.rows} rows")
+    print(f"  string parsing per pass:    {string_seconds:.3f}s")
+    print(f"  epoch fields, first pass:   {epoch_seconds:.3f}s ({string_seconds / epoch_seconds:.1f}x)")
+    print(f"  epoch fields, later passes: {repeat_seconds:.3f}s ({string_seconds / repeat_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
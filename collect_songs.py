@@ -20,7 +20,8 @@ sys.path.insert(0, project_root)
 
 from spotispy.helpers import get_logger, validate_environment_vars, get_last_hour_timestamp
 from spotispy.spotify import get_recent_tracks
-from spotispy.database import save_songs, check_for_duplicates
+from spotispy.database import check_for_duplicates, get_client, is_upsert_mode
+from spotispy.spool import spool_songs, drain_spool
 
 
 def collect_recent_songs(hours_back=1):
@@ -43,6 +44,9 @@ def collect_recent_songs(hours_back=1):
             logger.error("Missing environment variables: %s", missing_vars)
             return False
         
+        # Flush plays left over from earlier runs so the duplicate check sees them
+        drain_spool()
+        
         # Calculate timestamp for N hours ago
         from datetime import datetime, timedelta
         hours_ago = datetime.now() - timedelta(hours=hours_back)
@@ -58,9 +62,13 @@ def collect_recent_songs(hours_back=1):
         
         logger.info("Found %s songs from Spotify API", len(recent_songs))
         
-        # Check for duplicates to avoid saving the same song twice
-        logger.info("Checking for duplicates in database...")
-        new_songs = check_for_duplicates(recent_songs)
+        if is_upsert_mode():
+            # The database ignores plays it already has (unique play_key), so no pre-read
+            new_songs = recent_songs
+        else:
+            # Check for duplicates to avoid saving the same song twice
+            logger.info("Checking for duplicates in database...")
+            new_songs = check_for_duplicates(recent_songs)
         
         if not new_songs:
             logger.info("All songs already exist in database")
@@ -68,12 +76,12 @@ def collect_recent_songs(hours_back=1):
         
         logger.info("Found %s new songs to save", len(new_songs))
         
-        # Save new songs to database
+        # Spool to disk first, then drain to the database
         logger.info("Saving songs to database...")
-        success = save_songs(new_songs)
+        success = spool_songs(new_songs)
         
         if success:
-            logger.info("Successfully saved %s songs to database", len(new_songs))
+            logger.info("Successfully spooled %s songs", len(new_songs))
             return True
         else:
             logger.error("Failed to save songs to database")
@@ -101,6 +109,7 @@ def main():
         sys.exit(1)
     
     success = collect_recent_songs(args.hours)
+    get_client().log_stats()
     
     if success:
         logger.info("Song collection completed successfully")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Historical import script for SpotiSpy
+
+Parses the per-day Excel exports in data/ across a process pool and loads
+them into the database, the local store and/or the Parquet archive. A
+checkpoint file in the data directory means re-runs only process new or
+changed workbooks.
+
+Usage:
+    python import_history.py [--data-dir DIR] [--target database|local|archive ...]
+                             [--workers N] [--force] [--dry-run]
+"""
+
+import sys
+import os
+import argparse
+
+# Add the project root to Python path so we can import spotispy modules
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+from spotispy.helpers import get_logger
+from spotispy.database import get_client
+from spotispy.history_import import import_history, TARGETS
+
+
+def main():
+    """Main function - handles command line arguments and execution"""
+    parser = argparse.ArgumentParser(description='Import the historical data/*.xlsx exports')
+    parser.add_argument('--data-dir', help='Directory of .xlsx exports (default: data/)')
+    parser.add_argument('--target', action='append', choices=TARGETS,
+                        help='Where to load songs (repeatable, default: database)')
+    parser.add_argument('--workers', type=int, help='Parser processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Re-import files already in the checkpoint')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and count without loading anything')
+
+    args = parser.parse_args()
+
+    logger = get_logger()
+    logger.info("SpotiSpy history import starting...")
+
+    summary = import_history(data_dir=args.data_dir, targets=tuple(args.target or ['database']),
+                             workers=args.workers, force=args.force, dry_run=args.dry_run)
+    get_client().log_stats()
+
+    if summary['failed']:
+        logger.error("History import completed with errors: %s", ', '.join(summary['failed']))
+        sys.exit(1)
+    logger.info("History import completed successfully")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
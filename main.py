@@ -8,15 +8,18 @@ main cronjob entry point for daily music analysis and Slack messaging.
 
 import sys
 import os
+from datetime import datetime, timedelta
 
 # Add the project root to Python path so we can import spotispy modules
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
 from spotispy.helpers import get_logger, validate_environment_vars, is_sunday
-from spotispy.database import get_yesterdays_songs
-from spotispy.analysis import analyze_listening_day
+from spotispy.database import get_yesterdays_songs, get_songs_in_window, get_client, CENTRAL_TZ
+from spotispy.analysis import analyze_listening_day, get_rollup_day_analysis, DAILY_ANALYSIS_COLUMNS
 from spotispy.messages import send_daily_analysis
+from spotispy.personal_records import update_personal_records
+from spotispy.weekly_analysis import prefetch_week_window
 
 
 def run_daily_analysis():
@@ -36,20 +39,36 @@ def run_daily_analysis():
             logger.error("Missing environment variables: %s", missing_vars)
             return False
         
-        # Get yesterday's songs from database
-        logger.info("Fetching yesterday's listening data...")
-        songs = get_yesterdays_songs()
+        # With the local store on, yesterday's (Central) numbers come from its rollups
+        yesterday_start = datetime.now(CENTRAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        analysis_results = get_rollup_day_analysis(yesterday_start.strftime('%Y-%m-%d'))
         
-        if not songs:
-            logger.warning("No songs found for yesterday")
-            # Could still send a "no music listened" message
-            return True
-        
-        logger.info("Found %s songs to analyze", len(songs))
+        if analysis_results is not None:
+            if not analysis_results['total_songs']:
+                logger.warning("No songs found for yesterday")
+                return True
+            logger.info("Read %s songs from the rollups", analysis_results['total_songs'])
+            # The charts still look at individual plays, served from the local store
+            songs = get_songs_in_window(yesterday_start, yesterday_start + timedelta(days=1),
+                                        columns=DAILY_ANALYSIS_COLUMNS, compact=True)
+        else:
+            # Get yesterday's songs from database
+            logger.info("Fetching yesterday's listening data...")
+            songs = get_yesterdays_songs(columns=DAILY_ANALYSIS_COLUMNS, compact=True)
+            
+            if not songs:
+                logger.warning("No songs found for yesterday")
+                # Could still send a "no music listened" message
+                return True
+            
+            logger.info("Found %s songs to analyze", len(songs))
+            
+            # Analyze the listening data
+            logger.info("Running analysis...")
+            analysis_results = analyze_listening_day(songs, lean=True, leaderboards=True)
         
-        # Analyze the listening data
-        logger.info("Running analysis...")
-        analysis_results = analyze_listening_day(songs)
+        # Close yesterday into the all-time records so the report can cite them
+        analysis_results['personal_records'] = update_personal_records()
         
         # Send to Slack
         logger.info("Sending daily summary to Slack...")
@@ -117,7 +136,9 @@ def main():
         # Force weekly summary
         success = run_weekly_summary()
     elif is_sunday():
-        # Run both daily and weekly on Sundays
+        # Run both daily and weekly on Sundays - fetch the week once so the
+        # daily report is served from the same rows
+        prefetch_week_window(columns=DAILY_ANALYSIS_COLUMNS)
         daily_success = run_daily_analysis()
         weekly_success = run_weekly_summary()
         success = daily_success and weekly_success
@@ -125,6 +146,8 @@ def main():
         # Just run daily analysis
         success = run_daily_analysis()
     
+    get_client().log_stats()
+    
     if success:
         logger.info("SpotiSpy completed successfully")
         sys.exit(0)
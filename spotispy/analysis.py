@@ -1,6 +1,29 @@
 from collections import defaultdict
 from datetime import timedelta
-from spotispy.helpers import get_logger
+from spotispy.helpers import get_logger, get_config_value
+
+# Columns analyze_listening_day and the daily message charts read from each song
+DAILY_ANALYSIS_COLUMNS = ('song', 'artist', 'album', 'duration', 'played_at',
+                          'song_popularity', 'energy', 'valence')
+
+# 'python' loops over song dictionaries, 'pandas' uses spotispy.frame_analysis
+ANALYSIS_BACKENDS = ('python', 'pandas')
+
+
+def get_analysis_backend(backend=None):
+    """
+    Resolve which analysis backend to use
+
+    Args:
+        backend: Explicit backend name, or None to read SPOTISPY_ANALYSIS_BACKEND
+
+    Returns:
+        'python' or 'pandas'
+    """
+    backend = str(backend or get_config_value('SPOTISPY_ANALYSIS_BACKEND', 'python')).lower()
+    if backend not in ANALYSIS_BACKENDS:
+        raise ValueError(f"Unknown analysis backend {backend!r} (expected one of {ANALYSIS_BACKENDS})")
+    return backend
 
 
 def calculate_daily_energy(songs_data):
@@ -176,7 +199,16 @@ def find_peak_listening_hour(history_data):
 def format_listening_duration(song_list):
     """Format total listening time in a human-readable way"""
     try:
-        total_seconds = sum(song['duration'] for song in song_list)
+        return format_listening_seconds(sum(song['duration'] for song in song_list))
+    except Exception as e:
+        logger = get_logger()
+        logger.error("Error formatting duration: %s", e)
+        return "unknown duration"
+
+
+def format_listening_seconds(total_seconds):
+    """Format a number of seconds like format_listening_duration"""
+    try:
         time_string = str(timedelta(seconds=int(total_seconds)))
         
         time_parts = time_string.split(':')
@@ -197,18 +229,389 @@ def format_listening_duration(song_list):
         return "unknown duration"
 
 
-def analyze_listening_day(raw_songs):
+class DailyAccumulator:
+    """
+    Single-pass accumulator for the daily analysis metrics
+
+    Each song is visited once. Per-hour seconds, songs and popularity leaders
+    live in fixed 24-slot arrays, and item counts and energy/mood sums are kept
+    numerically, so nothing is formatted until result() builds the output.
+    With keep_songs=False the per-hour song lists aren't kept at all.
+    """
+
+    def __init__(self, keep_songs=True):
+        self.keep_songs = keep_songs
+        self.song_count = 0
+        self.total_duration = 0
+        # Item key -> [count, hour rank, position in hour, seconds]; the rank and
+        # position are of its earliest play in hour-grouped order, which is the
+        # order the nested hour walk saw items
+        self.song_counts = {}
+        self.artist_counts = {}
+        self.album_counts = {}
+        self.energy_sum = 0
+        self.energy_duration = 0
+        self.valence_sum = 0
+        self.valence_duration = 0
+
+        # Hours in first-seen order, matching group_songs_by_hour
+        self.hour_order = []
+        self.hour_rank = [None] * 24
+        self.hour_songs = [None] * 24
+        self.hour_plays = [0] * 24
+        self.hour_seconds = [0.0] * 24
+        self.hour_popular = [None] * 24
+        self.hour_popularity = [0] * 24
+
+    def add(self, song):
+        """Fold one song into the running totals"""
+        self.add_all((song,))
+
+    def add_all(self, songs):
+        """
+        Fold songs into the running totals
+
+        The loop body is add() inlined with attributes bound to locals, since
+        this runs once per play.
+        """
+        from spotispy.database import add_time_fields
+
+        hour_order = self.hour_order
+        hour_rank = self.hour_rank
+        hour_songs = self.hour_songs
+        hour_plays = self.hour_plays
+        keep_songs = self.keep_songs
+        hour_seconds = self.hour_seconds
+        hour_popular = self.hour_popular
+        hour_popularity = self.hour_popularity
+        song_counts = self.song_counts
+        artist_counts = self.artist_counts
+        album_counts = self.album_counts
+        total_duration = self.total_duration
+        song_count = self.song_count
+        energy_sum = self.energy_sum
+        energy_duration = self.energy_duration
+        valence_sum = self.valence_sum
+        valence_duration = self.valence_duration
+
+        for song in songs:
+            if 'local_hour' not in song:
+                add_time_fields((song,))
+            hour = song['local_hour']
+            rank = hour_rank[hour]
+            if rank is None:
+                rank = hour_rank[hour] = len(hour_order)
+                hour_order.append(hour)
+                if keep_songs:
+                    hour_songs[hour] = []
+            if keep_songs:
+                hour_songs[hour].append(song)
+            position = hour_plays[hour]
+            hour_plays[hour] = position + 1
+
+            duration = song['duration']
+            hour_seconds[hour] += float(duration)
+            total_duration += duration
+            song_count += 1
+
+            artist = song['artist']
+            key = (song['song'], artist)
+            entry = song_counts.get(key)
+            if entry is None:
+                song_counts[key] = [1, rank, position, duration]
+            else:
+                entry[0] += 1
+                entry[3] += duration
+                if rank < entry[1]:
+                    entry[1] = rank
+                    entry[2] = position
+            entry = artist_counts.get(artist)
+            if entry is None:
+                artist_counts[artist] = [1, rank, position, duration]
+            else:
+                entry[0] += 1
+                entry[3] += duration
+                if rank < entry[1]:
+                    entry[1] = rank
+                    entry[2] = position
+            key = (song['album'], artist)
+            entry = album_counts.get(key)
+            if entry is None:
+                album_counts[key] = [1, rank, position, duration]
+            else:
+                entry[0] += 1
+                entry[3] += duration
+                if rank < entry[1]:
+                    entry[1] = rank
+                    entry[2] = position
+
+            popularity = int(song.get('song_popularity', 0))
+            if popularity > hour_popularity[hour]:
+                hour_popularity[hour] = popularity
+                hour_popular[hour] = song
+
+            if 'energy' in song:
+                energy_sum += song['energy'] * duration
+                energy_duration += duration
+            if 'valence' in song:
+                valence_sum += song['valence'] * duration
+                valence_duration += duration
+
+        self.total_duration = total_duration
+        self.song_count = song_count
+        self.energy_sum = energy_sum
+        self.energy_duration = energy_duration
+        self.valence_sum = valence_sum
+        self.valence_duration = valence_duration
+        return self
+
+    def leaderboards(self):
+        """
+        Song, artist and album leaderboards for the songs added so far
+
+        Returns:
+            Dictionary of kind -> Leaderboard (every item, not just repeats)
+        """
+        from spotispy.leaderboards import Leaderboard
+
+        return {kind: Leaderboard(kind, {key: [entry[0], entry[3]] for key, entry in counts.items()})
+                for kind, counts in (('song', self.song_counts), ('artist', self.artist_counts),
+                                     ('album', self.album_counts))}
+
+    def result(self, raw_songs=None, lean=False):
+        """
+        Build the analyze_listening_day result dictionary
+
+        Args:
+            raw_songs: The songs that were added (kept in the result as raw_data)
+            lean: If True, leave out raw_data and structured_data
+
+        Returns:
+            Dictionary with all analysis results
+        """
+        history = []
+        total_seconds = 0
+        most_popular = None
+        highest_popularity = 0
+        peak_hour = None
+        peak_minutes = 0
+
+        # Walk the hours in first-seen order so ties resolve as the nested walk did
+        for hour in self.hour_order:
+            hour_key = f"{hour:02d}:00"
+            hourly_seconds = int(self.hour_seconds[hour])
+            if not lean:
+                history.append({hour_key: {
+                    'songs': self.hour_songs[hour],
+                    'minutes_listened': format_duration(hourly_seconds)
+                }})
+            total_seconds += hourly_seconds
+
+            if self.hour_popularity[hour] > highest_popularity:
+                highest_popularity = self.hour_popularity[hour]
+                most_popular = self.hour_popular[hour]
+
+            minutes = hourly_seconds // 60 + hourly_seconds % 60 / 60
+            if minutes > peak_minutes:
+                peak_minutes = minutes
+                peak_hour = hour_key
+
+        hours, remainder = divmod(total_seconds, 3600)
+        minutes, seconds = divmod(remainder, 60)
+
+        results = {
+            'total_songs': self.song_count,
+            'total_time': f'{hours:02}:{minutes:02}:{seconds:02}',
+            'total_time_formatted': format_listening_seconds(self.total_duration),
+            'top_songs': _repeated_items(self.song_counts, "{0} by {1}"),
+            'top_artists': _repeated_items(self.artist_counts, "{0}"),
+            'top_albums': _repeated_items(self.album_counts, "{0} by {1}"),
+            'most_popular': most_popular,
+            'peak_hour': peak_hour,
+            'peak_minutes': peak_minutes,
+            'energy_level': _weighted_percentage(self.energy_sum, self.energy_duration),
+            'mood_level': _weighted_percentage(self.valence_sum, self.valence_duration)
+        }
+        if not lean:
+            results['raw_data'] = raw_songs
+            results['structured_data'] = {'history': history}
+        return results
+
+
+def _repeated_items(counts, label):
+    """Items played more than once, labelled and in the nested hour walk's first-seen order"""
+    repeated = [(rank, position, key, count)
+                for key, (count, rank, position, _) in counts.items() if count > 1]
+    repeated.sort(key=lambda item: item[:2])
+    return {label.format(*(key if isinstance(key, tuple) else (key,))): count
+            for _, _, key, count in repeated}
+
+
+def _weighted_percentage(weighted_sum, total_duration):
+    """Duration-weighted average of a 0-1 feature as a percentage"""
+    if total_duration == 0:
+        return 0
+    return round(weighted_sum / total_duration * 100, 1)
+
+
+def _day_summary(total_songs, total_seconds, top_song=None, top_artist=None, top_album=None):
+    """Build one summarize_day result"""
+    hours, remainder = divmod(int(total_seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return {
+        'total_songs': total_songs,
+        'total_seconds': total_seconds,
+        'total_time': f'{hours:02}:{minutes:02}:{seconds:02}',
+        'top_song': top_song,
+        'top_artist': top_artist,
+        'top_album': top_album
+    }
+
+
+def summarize_day(raw_songs):
+    """
+    Cheap day summary: totals and leaders only
+
+    One pass that keeps plays and seconds per song, artist and album - no
+    hour grouping, popularity scan or energy/mood, and no copies of the songs.
+    Use analyze_listening_day when the full daily report is needed.
+
+    Args:
+        raw_songs: List of song dictionaries for one day
+
+    Returns:
+        Dictionary with total_songs, total_seconds, total_time (HH:MM:SS) and
+        top_song, top_artist and top_album labels (most listening time, ties
+        broken by plays; None without plays)
+    """
+    from spotispy.leaderboards import KINDS, Leaderboard, item_label
+
+    # Item key -> [plays, seconds], the Leaderboard entry layout
+    counts = {kind: {} for kind in KINDS}
+    song_counts, artist_counts, album_counts = counts['song'], counts['artist'], counts['album']
+    total_seconds = 0
+
+    for song in raw_songs:
+        duration = song.get('duration', 0) or 0
+        total_seconds += duration
+        artist = song.get('artist') or ''
+        key = (song.get('song') or '', artist)
+        entry = song_counts.get(key)
+        if entry is None:
+            song_counts[key] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+        entry = artist_counts.get(artist)
+        if entry is None:
+            artist_counts[artist] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+        key = (song.get('album') or '', artist)
+        entry = album_counts.get(key)
+        if entry is None:
+            album_counts[key] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    leaders = {}
+    for kind, entries in counts.items():
+        top = Leaderboard(kind, entries).top(1, by='seconds')
+        leaders[f'top_{kind}'] = item_label(top[0][0]) if top else None
+    return _day_summary(len(raw_songs), total_seconds, **leaders)
+
+
+def get_rollup_day_analysis(local_date):
+    """
+    Daily analysis from the local store's rollups instead of the plays
+
+    Totals, the peak hour, energy/mood and the song, artist and album counts
+    come from the day's hourly and item rollups; only the most popular track
+    is looked up in the mirrored plays.
+
+    Args:
+        local_date: ISO date string (Central time)
+
+    Returns:
+        Dictionary shaped like analyze_listening_day(lean=True, leaderboards=True),
+        or None if the local store is disabled or unusable
+    """
+    import sqlite3
+    from spotispy.leaderboards import KINDS, Leaderboard
+    from spotispy.local_store import get_synced_local_store
+
+    store = get_synced_local_store()
+    if store is None:
+        return None
+
+    try:
+        hours = store.hourly_rollup(local_date)
+        items = {kind: store.top_items(kind, [local_date], limit=None) for kind in KINDS}
+        most_popular = store.most_popular(local_date)
+    except sqlite3.Error as e:
+        get_logger().error("Could not read rollups, using raw plays: %s", e)
+        return None
+
+    if not hours:
+        return analyze_listening_day([], leaderboards=True)
+
+    total_seconds = 0
+    peak_hour = None
+    peak_minutes = 0
+    for row in hours:
+        hourly_seconds = int(row['seconds'])
+        total_seconds += hourly_seconds
+        minutes = hourly_seconds // 60 + hourly_seconds % 60 / 60
+        if minutes > peak_minutes:
+            peak_minutes = minutes
+            peak_hour = f"{row['hour']:02d}:00"
+
+    leaderboards = {}
+    repeated = {}
+    for kind in KINDS:
+        leaderboards[kind] = Leaderboard(kind, {
+            item['name'] if kind == 'artist' else (item['name'], item['artist']): [item['plays'], item['seconds']]
+            for item in items[kind]})
+        repeated[kind] = {label: plays for label, plays, _ in leaderboards[kind].top_labels(None, min_plays=2)}
+
+    hours_part, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return {
+        'total_songs': sum(row['plays'] for row in hours),
+        'total_time': f'{hours_part:02}:{minutes:02}:{seconds:02}',
+        'total_time_formatted': format_listening_seconds(sum(row['seconds'] for row in hours)),
+        'top_songs': repeated['song'],
+        'top_artists': repeated['artist'],
+        'top_albums': repeated['album'],
+        'most_popular': most_popular,
+        'peak_hour': peak_hour,
+        'peak_minutes': peak_minutes,
+        'energy_level': _weighted_percentage(sum(row['energy_sum'] for row in hours),
+                                             sum(row['energy_seconds'] for row in hours)),
+        'mood_level': _weighted_percentage(sum(row['valence_sum'] for row in hours),
+                                           sum(row['valence_seconds'] for row in hours)),
+        'leaderboards': leaderboards
+    }
+
+
+def analyze_listening_day(raw_songs, backend=None, lean=False, leaderboards=False):
     """
     Main analysis function - processes raw songs into insights
     
     Args:
         raw_songs: List of song dictionaries from database
+        backend: 'python' or 'pandas' (default: SPOTISPY_ANALYSIS_BACKEND, else 'python')
+        lean: If True, leave out raw_data and structured_data (the songs held twice more)
+        leaderboards: If True, also return 'leaderboards' (kind -> Leaderboard objects,
+                      not plain data) for reports that break ties by listening time
         
     Returns:
         Dictionary with all analysis results
     """
     if not raw_songs:
-        return {
+        results = {
             'total_songs': 0,
             'total_time': '0:00:00',
             'top_songs': {},
@@ -219,45 +622,19 @@ def analyze_listening_day(raw_songs):
             'energy_level': 0,
             'mood_level': 0
         }
+        if leaderboards:
+            results['leaderboards'] = {}
+        return results
     
-    # Import here to avoid circular imports
-    from spotispy.database import group_songs_by_hour
-    
-    # Group songs by hour for analysis
-    day_data = group_songs_by_hour(raw_songs)
-    
-    # Calculate hourly totals
-    calculate_hourly_totals(day_data)
-    
-    # Find top items
-    top_songs = find_top_items(day_data, 'song')
-    top_artists = find_top_items(day_data, 'artist') 
-    top_albums = find_top_items(day_data, 'album')
-    
-    # Calculate totals and peaks
-    total_time = calculate_total_listening_time(day_data)
-    most_popular = find_most_popular_song(day_data['history'])
-    peak_hour, peak_minutes = find_peak_listening_hour(day_data['history'])
+    if get_analysis_backend(backend) == 'pandas':
+        from spotispy.frame_analysis import analyze_listening_day_frame
+        return analyze_listening_day_frame(raw_songs, lean=lean, leaderboards=leaderboards)
     
-    # Calculate mood/energy (will be 0 if no audio features available)
-    energy_level = calculate_daily_energy(raw_songs)
-    mood_level = calculate_daily_mood(raw_songs)
-    
-    return {
-        'total_songs': len(raw_songs),
-        'total_time': total_time,
-        'total_time_formatted': format_listening_duration(raw_songs),
-        'top_songs': top_songs,
-        'top_artists': top_artists,
-        'top_albums': top_albums,
-        'most_popular': most_popular,
-        'peak_hour': peak_hour,
-        'peak_minutes': peak_minutes,
-        'energy_level': energy_level,
-        'mood_level': mood_level,
-        'raw_data': raw_songs,
-        'structured_data': day_data
-    }
+    accumulator = DailyAccumulator(keep_songs=not lean).add_all(raw_songs)
+    results = accumulator.result(raw_songs, lean=lean)
+    if leaderboards:
+        results['leaderboards'] = accumulator.leaderboards()
+    return results
 
 
 if __name__ == "__main__":
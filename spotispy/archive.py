@@ -0,0 +1,254 @@
+"""
+Columnar Parquet archive of the full listening history
+
+Plays are stored one Parquet file per Central-time day:
+
+    archive/date=2025-03-15/songs.parquet
+
+String columns are dictionary-encoded and files are zstd-compressed, so a
+year of history is a few MB. read_archive() opens only the date partitions
+in the requested range and only the requested columns, which makes
+all-time questions a local scan instead of paging through Supabase.
+
+Requires pyarrow (listed in requirements.txt).
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from spotispy.helpers import get_logger, get_config_value
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised only without pyarrow installed
+    pa = None
+    pq = None
+
+ARCHIVE_FILE = 'songs.parquet'
+PARTITION_PREFIX = 'date='
+
+# Columns kept in the archive (the save_songs schema)
+ARCHIVE_COLUMNS = ('song', 'artist', 'album', 'duration', 'release_date', 'played_at',
+                   'song_popularity', 'source', 'energy', 'valence')
+
+STRING_COLUMNS = ('song', 'artist', 'album', 'release_date', 'source')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The archive needs pyarrow: pip install pyarrow")
+
+
+def archive_schema():
+    """Arrow schema for archived plays"""
+    _require_pyarrow()
+    return pa.schema([
+        ('song', pa.string()),
+        ('artist', pa.string()),
+        ('album', pa.string()),
+        ('duration', pa.float64()),
+        ('release_date', pa.string()),
+        ('played_at', pa.timestamp('us', tz='UTC')),
+        ('song_popularity', pa.int32()),
+        ('source', pa.string()),
+        ('energy', pa.float64()),
+        ('valence', pa.float64()),
+    ])
+
+
+def default_archive_dir():
+    """Get the default archive location (project root, next to data/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'archive')
+
+
+def get_archive_dir(root=None):
+    return root or get_config_value('SPOTISPY_ARCHIVE_DIR') or default_archive_dir()
+
+
+def partition_path(local_date, root=None):
+    """Get the file holding one Central date's plays"""
+    return os.path.join(get_archive_dir(root), f"{PARTITION_PREFIX}{local_date}", ARCHIVE_FILE)
+
+
+def list_partitions(root=None):
+    """
+    Get the archived Central dates
+
+    Returns:
+        Sorted list of ISO date strings
+    """
+    archive_dir = get_archive_dir(root)
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(name[len(PARTITION_PREFIX):] for name in os.listdir(archive_dir)
+                  if name.startswith(PARTITION_PREFIX)
+                  and os.path.exists(os.path.join(archive_dir, name, ARCHIVE_FILE)))
+
+
+def _play_identity(row):
+    return row['played_at'], row.get('source') or 'Spotify', row.get('song'), row.get('artist')
+
+
+def _to_record(song):
+    """Coerce a song dictionary to the archive schema"""
+    from spotispy.database import parse_played_at
+
+    record = {column: song.get(column) for column in ARCHIVE_COLUMNS}
+    record['played_at'] = parse_played_at(song)
+    if record['duration'] is not None:
+        record['duration'] = float(record['duration'])
+    if record['song_popularity'] is not None:
+        record['song_popularity'] = int(record['song_popularity'])
+    return record
+
+
+def _write_partition(path, records):
+    """Atomically replace a partition file with the given records"""
+    table = pa.Table.from_pylist(records, schema=archive_schema())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    pq.write_table(table, temp_path, compression='zstd', use_dictionary=list(STRING_COLUMNS))
+    os.replace(temp_path, path)
+
+
+def write_songs_to_archive(songs, root=None):
+    """
+    Merge songs into their date partitions
+
+    Each affected partition is read, merged with the new plays (a play already
+    archived is kept once), sorted by played_at and rewritten.
+
+    Args:
+        songs: List of song dictionaries (save_songs schema)
+        root: Archive directory (default: SPOTISPY_ARCHIVE_DIR or ./archive)
+
+    Returns:
+        Dictionary mapping each written date to its new row count
+    """
+    from spotispy.database import CENTRAL_TZ
+
+    _require_pyarrow()
+    by_date = defaultdict(list)
+    for song in songs:
+        record = _to_record(song)
+        by_date[record['played_at'].astimezone(CENTRAL_TZ).strftime('%Y-%m-%d')].append(record)
+
+    written = {}
+    for local_date, records in sorted(by_date.items()):
+        path = partition_path(local_date, root)
+        merged = {}
+        if os.path.exists(path):
+            for row in pq.read_table(path).to_pylist():
+                merged[_play_identity(row)] = row
+        for record in records:
+            merged[_play_identity(record)] = record
+
+        rows = sorted(merged.values(), key=lambda row: row['played_at'])
+        _write_partition(path, rows)
+        written[local_date] = len(rows)
+
+    return written
+
+
+def read_archive(start_date=None, end_date=None, columns=None, root=None, as_table=False):
+    """
+    Read archived plays, opening only the needed partitions and columns
+
+    Args:
+        start_date: First Central date to include (YYYY-MM-DD, None = earliest)
+        end_date: Date to stop before (YYYY-MM-DD, exclusive, None = latest)
+        columns: Columns to load (None loads every archived column)
+        root: Archive directory (default: SPOTISPY_ARCHIVE_DIR or ./archive)
+        as_table: Return a pyarrow.Table instead of song dictionaries
+
+    Returns:
+        List of song dictionaries ordered by played_at (played_at as ISO
+        strings), or a pyarrow.Table when as_table is True
+    """
+    _require_pyarrow()
+    selected = [column for column in (columns or ARCHIVE_COLUMNS) if column in ARCHIVE_COLUMNS]
+    dates = [date for date in list_partitions(root)
+             if (start_date is None or date >= start_date) and (end_date is None or date < end_date)]
+
+    tables = [pq.read_table(partition_path(date, root), columns=selected) for date in dates]
+    if tables:
+        table = pa.concat_tables(tables)
+    else:
+        table = archive_schema().empty_table().select(selected)
+
+    if as_table:
+        return table
+
+    rows = table.to_pylist()
+    if 'played_at' in selected:
+        for row in rows:
+            row['played_at'] = row['played_at'].isoformat()
+    return rows
+
+
+def _utc_bound(dt):
+    """Format an aware datetime as a UTC PostgREST filter value"""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def archive_date_range(start_date, end_date, root=None):
+    """
+    Export plays from the database into the archive
+
+    Dates are Central calendar days, like the partitions, and each pass reads
+    [start, end) of its month so no play is fetched twice.
+
+    Args:
+        start_date: First date to export (YYYY-MM-DD)
+        end_date: Date to stop before (YYYY-MM-DD, exclusive)
+        root: Archive directory
+
+    Returns:
+        Number of plays exported
+    """
+    from spotispy.database import CENTRAL_TZ, iter_song_pages
+
+    logger = get_logger()
+    exported = 0
+    current = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=CENTRAL_TZ)
+    stop = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=CENTRAL_TZ)
+
+    # One month per pass keeps memory flat while rewriting each partition once
+    while current < stop:
+        chunk_end = min(stop, (current.replace(day=1) + timedelta(days=32)).replace(day=1))
+        filters = [f"played_at=gte.{_utc_bound(current)}", f"played_at=lt.{_utc_bound(chunk_end)}"]
+        songs = [song for page in iter_song_pages(filters, columns=ARCHIVE_COLUMNS) for song in page]
+        if songs:
+            write_songs_to_archive(songs, root)
+        logger.info(f"Archived {len(songs)} plays from {current:%Y-%m-%d} to {chunk_end:%Y-%m-%d}")
+        exported += len(songs)
+        current = chunk_end
+
+    return exported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export listening history to the Parquet archive')
+    parser.add_argument('--start', help='First date to export (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Date to stop before (YYYY-MM-DD, default: today in Central time)')
+    args = parser.parse_args()
+
+    logger = get_logger()
+    if args.start:
+        from spotispy.database import CENTRAL_TZ
+        # Partitions are Central days, so "today" is too
+        end = args.end or datetime.now(CENTRAL_TZ).strftime('%Y-%m-%d')
+        archive_date_range(args.start, end)
+
+    partitions = list_partitions()
+    if partitions:
+        table = read_archive(columns=('played_at',), as_table=True)
+        logger.info(f"Archive at {get_archive_dir()}: {table.num_rows} plays across {len(partitions)} days "
+                    f"({partitions[0]} to {partitions[-1]})")
+    else:
+        logger.info(f"Archive at {get_archive_dir()} is empty")
@@ -0,0 +1,115 @@
+"""
+Async variants of the spotispy.database API
+
+Same functions as spotispy.database, as `async def`. Each call runs the
+synchronous implementation on a worker thread over the shared pooled
+SupabaseClient session, and a semaphore caps how many run at once so the
+connection pool is never oversubscribed. Orchestrators can fan queries out
+with asyncio.gather instead of waiting on each in turn:
+
+    songs_by_date = asyncio.run(get_songs_for_dates(['2025-03-14', '2025-03-15']))
+"""
+
+import asyncio
+import weakref
+from spotispy import database
+from spotispy.helpers import get_config_value, safe_int
+
+# One semaphore per event loop (asyncio primitives can't be shared across loops)
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_concurrency_limit():
+    """Get the maximum number of concurrent database calls (defaults to the pool size)"""
+    pool_size = database.get_client().pool_size
+    return max(1, safe_int(get_config_value('SUPABASE_ASYNC_CONCURRENCY', pool_size), pool_size))
+
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(get_concurrency_limit())
+    return _semaphores[loop]
+
+
+async def _run(func, *args, **kwargs):
+    """Run a blocking database function on a worker thread, within the concurrency limit"""
+    async with _get_semaphore():
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+    """Async version of database.get_songs_in_window"""
+    return await _run(database.get_songs_in_window, start, end, columns=columns, compact=compact, strict=strict)
+
+
+async def get_yesterdays_songs(columns=None, compact=False):
+    """Async version of database.get_yesterdays_songs"""
+    return await _run(database.get_yesterdays_songs, columns=columns, compact=compact)
+
+
+async def get_songs_for_date_range(start_date, end_date, columns=None, compact=False):
+    """Async version of database.get_songs_for_date_range"""
+    return await _run(database.get_songs_for_date_range, start_date, end_date, columns=columns, compact=compact)
+
+
+async def get_songs_for_single_date(date_str, columns=None, compact=False):
+    """Async version of database.get_songs_for_single_date"""
+    return await _run(database.get_songs_for_single_date, date_str, columns=columns, compact=compact)
+
+
+async def get_songs_for_dates(date_strs, columns=None, compact=False):
+    """
+    Fetch several single dates concurrently
+
+    Args:
+        date_strs: Iterable of date strings in YYYY-MM-DD format
+        columns: Columns to fetch (None fetches every column)
+        compact: If True, drop unrequested and null values from each row
+
+    Returns:
+        Dictionary mapping each date string to its list of songs (in input order)
+    """
+    date_strs = list(date_strs)
+    results = await asyncio.gather(*(get_songs_for_single_date(date_str, columns=columns, compact=compact)
+                                     for date_str in date_strs))
+    return dict(zip(date_strs, results))
+
+
+async def write_songs(song_list, upsert=None, chunk_size=None, max_attempts=None, compress=None):
+    """Async version of database.write_songs"""
+    return await _run(database.write_songs, song_list, upsert=upsert, chunk_size=chunk_size,
+                      max_attempts=max_attempts, compress=compress)
+
+
+async def save_songs(song_list, upsert=None):
+    """Async version of database.save_songs"""
+    return await _run(database.save_songs, song_list, upsert=upsert)
+
+
+async def check_for_duplicates(songs_to_check):
+    """Async version of database.check_for_duplicates"""
+    return await _run(database.check_for_duplicates, songs_to_check)
+
+
+async def check_youtube_music_duplicates(songs_to_check, hours_back=2):
+    """Async version of database.check_youtube_music_duplicates"""
+    return await _run(database.check_youtube_music_duplicates, songs_to_check, hours_back=hours_back)
+
+
+if __name__ == "__main__":
+    # Fetch the last week one day per request, concurrently
+    import time
+    from spotispy.helpers import get_logger, get_date_string
+
+    logger = get_logger()
+    dates = [get_date_string(days_ago) for days_ago in range(1, 8)]
+
+    started = time.perf_counter()
+    songs_by_date = asyncio.run(get_songs_for_dates(dates, columns=('song', 'artist', 'played_at')))
+    elapsed = time.perf_counter() - started
+
+    for date_str, songs in songs_by_date.items():
+        logger.info(f"{date_str}: {len(songs)} songs")
+    logger.info(f"Fetched {len(dates)} days concurrently in {elapsed:.2f}s")
+    database.get_client().log_stats()
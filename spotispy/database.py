@@ -1,11 +1,21 @@
+import gzip
+import hashlib
+import json
 import os
+import random
+import sqlite3
+import threading
 import time
 import requests
 import urllib.parse
 from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-from spotispy.helpers import get_logger
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+from spotispy.helpers import get_logger, get_config_value, safe_int, safe_float, chunks
+from spotispy.records import ValuePool, to_plays
 
 # Define Central Time timezone
 CENTRAL_TZ = timezone(timedelta(hours=-5))  # CDT (Central Daylight Time)
@@ -47,74 +57,594 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SONGS_TABLE = 'songs'
 
+# Supabase's default PostgREST max-rows; larger pages would be silently capped
+DEFAULT_PAGE_SIZE = 1000
+
+# PostgreSQL error code for an unknown column in a select= projection
+UNDEFINED_COLUMN_CODE = '42703'
+
 headers = {
     'apikey': SUPABASE_KEY,
     'Authorization': f'Bearer {SUPABASE_KEY}',
     'Content-Type': 'application/json',
 }
 
+# Status codes worth retrying - Supabase/Kong returns these on transient upstream hiccups
+RETRY_STATUS_CODES = (500, 502, 503, 504)
 
-def get_yesterdays_songs():
-    """Get all songs played in the last 24 hours from Supabase (Central Time)"""
-    logger = get_logger()
-    
-    # Get current time in Central timezone
-    now_central = datetime.now(CENTRAL_TZ)
-    
-    # Get 24 hours ago in Central time, then convert to UTC for database query
-    one_day_ago_central = now_central - timedelta(hours=24)
-    one_day_ago_utc = one_day_ago_central.astimezone(timezone.utc)
-    one_day_ago_iso = one_day_ago_utc.isoformat().replace('+00:00', 'Z')
+# Write failures where the request was refused before any row was written
+SAFE_RETRY_STATUS_CODES = (429, 503)
+
+# Bulk write tuning
+DEFAULT_WRITE_CHUNK_SIZE = 500
+WRITE_BACKOFF_SECONDS = 1.0
+
+# Rows per check_for_duplicates lookup, keeping the played_at=in.(...) URL short
+DUPLICATE_CHECK_BATCH = 200
+
+
+class SupabaseClient:
+    """
+    Shared HTTP client for the Supabase REST API
+
+    Keeps a pooled keep-alive requests.Session so repeated queries reuse the
+    same TCP+TLS connection, retries 5xx responses and timeouts with backoff,
+    and records per-request latency so the savings can be checked in the logs.
+    """
+
+    def __init__(self, base_url=None, api_key=None, pool_size=None,
+                 max_retries=None, backoff_factor=None, timeout=None):
+        self.base_url = (base_url or SUPABASE_URL or '').rstrip('/')
+        self.timeout = timeout if timeout is not None else safe_float(
+            get_config_value('SUPABASE_TIMEOUT', 10), 10.0)
+
+        if pool_size is None:
+            pool_size = safe_int(get_config_value('SUPABASE_POOL_SIZE', 10), 10)
+        if max_retries is None:
+            max_retries = safe_int(get_config_value('SUPABASE_MAX_RETRIES', 3), 3)
+        if backoff_factor is None:
+            backoff_factor = safe_float(get_config_value('SUPABASE_BACKOFF', 0.5), 0.5)
+
+        # Only idempotent methods are retried on read timeouts and 5xx responses.
+        # Connection errors are retried for every method since nothing was sent.
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if api_key is None:
+            self.session.headers.update(headers)
+        else:
+            self.session.headers.update({
+                'apikey': api_key,
+                'Authorization': f'Bearer {api_key}',
+                'Content-Type': 'application/json',
+            })
+
+        self.stats = defaultdict(lambda: {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        self._stats_lock = threading.Lock()
+
+    def url(self, path):
+        """Build a full REST URL from a table path such as 'songs?select=*'"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/rest/v1/{path}"
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request through the pooled session
+
+        Args:
+            method: HTTP method ('GET', 'POST', ...)
+            path: Table path with query string, or a full URL
+            **kwargs: Extra arguments passed to requests.Session.request
+
+        Returns:
+            requests.Response (callers decide whether to raise_for_status)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.RequestException:
+            self._record(method, time.perf_counter() - started, failed=True)
+            raise
+
+        self._record(method, time.perf_counter() - started, failed=response.status_code >= 400)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def _record(self, method, elapsed, failed=False):
+        """Update latency counters for one request"""
+        with self._stats_lock:
+            counters = self.stats[method]
+            counters['requests'] += 1
+            counters['total_seconds'] += elapsed
+            counters['max_seconds'] = max(counters['max_seconds'], elapsed)
+            if failed:
+                counters['errors'] += 1
+
+    def get_stats(self):
+        """
+        Get per-method latency counters
+
+        Returns:
+            Dictionary like {'GET': {'requests': 3, 'errors': 0, 'total_seconds': 0.41,
+            'max_seconds': 0.22, 'avg_seconds': 0.14}}
+        """
+        stats = {}
+        with self._stats_lock:
+            snapshot = {method: dict(counters) for method, counters in self.stats.items()}
+        for method, counters in snapshot.items():
+            avg = counters['total_seconds'] / counters['requests'] if counters['requests'] else 0.0
+            stats[method] = dict(counters, avg_seconds=avg)
+        return stats
+
+    def log_stats(self):
+        """Log a one-line latency summary per HTTP method"""
+        logger = get_logger()
+        for method, counters in self.get_stats().items():
+            logger.info(f"Supabase {method}: {counters['requests']} requests, {counters['errors']} errors, "
+                        f"avg {counters['avg_seconds']:.3f}s, max {counters['max_seconds']:.3f}s")
+
+    def close(self):
+        self.session.close()
 
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}?played_at=gte.{one_day_ago_iso}&order=played_at.desc"
 
+# Global client instance shared by all database functions
+_client = None
+
+def get_client():
+    """Get the shared Supabase client (created on first use)"""
+    global _client
+    if _client is None:
+        _client = SupabaseClient()
+    return _client
+
+
+def build_select(columns=None):
+    """
+    Build a PostgREST select= parameter for the given columns
+
+    Args:
+        columns: Iterable of column names, or None for every column
+
+    Returns:
+        String like 'select=song,artist,played_at'
+    """
+    if not columns:
+        return 'select=*'
+    return 'select=' + ','.join(columns)
+
+
+def compact_rows(rows, columns=None, pool=None):
+    """
+    Strip rows down to the keys a consumer needs
+
+    Drops columns that weren't requested and keys whose value is null, so long
+    ranges hold less in memory and analysis can rely on `'energy' in song`.
+    Rows come back as slotted Play records with repeated strings shared
+    through `pool` (see spotispy.records); they read like dictionaries.
+
+    Args:
+        rows: List of song dictionaries
+        columns: Iterable of column names to keep (None keeps every column)
+        pool: ValuePool to share across the pages of one read (default: a new pool)
+
+    Returns:
+        List of Play records
+    """
+    return to_plays(rows, columns, pool)
+
+
+def _is_undefined_column_error(response):
+    """Check whether PostgREST rejected a projection because a column doesn't exist"""
+    if response.status_code != 400:
+        return False
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        return response.json().get('code') == UNDEFINED_COLUMN_CODE
+    except ValueError:
+        return False
+
+
+def iter_song_pages(filters, page_size=None, max_rows=None, columns=None, compact=False,
+                    order_by='played_at', descending=True):
+    """
+    Yield songs matching PostgREST filters in pages, newest first
+
+    Pages are fetched with keyset pagination on order_by (ties broken by id),
+    so each request is an index range scan and results are never silently
+    truncated by PostgREST's max-rows cap. Stop iterating (or pass max_rows)
+    to end early without fetching the rest of the range.
+
+    Args:
+        filters: List of PostgREST filter strings (e.g., ['played_at=gte.2025-03-15T00:00:00Z'])
+        page_size: Rows per request - keep at or below the server's max-rows (default: 1000)
+        max_rows: Optional cap on the total number of rows yielded
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
+        order_by: Timestamp column driving the keyset (default: played_at)
+        descending: Page newest first (True) or oldest first (False)
+
+    Yields:
+        Lists of song dictionaries, one list per page
+    """
+    # The keyset column is always fetched
+    if columns is not None and order_by not in columns:
+        columns = tuple(columns) + (order_by,)
+    select = build_select(columns)
+    direction, boundary_op = ('desc', 'lte') if descending else ('asc', 'gte')
+
+    if page_size is None:
+        page_size = safe_int(get_config_value('SUPABASE_PAGE_SIZE', DEFAULT_PAGE_SIZE), DEFAULT_PAGE_SIZE)
+
+    pool = ValuePool() if compact else None
+    boundary = None       # order_by value of the last row yielded
+    boundary_seen = 0     # rows already yielded that share that value
+    yielded = 0
+
+    while max_rows is None or yielded < max_rows:
+        limit = page_size if max_rows is None else min(page_size, max_rows - yielded)
+        page_filters = list(filters)
+        if boundary is not None:
+            page_filters.append(f"{order_by}={boundary_op}.{urllib.parse.quote(boundary)}")
+
+        endpoint = (f"{SONGS_TABLE}?{select}&{'&'.join(page_filters)}"
+                    f"&order={order_by}.{direction},id.{direction}&limit={limit}&offset={boundary_seen}")
+
+        response = get_client().get(endpoint)
+        if select != 'select=*' and _is_undefined_column_error(response):
+            # Older tables may lack optional columns (e.g. energy/valence) - fall back to everything
+            get_logger().warning("Projection %s rejected by database, falling back to select=*", select)
+            select = 'select=*'
+            continue
         response.raise_for_status()
-        songs = response.json()
-        
-        logger.info("Fetched %s songs from database", len(songs))
+        page = response.json()
+
+        if not page:
+            return
+
+        if compact:
+            page = compact_rows(page, columns, pool)
+
+        yield page
+        yielded += len(page)
+
+        # Advance the keyset boundary past the rows we just yielded
+        last_value = page[-1][order_by]
+        at_boundary = sum(1 for song in page if song[order_by] == last_value)
+        if last_value == boundary:
+            boundary_seen += at_boundary
+        else:
+            boundary = last_value
+            boundary_seen = at_boundary
+
+        if len(page) < limit:
+            return
+
+
+def iter_songs_for_date_range(start_date, end_date, page_size=None, max_rows=None, columns=None, compact=False):
+    """
+    Stream songs for a date range page by page (constant memory per page)
+
+    The dates are UTC and both are included, as get_songs_for_date_range
+    reads them; for exact [start, end) bounds pass filters to iter_song_pages.
+
+    Args:
+        start_date: ISO date string (e.g., '2025-03-15')
+        end_date: ISO date string (e.g., '2025-03-21')
+        page_size: Rows per request (default: 1000)
+        max_rows: Optional cap on the total number of rows yielded
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
+
+    Yields:
+        Lists of song dictionaries, newest first
+    """
+    filters = [f"played_at=gte.{start_date}T00:00:00Z", f"played_at=lt.{end_date}T23:59:59Z"]
+    yield from iter_song_pages(filters, page_size=page_size, max_rows=max_rows,
+                               columns=columns, compact=compact)
+
+
+def _fetch_all_pages(filters, columns=None, compact=False):
+    """Collect every page for the given filters into one list"""
+    songs = []
+    for page in iter_song_pages(filters, columns=columns, compact=compact):
+        songs.extend(page)
+    return songs
+
+
+def _read_from_local_store(start, end, columns=None, compact=False):
+    """
+    Serve a read from the local SQLite mirror when it is enabled
+
+    Syncs new rows first; if Supabase is unreachable the mirror's existing rows
+    are served instead of failing the report.
+
+    Args:
+        start: ISO timestamp string for the start of the window
+        end: ISO timestamp string for the end of the window (None = open-ended)
+        columns: Columns the consumer needs
+        compact: If True, return lean Play records without null values
+
+    Returns:
+        List of song dictionaries, or None if the mirror is disabled or unusable
+    """
+    from spotispy.local_store import get_synced_local_store
+
+    store = get_synced_local_store()
+    if store is None:
+        return None
+
+    try:
+        return store.query_window(start, end, columns=columns, compact=compact)
+    except sqlite3.Error as e:
+        get_logger().error("Local store unavailable, reading from Supabase: %s", e)
+        return None
+
+
+def _to_utc_iso(dt):
+    """Format an aware datetime as a UTC ISO string with Z suffix for PostgREST filters"""
+    return dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def parse_played_at(song):
+    """Parse a song's played_at into an aware UTC datetime (naive values are treated as UTC)"""
+    dt = parse_datetime_robust(song['played_at'])
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+# Derived time fields added to rows when they are read. They are computed once
+# per row so analysis, dedup and sorting never reparse played_at strings, and
+# are stripped again before rows are written back to Supabase.
+TIME_FIELDS = ('played_ts', 'local_date', 'local_hour')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_CENTRAL_OFFSET_SECONDS = int(CENTRAL_TZ.utcoffset(None).total_seconds())
+_local_date_cache = {}
+
+
+def to_epoch_micros(value):
+    """
+    Convert an ISO timestamp string to integer microseconds since the epoch
+
+    Naive timestamps are treated as UTC.
+
+    Args:
+        value: ISO timestamp string (Z, +00:00 or naive)
+
+    Returns:
+        Integer epoch microseconds
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        dt = parse_datetime_robust(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+
+def epoch_micros_to_iso(micros):
+    """Format epoch microseconds as a UTC ISO string with Z suffix"""
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat().replace('+00:00', 'Z')
+
+
+def add_time_fields(songs):
+    """
+    Add played_ts (epoch microseconds), local_date and local_hour (Central) to songs in place
+
+    Rows without played_at, or that already carry the fields, are left alone.
+
+    Args:
+        songs: List of song dictionaries
+
+    Returns:
+        The same list, for chaining
+    """
+    for song in songs:
+        if 'played_ts' in song or not song.get('played_at'):
+            continue
+        played_ts = to_epoch_micros(song['played_at'])
+        local_seconds = played_ts // 1_000_000 + _CENTRAL_OFFSET_SECONDS
+        day_number = local_seconds // 86400
+
+        local_date = _local_date_cache.get(day_number)
+        if local_date is None:
+            local_date = (_EPOCH + timedelta(days=day_number)).strftime('%Y-%m-%d')
+            _local_date_cache[day_number] = local_date
+
+        song['played_ts'] = played_ts
+        song['local_date'] = local_date
+        song['local_hour'] = local_seconds // 3600 % 24
+    return songs
+
+
+def strip_time_fields(song):
+    """Get a copy of a song without the derived time fields (for writes)"""
+    return {key: value for key, value in song.items() if key not in TIME_FIELDS}
+
+
+def played_ts(song):
+    """Get a song's epoch microseconds, computing it if the row wasn't prepared"""
+    value = song.get('played_ts')
+    return value if value is not None else to_epoch_micros(song['played_at'])
+
+
+def local_time_fields(song):
+    """Get a song's (local_date, local_hour), computing them if the row wasn't prepared"""
+    if 'local_hour' not in song:
+        add_time_fields([song])
+    return song['local_date'], song['local_hour']
+
+
+# Widest window fetched so far in this process, so the daily and weekly
+# reports can share one range query when both run (e.g. on Sundays)
+_window_cache = None
+
+
+def _window_covers(cached, start, end, columns, compact):
+    """Check whether a cached window fetch can answer a narrower request"""
+    if cached['start'] > start:
+        return False
+    if cached['end'] is not None and (end is None or end > cached['end']):
+        return False
+    if cached['compact'] != compact:
+        return False
+    if cached['columns'] is None:
+        return True
+    return columns is not None and set(columns) <= set(cached['columns'])
+
+
+def clear_window_cache():
+    """Forget the cached window fetch (e.g. between runs in a long-lived process)"""
+    global _window_cache
+    _window_cache = None
+
+
+def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+    """
+    Get songs played in [start, end) with one paged range query
+
+    Rows from the widest window fetched so far are kept in memory and reused,
+    so a later, narrower request in the same process is filtered locally
+    instead of going back to the database.
+
+    Args:
+        start: Timezone-aware datetime for the start of the window
+        end: Timezone-aware datetime for the end of the window (None = now)
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
+        strict: If True, raise requests.RequestException when the database
+            can't be read, instead of returning an empty list that looks like
+            a window without plays
+
+    Returns:
+        List of song dictionaries, newest first
+    """
+    global _window_cache
+    logger = get_logger()
+
+    cached = _window_cache
+    if cached is not None and _window_covers(cached, start, end, columns, compact):
+        start_ts = (start - _EPOCH) // _ONE_MICROSECOND
+        end_ts = (end - _EPOCH) // _ONE_MICROSECOND if end is not None else None
+        songs = [song for song in cached['songs']
+                 if song['played_ts'] >= start_ts and (end_ts is None or song['played_ts'] < end_ts)]
+        logger.info("Served %s songs from cached window", len(songs))
         return songs
-        
+
+    local_songs = _read_from_local_store(_to_utc_iso(start), _to_utc_iso(end) if end is not None else None,
+                                         columns=columns, compact=compact)
+    if local_songs is not None:
+        logger.info("Served %s songs from local store", len(local_songs))
+        return add_time_fields(local_songs)
+
+    filters = [f"played_at=gte.{_to_utc_iso(start)}"]
+    if end is not None:
+        filters.append(f"played_at=lt.{_to_utc_iso(end)}")
+
+    try:
+        songs = add_time_fields(_fetch_all_pages(filters, columns=columns, compact=compact))
     except requests.RequestException as e:
-        logger.error("Error fetching from database: %s", e)
+        logger.error("Error fetching window from database: %s", e)
+        if strict:
+            raise
         return []
 
+    _window_cache = {
+        'start': start,
+        'end': end,
+        'columns': tuple(columns) if columns is not None else None,
+        'compact': compact,
+        'songs': songs,
+    }
+    logger.info("Fetched %s songs for window starting %s", len(songs), _to_utc_iso(start))
+    return songs
+
+
+def get_yesterdays_songs(columns=None, compact=False):
+    """
+    Get all songs played in the last 24 hours from Supabase (Central Time)
+
+    Args:
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
+
+    Returns:
+        List of song dictionaries
+    """
+    logger = get_logger()
+    
+    # 24 hours ago in Central time (get_songs_in_window converts to UTC for the query)
+    now_central = datetime.now(CENTRAL_TZ)
+    one_day_ago_central = now_central - timedelta(hours=24)
+
+    songs = get_songs_in_window(one_day_ago_central, columns=columns, compact=compact)
+    logger.info("Fetched %s songs from database", len(songs))
+    return songs
 
-def get_songs_for_date_range(start_date, end_date):
+
+def get_songs_for_date_range(start_date, end_date, columns=None, compact=False):
     """
     Get songs for a specific date range
     
     Args:
         start_date: ISO date string (e.g., '2025-03-15')
         end_date: ISO date string (e.g., '2025-03-21')
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
         
     Returns:
         List of song dictionaries
     """
     logger = get_logger()
-    
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}?played_at=gte.{start_date}T00:00:00Z&played_at=lt.{end_date}T23:59:59Z&order=played_at.desc"
+
+    local_songs = _read_from_local_store(f"{start_date}T00:00:00Z", f"{end_date}T23:59:59Z",
+                                         columns=columns, compact=compact)
+    if local_songs is not None:
+        logger.info("Served %s songs for date range %s to %s from local store", len(local_songs), start_date, end_date)
+        return add_time_fields(local_songs)
 
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
-        response.raise_for_status()
-        songs = response.json()
+        songs = []
+        for page in iter_songs_for_date_range(start_date, end_date, columns=columns, compact=compact):
+            songs.extend(page)
         
         logger.info("Fetched %s songs for date range %s to %s", len(songs), start_date, end_date)
-        return songs
+        return add_time_fields(songs)
         
     except requests.RequestException as e:
         logger.error("Error fetching date range from database: %s", e)
         return []
 
 
-def get_songs_for_single_date(date_str):
+def get_songs_for_single_date(date_str, columns=None, compact=False):
     """
     Get songs for a specific single date
     
     Args:
         date_str: ISO date string (e.g., '2025-03-15')
+        columns: Columns the consumer needs (None fetches every column)
+        compact: If True, return lean Play records without unrequested or null keys
         
     Returns:
         List of song dictionaries for that date
@@ -125,35 +655,214 @@ def get_songs_for_single_date(date_str):
     start_time = f"{date_str}T00:00:00Z"
     
     # Calculate next day
-    from datetime import datetime, timedelta
     date_obj = datetime.fromisoformat(date_str)
     next_date = date_obj + timedelta(days=1)
     end_time = next_date.strftime("%Y-%m-%dT00:00:00Z")
-    
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}?played_at=gte.{start_time}&played_at=lt.{end_time}&order=played_at.desc"
+
+    local_songs = _read_from_local_store(start_time, end_time, columns=columns, compact=compact)
+    if local_songs is not None:
+        logger.info("Served %s songs for date %s from local store", len(local_songs), date_str)
+        return add_time_fields(local_songs)
 
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
-        response.raise_for_status()
-        songs = response.json()
+        songs = _fetch_all_pages([f"played_at=gte.{start_time}", f"played_at=lt.{end_time}"],
+                                 columns=columns, compact=compact)
         
         logger.info("Fetched %s songs for date %s", len(songs), date_str)
-        return songs
+        return add_time_fields(songs)
         
     except requests.RequestException as e:
         logger.error("Error fetching songs for date %s: %s", date_str, e)
         return []
 
 
-def save_songs(song_list):
+def is_upsert_mode():
+    """
+    Check whether collectors write with upsert semantics
+
+    SUPABASE_INGEST_MODE=upsert requires the play_key column and unique
+    constraint (see docs/upsert-ingestion.md); the default 'insert' mode keeps
+    the read-then-write duplicate checks.
+    """
+    return str(get_config_value('SUPABASE_INGEST_MODE', 'insert')).lower() == 'upsert'
+
+
+def make_play_key(song):
+    """
+    Build a deterministic key identifying one play
+
+    md5 of source|played_at (UTC, milliseconds)|song|artist, lowercased - the
+    same expression can be computed in SQL to backfill existing rows.
+
+    Args:
+        song: Song dictionary with 'played_at', 'song' and 'artist'
+
+    Returns:
+        32-character hex string
+    """
+    played_at = parse_played_at(song).astimezone(timezone.utc)
+    played_str = played_at.strftime('%Y-%m-%dT%H:%M:%S') + f".{played_at.microsecond // 1000:03d}"
+    source = song.get('source') or 'Spotify'
+    raw = f"{source}|{played_str}|{str(song.get('song') or '').lower()}|{str(song.get('artist') or '').lower()}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def _post_chunk(endpoint, payload, request_headers, compress):
+    """Send one chunk of rows, optionally gzip-compressed"""
+    body = json.dumps(payload).encode('utf-8')
+    chunk_headers = dict(request_headers)
+    if compress:
+        body = gzip.compress(body)
+        chunk_headers['Content-Encoding'] = 'gzip'
+    return get_client().post(endpoint, data=body, headers=chunk_headers)
+
+
+def _failed_to_connect(error):
+    """Check whether a request failed before a connection was established (nothing was sent)"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or isinstance(error, requests.ReadTimeout):
+        return False
+    reason = error.args[0] if error.args else None
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying failure
+    reason = getattr(reason, 'reason', reason)
+    return isinstance(reason, NewConnectionError)
+
+
+def _is_retryable(error, status_code, idempotent):
+    """
+    Decide whether a failed chunk should be retried as-is
+
+    429/503 and failures to connect mean the rows were never written. Timeouts,
+    other 5xx and connections dropped after the request went out (reset,
+    remote disconnect) are ambiguous - the rows may already be committed - so
+    they are only retried when the write is idempotent (upsert mode) and
+    can't create duplicates.
+    """
+    if status_code in SAFE_RETRY_STATUS_CODES:
+        return True
+    if _failed_to_connect(error):
+        return True
+    if idempotent and (isinstance(error, (requests.Timeout, requests.ConnectionError))
+                       or status_code in RETRY_STATUS_CODES):
+        return True
+    return False
+
+
+def write_songs(song_list, upsert=None, chunk_size=None, max_attempts=None, compress=None):
+    """
+    Bulk-write songs in chunks, retrying transient failures and isolating bad rows
+
+    Each chunk is retried with jittered exponential backoff on transient errors.
+    A chunk the database rejects (4xx) is bisected until the offending rows are
+    isolated, so one bad row doesn't drop the good rows around it.
+
+    Args:
+        song_list: List of song dictionaries to save
+        upsert: Write with ON CONFLICT (play_key) DO NOTHING semantics
+                (default: SUPABASE_INGEST_MODE setting)
+        chunk_size: Rows per request (default: SUPABASE_WRITE_CHUNK_SIZE or 500)
+        max_attempts: Tries per chunk for transient errors (default: 4)
+        compress: Gzip request bodies (default: SUPABASE_GZIP_WRITES setting)
+
+    Returns:
+        Dictionary with 'saved' (row count), 'failed' (rows not written),
+        'rejected' (the subset of failed rows the database refused outright) and
+        'chunks' (per-request rows, attempts, status and seconds)
+    """
+    logger = get_logger()
+    report = {'saved': 0, 'failed': [], 'rejected': [], 'chunks': []}
+
+    if not song_list:
+        return report
+
+    if upsert is None:
+        upsert = is_upsert_mode()
+    if chunk_size is None:
+        chunk_size = safe_int(get_config_value('SUPABASE_WRITE_CHUNK_SIZE', DEFAULT_WRITE_CHUNK_SIZE),
+                              DEFAULT_WRITE_CHUNK_SIZE)
+    if max_attempts is None:
+        max_attempts = safe_int(get_config_value('SUPABASE_WRITE_ATTEMPTS', 4), 4)
+    if compress is None:
+        compress = str(get_config_value('SUPABASE_GZIP_WRITES', '')).lower() in ('1', 'true', 'yes')
+
+    endpoint = f"{SONGS_TABLE}"
+    request_headers = {}
+    payload = [strip_time_fields(song) for song in song_list]
+
+    if upsert:
+        # Rows that already exist are skipped by the database in the same write
+        endpoint = f"{SONGS_TABLE}?on_conflict=play_key"
+        request_headers['Prefer'] = 'resolution=ignore-duplicates,return=minimal'
+        payload = [dict(song, play_key=song.get('play_key') or make_play_key(song)) for song in payload]
+
+    # Work stack of pending chunks; bisected halves are pushed back in order
+    pending = list(reversed(list(chunks(payload, max(1, chunk_size)))))
+
+    while pending:
+        chunk = pending.pop()
+        started = time.perf_counter()
+        attempt = 0
+        error = None
+        status_code = None
+
+        while True:
+            attempt += 1
+            try:
+                response = _post_chunk(endpoint, chunk, request_headers, compress)
+                status_code = response.status_code
+                response.raise_for_status()
+                error = None
+                break
+            except requests.RequestException as e:
+                error = e
+                if getattr(e, 'response', None) is not None:
+                    status_code = e.response.status_code
+                if attempt >= max_attempts or not _is_retryable(e, status_code, upsert):
+                    break
+                delay = WRITE_BACKOFF_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                logger.warning(f"Chunk of {len(chunk)} rows failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        elapsed = time.perf_counter() - started
+        report['chunks'].append({'rows': len(chunk), 'attempts': attempt,
+                                 'status': status_code, 'seconds': elapsed})
+        logger.debug(f"Chunk of {len(chunk)} rows: status {status_code} after {attempt} attempts in {elapsed:.3f}s")
+
+        if error is None:
+            report['saved'] += len(chunk)
+            continue
+
+        rejected = status_code is not None and 400 <= status_code < 500 and status_code not in (408, 429)
+        if rejected and len(chunk) > 1:
+            # Split and retry each half to isolate the rows the database refuses
+            middle = len(chunk) // 2
+            pending.append(chunk[middle:])
+            pending.append(chunk[:middle])
+            continue
+
+        logger.error("Error saving to database: %s", error)
+        if getattr(error, 'response', None) is not None:
+            logger.error("Response status: %s", error.response.status_code)
+            logger.error("Response body: %s", error.response.text)
+        report['failed'].extend(chunk)
+        if rejected:
+            report['rejected'].extend(chunk)
+
+    return report
+
+
+def save_songs(song_list, upsert=None):
     """
     Save songs to Supabase database
     
     Args:
         song_list: List of song dictionaries to save
+        upsert: Write with ON CONFLICT (play_key) DO NOTHING semantics
+                (default: SUPABASE_INGEST_MODE setting)
         
     Returns:
-        Boolean indicating success
+        Boolean indicating every song was saved
     """
     logger = get_logger()
     
@@ -161,21 +870,17 @@ def save_songs(song_list):
         logger.info("No songs to save")
         return True
     
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}"
+    report = write_songs(song_list, upsert=upsert)
+    total_seconds = sum(chunk['seconds'] for chunk in report['chunks'])
     
-    try:
-        response = requests.post(endpoint, headers=headers, json=song_list, timeout=10)
-        response.raise_for_status()
-        
-        logger.info("Successfully saved %s songs to database", len(song_list))
-        return True
-        
-    except requests.RequestException as e:
-        logger.error("Error saving to database: %s", e)
-        if hasattr(e, 'response') and e.response is not None:
-            logger.error("Response status: %s", e.response.status_code)
-            logger.error("Response body: %s", e.response.text)
+    if report['failed']:
+        logger.error(f"Saved {report['saved']} of {len(song_list)} songs; {len(report['failed'])} rejected "
+                     f"({len(report['chunks'])} requests, {total_seconds:.2f}s)")
         return False
+    
+    logger.info(f"Successfully saved {len(song_list)} songs to database "
+                f"({len(report['chunks'])} requests, {total_seconds:.2f}s)")
+    return True
 
 
 def group_songs_by_hour(songs_data):
@@ -195,11 +900,9 @@ def group_songs_by_hour(songs_data):
     hourly_history = defaultdict(list)
 
     for song in songs_data:
-        # Parse the ISO timestamp (UTC) and convert to Central Time for grouping
-        dt_utc = datetime.fromisoformat(song['played_at'].replace('Z', '')).replace(tzinfo=timezone.utc)
-        dt_central = dt_utc.astimezone(CENTRAL_TZ)
-        hour_key = dt_central.strftime("%H:00")
-        hourly_history[hour_key].append(song)
+        # Central hour precomputed at read time (computed here for rows that weren't)
+        _, local_hour = local_time_fields(song)
+        hourly_history[f"{local_hour:02d}:00"].append(song)
 
     # Structure history list for compatibility with existing analysis
     history = []
@@ -228,33 +931,22 @@ def check_for_duplicates(songs_to_check):
     if not songs_to_check:
         return []
     
-    # Get played_at times to check and normalize format
-    timestamps = []
-    for song in songs_to_check:
-        # Parse and re-format to ensure consistent timestamp format
-        dt = parse_datetime_robust(song['played_at'])
-        # Store as ISO with Z suffix for consistency
-        normalized_ts = dt.isoformat().replace('+00:00', 'Z')
-        timestamps.append(normalized_ts)
+    # Compare plays as epoch microseconds so formatting differences don't matter
+    timestamps = [played_ts(song) for song in songs_to_check]
     
     # Query existing songs with these timestamps
     # Use URL encoding for the timestamp values
-    timestamp_filter = ",".join(urllib.parse.quote(f'"{ts}"') for ts in timestamps)
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}?played_at=in.({timestamp_filter})&select=played_at"
+    timestamp_filter = ",".join(urllib.parse.quote(f'"{epoch_micros_to_iso(ts)}"') for ts in timestamps)
+    endpoint = f"{SONGS_TABLE}?played_at=in.({timestamp_filter})&select=played_at"
     
     try:
         logger.debug("Duplicate check endpoint: %s", endpoint)
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = get_client().get(endpoint)
         response.raise_for_status()
         existing_songs = response.json()
         logger.debug("Found %s existing songs in database", len(existing_songs))
         
-        # Normalize existing timestamps for comparison
-        existing_timestamps = set()
-        for song in existing_songs:
-            dt = parse_datetime_robust(song['played_at'])
-            normalized_ts = dt.isoformat().replace('+00:00', 'Z')
-            existing_timestamps.add(normalized_ts)
+        existing_timestamps = {to_epoch_micros(song['played_at']) for song in existing_songs}
         
         # Filter out songs that already exist using normalized timestamps
         new_songs = []
@@ -271,10 +963,32 @@ def check_for_duplicates(songs_to_check):
         return songs_to_check
 
 
+def content_key(song):
+    """
+    Build a normalized song+artist key for content-based duplicate matching
+
+    Case and runs of whitespace are ignored, so "Body Gold " and "body gold"
+    by the same artist count as the same song.
+
+    Args:
+        song: Song dictionary with 'song' and 'artist' fields
+
+    Returns:
+        Tuple of (normalized song, normalized artist)
+    """
+    title = ' '.join(str(song.get('song') or '').split()).casefold()
+    artist = ' '.join(str(song.get('artist') or '').split()).casefold()
+    return title, artist
+
+
 def check_youtube_music_duplicates(songs_to_check, hours_back=2):
     """
     Check if YouTube Music songs already exist in database using content-based matching
     
+    Pulls every YouTube Music row created in the window with one (paged) query
+    and matches locally against a set of normalized song+artist keys, so the
+    network cost doesn't grow with the number of songs being checked.
+    
     Args:
         songs_to_check: List of YouTube Music song dictionaries
         hours_back: Number of hours to look back for duplicates (default: 2)
@@ -294,67 +1008,32 @@ def check_youtube_music_duplicates(songs_to_check, hours_back=2):
         return songs_to_check  # No YouTube Music songs to check
     
     # Calculate time window (last N hours) based on created_at for more reliable duplicate detection
-    from datetime import datetime, timedelta, timezone
     now = datetime.now(timezone.utc)
     cutoff_time = now - timedelta(hours=hours_back)
     cutoff_iso = cutoff_time.isoformat().replace('+00:00', 'Z')
     
     try:
-        # Create list of song+artist+album combinations to check
-        content_checks = []
-        song_lookup = {}  # Map content to original song
-        
-        for song in youtube_songs:
-            content_key = f"{song.get('song', '')}-{song.get('artist', '')}-{song.get('album', '')}"
-            content_checks.append(content_key)
-            song_lookup[content_key] = song
-        
-        # Query database for songs with same content in the time window
-        # We'll check each combination individually to avoid URL length issues
+        # One windowed query for all recent YouTube Music rows, projected to song/artist.
+        # Song+artist only (not album) so the same song on a single/compilation still matches.
+        filters = ["source=eq.YoutubeMusic", f"created_at=gte.{cutoff_iso}"]
         existing_content = set()
+        for page in iter_song_pages(filters, columns=('song', 'artist'), order_by='created_at'):
+            for row in page:
+                existing_content.add(content_key(row))
+        logger.debug("Found %s recent YouTube Music songs in database", len(existing_content))
         
-        for song in youtube_songs:
-            song_name = song.get('song', '')
-            artist_name = song.get('artist', '')
-            album_name = song.get('album', '')
-            
-            # Query for song+artist combination (more flexible than requiring exact album match)
-            # This handles cases where same song appears on different albums/singles/compilations
-            # Use created_at instead of played_at for more reliable duplicate detection
-            endpoint = (f"{SUPABASE_URL}/rest/v1/{SONGS_TABLE}"
-                       f"?song=eq.{urllib.parse.quote(song_name)}"
-                       f"&artist=eq.{urllib.parse.quote(artist_name)}"
-                       f"&source=eq.YoutubeMusic"
-                       f"&created_at=gte.{cutoff_iso}"
-                       f"&select=song,artist,album,created_at")
-            
-            response = requests.get(endpoint, headers=headers, timeout=10)
-            response.raise_for_status()
-            matches = response.json()
-            
-            if matches:
-                # Use song+artist only for content key (more flexible)
-                content_key = f"{song.get('song', '')}-{song.get('artist', '')}"
-                existing_content.add(content_key)
-                logger.debug(f"Found existing YouTube Music song: {song_name} by {artist_name} (created: {matches[0].get('created_at', 'N/A')})")
-        
-        # Filter out songs that already exist in database (using song+artist key)
-        database_filtered = []
-        for song in youtube_songs:
-            content_key = f"{song.get('song', '')}-{song.get('artist', '')}"
-            if content_key not in existing_content:
-                database_filtered.append(song)
-        
-        # Also filter out duplicates within the batch itself (in-batch deduplication)
+        # Filter out songs already in the database and duplicates within the batch itself
         seen_in_batch = set()
         batch_filtered = []
-        for song in database_filtered:
-            content_key = f"{song.get('song', '')}-{song.get('artist', '')}"
-            if content_key not in seen_in_batch:
-                seen_in_batch.add(content_key)
-                batch_filtered.append(song)
-            else:
+        for song in youtube_songs:
+            key = content_key(song)
+            if key in existing_content:
+                logger.debug(f"Found existing YouTube Music song: {song.get('song', '')} by {song.get('artist', '')}")
+            elif key in seen_in_batch:
                 logger.debug(f"Filtered in-batch duplicate: {song.get('song', '')} by {song.get('artist', '')}")
+            else:
+                seen_in_batch.add(key)
+                batch_filtered.append(song)
         
         # Add back any non-YouTube Music songs
         non_youtube_songs = [song for song in songs_to_check if song.get('source') != 'YoutubeMusic']
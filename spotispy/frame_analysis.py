@@ -0,0 +1,342 @@
+"""
+Columnar (pandas/NumPy) analysis backend
+
+Plays are loaded once into a DataFrame with categorical song/artist/album
+columns, integer played_ts and Central local_hour, and the daily and weekly
+metrics are computed with array operations instead of per-play dict loops.
+
+Every function here returns the same shape as its pure-Python counterpart in
+spotispy.analysis or spotispy.weekly_analysis, including the order of dict
+keys and list entries, so the two backends are interchangeable. Select it
+with SPOTISPY_ANALYSIS_BACKEND=pandas. Weighted energy/mood averages are
+summed pairwise, so they can differ from the Python backend in the last bits
+before rounding.
+
+Requires pandas (listed in requirements.txt).
+"""
+
+from spotispy.helpers import format_time_duration
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pragma: no cover - exercised only without pandas installed
+    np = None
+    pd = None
+
+CATEGORY_COLUMNS = ('song', 'artist', 'album')
+
+
+def _require_pandas():
+    if pd is None:
+        raise RuntimeError("The pandas analysis backend needs pandas: pip install pandas")
+
+
+def songs_to_frame(songs):
+    """
+    Build the columnar representation of a list of plays
+
+    Rows without played_at get played_ts 0 and local_hour -1.
+
+    Args:
+        songs: List of song dictionaries
+
+    Returns:
+        DataFrame with one row per play, in input order
+    """
+    from spotispy.database import add_time_fields
+
+    _require_pandas()
+    add_time_fields(songs)
+
+    data = {column: pd.Categorical([song.get(column) for song in songs]) for column in CATEGORY_COLUMNS}
+    data['duration'] = np.array([song.get('duration', 0) for song in songs], dtype='float64')
+    data['played_ts'] = np.array([song.get('played_ts', 0) for song in songs], dtype='int64')
+    data['local_hour'] = np.array([song.get('local_hour', -1) for song in songs], dtype='int64')
+    data['song_popularity'] = np.array([int(song.get('song_popularity', 0)) for song in songs], dtype='int64')
+    for column in ('energy', 'valence'):
+        data[column] = np.array([song.get(column, np.nan) for song in songs], dtype='float64')
+    return pd.DataFrame(data)
+
+
+def songs_by_day_to_frame(songs_by_day):
+    """
+    Build one frame from a songs_by_day dictionary
+
+    The 'day' column is categorical with the dictionary's keys as categories
+    in dictionary order, so empty days are still represented.
+
+    Args:
+        songs_by_day: Dictionary with date keys and song lists as values
+
+    Returns:
+        DataFrame with one row per play, days in dictionary order
+    """
+    _require_pandas()
+    songs = []
+    days = []
+    for date, day_songs in songs_by_day.items():
+        songs.extend(day_songs)
+        days.extend([date] * len(day_songs))
+    frame = songs_to_frame(songs)
+    frame['day'] = pd.Categorical(days, categories=list(songs_by_day))
+    return frame
+
+
+def _walk_order(hours):
+    """
+    Row order of the nested hour walk: hours by first appearance, plays in input order
+
+    Returns:
+        Tuple of (row indices in walk order, hours in first-seen order)
+    """
+    unique_hours, first_rows = np.unique(hours, return_index=True)
+    hour_order = unique_hours[np.argsort(first_rows)]
+    rank_of_hour = np.zeros(24, dtype='int64')
+    rank_of_hour[hour_order] = np.arange(len(hour_order))
+    return np.argsort(rank_of_hour[hours], kind='stable'), hour_order
+
+
+def _repeated_items(frame, walk, item_type):
+    """Vectorized find_top_items over rows already in walk order"""
+    names = frame[item_type].cat.categories
+    artist_names = frame['artist'].cat.categories
+    item = frame[item_type].cat.codes.to_numpy()[walk].astype('int64')
+    if item_type == 'artist':
+        width = 1
+        codes = item
+    else:
+        # One integer per (item, artist) pair instead of a formatted string key
+        width = len(artist_names)
+        artist = frame['artist'].cat.codes.to_numpy()[walk].astype('int64')
+        codes = item * width + artist
+        codes[(item < 0) | (artist < 0)] = -1
+
+    valid = codes >= 0
+    unique_codes, first_rows, counts = np.unique(codes[valid], return_index=True, return_counts=True)
+    order = np.argsort(first_rows)
+
+    repeated = {}
+    for code, count in zip(unique_codes[order], counts[order]):
+        if count <= 1:
+            continue
+        if item_type == 'artist':
+            label = names[code]
+        else:
+            label = f"{names[code // width]} by {artist_names[code % width]}"
+        repeated[label] = int(count)
+    return repeated
+
+
+def _leaderboard(frame, item_type):
+    """Vectorized DailyAccumulator leaderboard: items in first-played order"""
+    from spotispy.leaderboards import Leaderboard
+
+    names = frame[item_type].cat.categories
+    artist_names = frame['artist'].cat.categories
+    item = frame[item_type].cat.codes.to_numpy().astype('int64')
+    width = 1 if item_type == 'artist' else len(artist_names)
+    if item_type == 'artist':
+        codes = item
+    else:
+        artist = frame['artist'].cat.codes.to_numpy().astype('int64')
+        codes = item * width + artist
+        codes[(item < 0) | (artist < 0)] = -1
+
+    valid = codes >= 0
+    unique_codes, first_rows, inverse, counts = np.unique(
+        codes[valid], return_index=True, return_inverse=True, return_counts=True)
+    seconds = np.bincount(inverse, weights=frame['duration'].to_numpy()[valid], minlength=len(unique_codes))
+
+    entries = {}
+    for i in np.argsort(first_rows):
+        code = unique_codes[i]
+        if item_type == 'artist':
+            key = names[code]
+        else:
+            key = (names[code // width], artist_names[code % width])
+        entries[key] = [int(counts[i]), float(seconds[i])]
+    return Leaderboard(item_type, entries)
+
+
+def _weighted_percentage(values, durations):
+    """Duration-weighted average of a 0-1 feature as a percentage, skipping missing values"""
+    present = ~np.isnan(values)
+    total_duration = durations[present].sum()
+    if total_duration == 0:
+        return 0
+    return round(float((values[present] * durations[present]).sum() / total_duration) * 100, 1)
+
+
+def analyze_listening_day_frame(raw_songs, lean=False, leaderboards=False):
+    """
+    Columnar version of analyze_listening_day
+
+    Args:
+        raw_songs: Non-empty list of song dictionaries with played_at
+        lean: If True, leave out raw_data and structured_data
+        leaderboards: If True, also return 'leaderboards' (kind -> Leaderboard)
+
+    Returns:
+        Dictionary with all analysis results (same shape as analyze_listening_day)
+    """
+    from spotispy.analysis import format_duration, format_listening_seconds
+
+    frame = songs_to_frame(raw_songs)
+    hours = frame['local_hour'].to_numpy()
+    durations = frame['duration'].to_numpy()
+    walk, hour_order = _walk_order(hours)
+
+    # bincount adds in input order, so per-hour sums match the Python loop exactly
+    hour_seconds = np.bincount(hours, weights=durations, minlength=24).astype('int64')[hour_order]
+    total_seconds = int(hour_seconds.sum())
+    hour_minutes = hour_seconds // 60 + hour_seconds % 60 / 60
+
+    peak_hour, peak_minutes = None, 0
+    if len(hour_minutes) and hour_minutes.max() > 0:
+        peak_rank = int(np.argmax(hour_minutes))
+        peak_hour = f"{hour_order[peak_rank]:02d}:00"
+        peak_minutes = float(hour_minutes[peak_rank])
+
+    popularity = frame['song_popularity'].to_numpy()[walk]
+    most_popular = raw_songs[walk[int(np.argmax(popularity))]] if popularity.max() > 0 else None
+
+    # The nested structure is part of the full result, so it is still built (from index arrays)
+    walk_hours = hours[walk]
+    boundaries = np.flatnonzero(np.diff(walk_hours)) + 1
+    history = []
+    for rank, rows in enumerate(np.split(walk, boundaries) if not lean else ()):
+        history.append({f"{hour_order[rank]:02d}:00": {
+            'songs': [raw_songs[row] for row in rows],
+            'minutes_listened': format_duration(hour_seconds[rank])
+        }})
+
+    hours_part, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    results = {
+        'total_songs': len(raw_songs),
+        'total_time': f'{hours_part:02}:{minutes:02}:{seconds:02}',
+        'total_time_formatted': format_listening_seconds(durations.sum()),
+        'top_songs': _repeated_items(frame, walk, 'song'),
+        'top_artists': _repeated_items(frame, walk, 'artist'),
+        'top_albums': _repeated_items(frame, walk, 'album'),
+        'most_popular': most_popular,
+        'peak_hour': peak_hour,
+        'peak_minutes': peak_minutes,
+        'energy_level': _weighted_percentage(frame['energy'].to_numpy(), durations),
+        'mood_level': _weighted_percentage(frame['valence'].to_numpy(), durations)
+    }
+    if leaderboards:
+        results['leaderboards'] = {kind: _leaderboard(frame, kind) for kind in CATEGORY_COLUMNS}
+    if not lean:
+        results['raw_data'] = raw_songs
+        results['structured_data'] = {'history': history}
+    return results
+
+
+def hourly_totals_frame(frame):
+    """
+    Listening seconds per Central hour
+
+    Args:
+        frame: DataFrame from songs_to_frame
+
+    Returns:
+        NumPy array of 24 floats indexed by hour
+    """
+    hours = frame['local_hour'].to_numpy()
+    present = hours >= 0
+    return np.bincount(hours[present], weights=frame['duration'].to_numpy()[present], minlength=24)
+
+
+def daily_totals_frame(frame):
+    """
+    Columnar version of calculate_daily_totals
+
+    Args:
+        frame: DataFrame from songs_by_day_to_frame
+
+    Returns:
+        Dictionary with daily statistics, days in category order
+    """
+    from spotispy.weekly_analysis import _day_stats
+
+    days = frame['day']
+    codes = days.cat.codes.to_numpy()
+    size = len(days.cat.categories)
+    counts = np.bincount(codes, minlength=size)
+    seconds = np.bincount(codes, weights=frame['duration'].to_numpy(), minlength=size)
+    return {date: _day_stats(int(counts[i]), float(seconds[i])) for i, date in enumerate(days.cat.categories)}
+
+
+def top_artists_frame(frame, limit=5):
+    """
+    Columnar version of find_weekly_top_artists
+
+    Ties on seconds are broken by play count, then by first appearance, as
+    Leaderboard.top does.
+
+    Args:
+        frame: DataFrame from songs_to_frame or songs_by_day_to_frame
+        limit: Number of top artists to return
+
+    Returns:
+        List of tuples (artist, total_seconds, song_count)
+    """
+    codes, artists = pd.factorize(frame['artist'].astype(object).fillna('Unknown Artist'), sort=False)
+    seconds = np.bincount(codes, weights=frame['duration'].to_numpy(), minlength=len(artists))
+    counts = np.bincount(codes, minlength=len(artists))
+    order = np.lexsort((-counts, -seconds))[:limit]
+    return [(artists[i], float(seconds[i]), int(counts[i])) for i in order]
+
+
+def album_binges_frame(frame, min_consecutive=3, gap_seconds=None):
+    """
+    Columnar version of detect_album_binges, using run-length encoding
+
+    Runs are found over every play sorted by played_ts, so they carry on
+    across midnight; a silence longer than the session gap ends one.
+
+    Args:
+        frame: DataFrame from songs_by_day_to_frame
+        min_consecutive: Minimum consecutive songs to count as a binge
+        gap_seconds: Silence that ends a run (default: SPOTISPY_SESSION_GAP_MINUTES)
+
+    Returns:
+        List of album binge sessions, longest first
+    """
+    from spotispy.sessions import album_runs, get_session_gap_seconds
+
+    rows = np.flatnonzero(frame['local_hour'].to_numpy() >= 0)
+    if not len(rows):
+        return []
+
+    rows = rows[np.argsort(frame['played_ts'].to_numpy()[rows], kind='stable')]
+    ts = frame['played_ts'].to_numpy()[rows]
+    durations = frame['duration'].to_numpy()[rows]
+    ends = ts + (durations * 1_000_000).astype('int64')
+    day = frame['day'].cat.codes.to_numpy()[rows]
+    album, album_names = pd.factorize(frame['album'].astype(object).fillna('').to_numpy()[rows])
+    artist, artist_names = pd.factorize(frame['artist'].astype(object).fillna('').to_numpy()[rows])
+
+    first, last, counts, seconds = album_runs(ts, ends, durations, album, artist,
+                                              get_session_gap_seconds(gap_seconds))
+
+    dates = frame['day'].cat.categories
+    binges = []
+    for run in np.flatnonzero(counts >= min_consecutive):
+        total_duration = float(seconds[run])
+        binges.append({
+            'date': dates[day[first[run]]],
+            'end_date': dates[day[last[run]]],
+            'album': album_names[album[first[run]]],
+            'artist': artist_names[artist[first[run]]],
+            'song_count': int(counts[run]),
+            'total_duration': total_duration,
+            'formatted_duration': format_time_duration(total_duration),
+            'start_ts': int(ts[first[run]]),
+            'end_ts': int(ends[last[run]])
+        })
+
+    return sorted(binges, key=lambda x: x['total_duration'], reverse=True)
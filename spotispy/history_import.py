@@ -0,0 +1,284 @@
+"""
+Bulk importer for the historical data/*.xlsx exports
+
+Each workbook holds one day, one sheet per hour ('0900', '1400', ...), with
+headerless rows of:
+
+    song, artist, album, duration, release_date, played_at, song_popularity
+
+Workbooks are parsed across a process pool, normalized into the save_songs
+schema and loaded into the database, the local store and/or the Parquet
+archive. A checkpoint file records each imported workbook's size, mtime and
+hash, so re-runs only parse files that are new or changed.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from spotispy.helpers import get_logger, chunks
+
+# Columns of the 7-column export sheets, in order
+SHEET_COLUMNS = ('song', 'artist', 'album', 'duration', 'release_date', 'played_at', 'song_popularity')
+
+CHECKPOINT_FILE = '.import_checkpoint.json'
+
+TARGETS = ('database', 'local', 'archive')
+
+
+def default_data_dir():
+    """Get the default export directory (project root data/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'data')
+
+
+def _cell_text(value):
+    """Convert a cell to a stripped string (None for empty cells)"""
+    if value is None or value != value:  # NaN
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value).strip()
+
+
+def normalize_row(row):
+    """
+    Convert one sheet row into a save_songs dictionary
+
+    Args:
+        row: Sequence of cell values in SHEET_COLUMNS order
+
+    Returns:
+        Song dictionary, or None if the row has no usable song or timestamp
+    """
+    from spotispy.spotify import normalize_release_date
+
+    if len(row) < len(SHEET_COLUMNS):
+        return None
+    song, artist, album, duration, release_date, played_at, popularity = row[:len(SHEET_COLUMNS)]
+
+    played_at = _cell_text(played_at)
+    song = _cell_text(song)
+    if not song or not played_at:
+        return None
+    try:
+        played_at = datetime.fromisoformat(played_at.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if played_at.tzinfo is None:
+        played_at = played_at.replace(tzinfo=timezone.utc)
+
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 0.0
+    try:
+        popularity = int(popularity)
+    except (TypeError, ValueError):
+        popularity = 0
+
+    return {
+        "album": _cell_text(album) or 'Unknown Album',
+        "artist": _cell_text(artist) or 'Unknown Artist',
+        "duration": 0.0 if duration != duration else duration,
+        "played_at": played_at.isoformat(),
+        "release_date": normalize_release_date(_cell_text(release_date)),
+        "song": song,
+        "song_popularity": popularity,
+    }
+
+
+def parse_workbook(path):
+    """
+    Parse every hour sheet of one export workbook
+
+    Sheets without the full 7 columns (early exports kept only song and
+    artist, with no timestamp) are skipped.
+
+    Args:
+        path: Path to an .xlsx file
+
+    Returns:
+        List of song dictionaries ordered by played_at
+    """
+    import pandas as pd
+
+    songs = []
+    sheets = pd.read_excel(path, sheet_name=None, header=None)
+    for frame in sheets.values():
+        if frame.shape[1] < len(SHEET_COLUMNS):
+            continue
+        for row in frame.itertuples(index=False, name=None):
+            song = normalize_row(row)
+            if song:
+                songs.append(song)
+    songs.sort(key=lambda song: song['played_at'])
+    return songs
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImportCheckpoint:
+    """Per-file record of what has already been imported"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def needs_import(self, path):
+        """
+        Check whether a workbook is new or changed since its last import
+
+        Size and mtime are compared first; the content hash is only computed
+        when they differ, so touching a file doesn't force a re-import.
+        """
+        entry = self.entries.get(os.path.basename(path))
+        if entry is None:
+            return True
+        stat = os.stat(path)
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return False
+        if entry['size'] == stat.st_size and entry['sha256'] == _file_hash(path):
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return False
+        return True
+
+    def mark_imported(self, path, rows):
+        """Record a workbook as imported and persist the checkpoint"""
+        stat = os.stat(path)
+        self.entries[os.path.basename(path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': _file_hash(path),
+            'rows': rows,
+            'imported_at': datetime.now(timezone.utc).isoformat(),
+        }
+        self.save()
+
+    def save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def dedupe_songs(songs):
+    """Drop repeated plays within a batch (same play_key)"""
+    from spotispy.database import make_play_key
+
+    seen = set()
+    unique = []
+    for song in songs:
+        key = make_play_key(song)
+        if key not in seen:
+            seen.add(key)
+            unique.append(song)
+    return unique
+
+
+def load_songs(songs, targets):
+    """
+    Load one workbook's songs into each target, skipping plays already there
+
+    Args:
+        songs: List of song dictionaries
+        targets: Iterable of 'database', 'local' and/or 'archive'
+
+    Returns:
+        Boolean indicating every target accepted the songs
+    """
+    from spotispy.database import DUPLICATE_CHECK_BATCH, check_for_duplicates, is_upsert_mode, write_songs
+
+    success = True
+    if 'database' in targets:
+        if is_upsert_mode():
+            # play_key conflicts are ignored by the database itself
+            report = write_songs(songs, upsert=True)
+        else:
+            # Batched so the lookup URL stays short; a failed lookup would pass every row as new
+            new_songs = [song for batch in chunks(songs, DUPLICATE_CHECK_BATCH)
+                         for song in check_for_duplicates(batch)]
+            report = write_songs(new_songs, upsert=False) if new_songs else {'failed': []}
+        success = success and not report['failed']
+
+    if 'local' in targets:
+        # Placeholder ids are content-based, so re-imports replace rather than duplicate
+        from spotispy.local_store import get_local_store
+        get_local_store().upsert_songs(songs)
+
+    if 'archive' in targets:
+        # Partitions are merged by play, so re-imports are idempotent
+        from spotispy.archive import write_songs_to_archive
+        write_songs_to_archive(songs)
+
+    return success
+
+
+def import_history(data_dir=None, targets=('database',), workers=None, force=False, dry_run=False):
+    """
+    Import every new or changed workbook in the export directory
+
+    Args:
+        data_dir: Directory of .xlsx exports (default: data/)
+        targets: Where to load songs: 'database', 'local' and/or 'archive'
+        workers: Parser processes (default: CPU count)
+        force: Re-import files even if the checkpoint says they are current
+        dry_run: Parse and count only; load nothing and keep the checkpoint as-is
+
+    Returns:
+        Dictionary with 'files', 'songs' and 'failed' (list of file names)
+    """
+    logger = get_logger()
+    data_dir = data_dir or default_data_dir()
+    checkpoint = ImportCheckpoint(os.path.join(data_dir, CHECKPOINT_FILE))
+
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir)
+                   if name.endswith('.xlsx') and not name.startswith('~$'))
+    pending = [path for path in paths if force or checkpoint.needs_import(path)]
+    logger.info(f"{len(pending)} of {len(paths)} workbooks to import into {', '.join(targets)}")
+
+    summary = {'files': 0, 'songs': 0, 'failed': []}
+    if not pending:
+        if not dry_run:
+            # Keep the mtimes needs_import refreshed for touched, unchanged files
+            checkpoint.save()
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_workbook, path): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            name = os.path.basename(path)
+            try:
+                songs = dedupe_songs(future.result())
+            except Exception as e:
+                logger.error(f"Could not parse {name}: {e}")
+                summary['failed'].append(name)
+                continue
+
+            if dry_run:
+                logger.info(f"{name}: {len(songs)} songs (dry run)")
+            elif not songs or load_songs(songs, targets):
+                checkpoint.mark_imported(path, len(songs))
+            else:
+                logger.error(f"Could not load {name}; it will be retried next run")
+                summary['failed'].append(name)
+                continue
+
+            summary['files'] += 1
+            summary['songs'] += len(songs)
+
+    logger.info(f"Imported {summary['songs']} songs from {summary['files']} workbooks "
+                f"({len(summary['failed'])} failed)")
+    return summary
@@ -0,0 +1,182 @@
+"""
+Ranked leaderboards
+
+A Leaderboard counts plays and listening seconds per item and ranks them on
+demand. Items are keyed by tuple IDs rather than formatted strings: a song or
+album is (name, artist) and an artist is its name, the same keys the daily
+accumulator and the live window use. Labels like "Song by Artist" are only
+built for the handful of entries that are actually shown.
+
+Ranking uses a bounded heap (heapq.nlargest), so taking the top 3 of a week's
+thousands of songs doesn't sort them all. Ties on the ranking value are broken
+by the other value (seconds for play counts, plays for seconds), then by the
+order items were first added.
+
+Leaderboards merge, so per-day boards can be combined into a week, a month or
+any other range without going back to the plays.
+"""
+
+import heapq
+
+KINDS = ('song', 'artist', 'album')
+RANK_BY = ('plays', 'seconds')
+
+
+def item_key(song, kind):
+    """
+    Leaderboard key for a song
+
+    Args:
+        song: Song dictionary
+        kind: 'song', 'artist' or 'album'
+
+    Returns:
+        (song, artist) or (album, artist) tuple, or the artist name
+    """
+    if kind == 'artist':
+        return song.get('artist')
+    if kind == 'song':
+        return (song.get('song'), song.get('artist'))
+    if kind == 'album':
+        return (song.get('album'), song.get('artist'))
+    raise ValueError(f"Unknown leaderboard kind {kind!r} (expected one of {', '.join(KINDS)})")
+
+
+def item_label(key):
+    """Display label for a leaderboard key: 'Name by Artist' for tuples, else the name"""
+    if isinstance(key, tuple):
+        return f"{key[0]} by {key[1]}"
+    return key
+
+
+class Leaderboard:
+    """Plays and listening seconds per item, ranked with a bounded heap"""
+
+    __slots__ = ('kind', 'entries')
+
+    def __init__(self, kind, entries=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown leaderboard kind {kind!r} (expected one of {', '.join(KINDS)})")
+        self.kind = kind
+        # Item key -> [plays, seconds], in the order items were first added
+        self.entries = entries if entries is not None else {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __eq__(self, other):
+        if not isinstance(other, Leaderboard):
+            return NotImplemented
+        return self.kind == other.kind and self.entries == other.entries
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Leaderboard({self.kind!r}, {len(self.entries)} items)"
+
+    def add(self, key, seconds=0, plays=1):
+        """Count plays (and their seconds) for one item"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [plays, seconds]
+        else:
+            entry[0] += plays
+            entry[1] += seconds
+
+    def add_songs(self, songs):
+        """Count a list of plays"""
+        for song in songs:
+            self.add(item_key(song, self.kind), song.get('duration', 0))
+        return self
+
+    def merge(self, other):
+        """
+        Fold another leaderboard of the same kind into this one
+
+        Merging is associative, so boards for consecutive days can be combined
+        in any grouping.
+
+        Returns:
+            This leaderboard
+        """
+        if other.kind != self.kind:
+            raise ValueError(f"Cannot merge a {other.kind} leaderboard into a {self.kind} leaderboard")
+        for key, (plays, seconds) in other.entries.items():
+            self.add(key, seconds, plays)
+        return self
+
+    @classmethod
+    def combine(cls, kind, boards):
+        """Merge several leaderboards into a new one (the inputs are left unchanged)"""
+        combined = cls(kind)
+        for board in boards:
+            combined.merge(board)
+        return combined
+
+    def top(self, limit=None, by='plays', min_plays=1):
+        """
+        Rank the items
+
+        Args:
+            limit: Number of entries to return (None returns every item, fully sorted)
+            by: 'plays' (ties broken by seconds) or 'seconds' (ties broken by plays)
+            min_plays: Leave out items with fewer plays than this
+
+        Returns:
+            List of (key, plays, seconds) tuples, best first
+        """
+        if by not in RANK_BY:
+            raise ValueError(f"Unknown ranking {by!r} (expected one of {', '.join(RANK_BY)})")
+
+        candidates = ((key, plays, seconds) for key, (plays, seconds) in self.entries.items()
+                      if plays >= min_plays)
+        if by == 'plays':
+            rank = lambda entry: (entry[1], entry[2])
+        else:
+            rank = lambda entry: (entry[2], entry[1])
+
+        if limit is None:
+            return sorted(candidates, key=rank, reverse=True)
+        return heapq.nlargest(limit, candidates, key=rank)
+
+    def top_labels(self, limit=3, by='plays', min_plays=1):
+        """
+        Rank the items and label them for display
+
+        Returns:
+            List of (label, plays, seconds) tuples, best first
+        """
+        return [(item_label(key), plays, seconds)
+                for key, plays, seconds in self.top(limit, by=by, min_plays=min_plays)]
+
+
+def top_counts(items, limit=3):
+    """
+    Top entries of a label -> count dictionary without sorting all of it
+
+    Ties keep the dictionary's order, as a stable sort would.
+
+    Returns:
+        List of (label, count) tuples, highest count first
+    """
+    return heapq.nlargest(limit, items.items(), key=lambda item: item[1])
+
+
+def build_leaderboards(songs, kinds=KINDS):
+    """
+    Build a leaderboard of each kind from a list of plays
+
+    Args:
+        songs: List of song dictionaries
+        kinds: Leaderboard kinds to build
+
+    Returns:
+        Dictionary of kind -> Leaderboard
+    """
+    boards = {kind: Leaderboard(kind) for kind in kinds}
+    for board in boards.values():
+        board.add_songs(songs)
+    return boards
@@ -0,0 +1,380 @@
+"""
+Live sliding-window listening stats
+
+A LiveWindow holds the plays from the last N hours (24 by default) together
+with running aggregates: play count and seconds, per-item counts, a 24-slot
+Central-hour histogram and energy/valence weighted sums. New plays are
+appended (a late one is placed with bisect) and evicted plays are dropped from
+the front, each updating the aggregates in O(1), so "the last 24 hours" is
+always available without a database scan.
+
+The collectors feed it as they spool new plays (SPOTISPY_LIVE_WINDOW=1). The
+window is snapshotted to a JSON file whenever a batch changes it and reloaded
+by the next run, so the stats survive between cron invocations. Within one
+process the window stays in memory and the snapshot is only re-read after
+another process has written it:
+
+    python -m spotispy.live_window   # Print the current window summary
+"""
+
+import bisect
+import fcntl
+import heapq
+import json
+import os
+import time
+from contextlib import contextmanager
+from spotispy.helpers import get_logger, get_config_value, safe_int, format_time_duration
+
+SNAPSHOT_VERSION = 1
+DEFAULT_WINDOW_HOURS = 24
+
+# Play tuple layout: (played_ts, song, artist, album, duration, energy, valence, local_hour)
+TS, SONG, ARTIST, ALBUM, DURATION, ENERGY, VALENCE, HOUR = range(8)
+
+
+def default_snapshot_path():
+    """Get the default snapshot location (project root, next to logs/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'live_window.json')
+
+
+def is_live_window_enabled():
+    """Check whether the collectors should feed the live window"""
+    return str(get_config_value('SPOTISPY_LIVE_WINDOW', '')).lower() in ('1', 'true', 'yes')
+
+
+def _play_tuple(song):
+    """Compact, JSON-friendly form of a song for the window"""
+    from spotispy.database import add_time_fields
+
+    add_time_fields([song])
+    return (song['played_ts'], song.get('song') or '', song.get('artist') or '', song.get('album') or '',
+            float(song.get('duration') or 0), song.get('energy'), song.get('valence'), song['local_hour'])
+
+
+def _decrement(counts, key):
+    remaining = counts[key] - 1
+    if remaining:
+        counts[key] = remaining
+    else:
+        del counts[key]
+
+
+class LiveWindow:
+    """Plays from the last window_seconds with O(1) incremental aggregates"""
+
+    def __init__(self, window_seconds=None):
+        if window_seconds is None:
+            hours = safe_int(get_config_value('SPOTISPY_LIVE_WINDOW_HOURS', DEFAULT_WINDOW_HOURS),
+                             DEFAULT_WINDOW_HOURS)
+            window_seconds = hours * 3600
+        self.window_micros = int(window_seconds * 1_000_000)
+
+        self.plays = []        # Sorted oldest first
+        self._keys = set()     # (played_ts, song, artist) of plays in the window
+        self.changes = 0       # Bumped whenever plays are added or evicted
+
+        self.total_seconds = 0.0
+        self.song_counts = {}
+        self.artist_counts = {}
+        self.album_counts = {}
+        self.hour_plays = [0] * 24
+        self.hour_seconds = [0.0] * 24
+        self.energy_sum = 0.0
+        self.energy_seconds = 0.0
+        self.valence_sum = 0.0
+        self.valence_seconds = 0.0
+
+    def __len__(self):
+        return len(self.plays)
+
+    def _apply(self, play, sign):
+        """Add (sign=1) or remove (sign=-1) one play's contribution to the aggregates"""
+        duration = play[DURATION]
+        self.total_seconds += sign * duration
+        self.hour_plays[play[HOUR]] += sign
+        self.hour_seconds[play[HOUR]] += sign * duration
+        if play[ENERGY] is not None:
+            self.energy_sum += sign * play[ENERGY] * duration
+            self.energy_seconds += sign * duration
+        if play[VALENCE] is not None:
+            self.valence_sum += sign * play[VALENCE] * duration
+            self.valence_seconds += sign * duration
+
+        items = ((self.song_counts, (play[SONG], play[ARTIST])),
+                 (self.artist_counts, play[ARTIST]),
+                 (self.album_counts, (play[ALBUM], play[ARTIST])))
+        for counts, key in items:
+            if sign > 0:
+                counts[key] = counts.get(key, 0) + 1
+            else:
+                _decrement(counts, key)
+
+    def add(self, song, now=None):
+        """
+        Add one play, evicting anything that has fallen out of the window
+
+        Plays already in the window, or older than it, are ignored.
+
+        Args:
+            song: Song dictionary with played_at
+            now: Optional epoch seconds to measure the window from (default: current time)
+
+        Returns:
+            True if the play was added
+        """
+        play = _play_tuple(song)
+        return self._add_play(play, self._now_micros(now))
+
+    def add_songs(self, songs, now=None):
+        """
+        Add a batch of plays (collectors return them newest first)
+
+        Returns:
+            Number of plays added
+        """
+        now_micros = self._now_micros(now)
+        plays = sorted((_play_tuple(song) for song in songs), key=lambda play: play[TS])
+        return sum(self._add_play(play, now_micros) for play in plays)
+
+    def _add_play(self, play, now_micros):
+        key = (play[TS], play[SONG], play[ARTIST])
+        if key in self._keys or play[TS] <= now_micros - self.window_micros:
+            self.evict(now_micros=now_micros)
+            return False
+
+        if not self.plays or play[TS] >= self.plays[-1][TS]:
+            self.plays.append(play)
+        else:
+            # Late arrival; tuples order by played_ts first, and repeats were rejected above
+            bisect.insort(self.plays, play)
+
+        self._keys.add(key)
+        self._apply(play, 1)
+        self.changes += 1
+        self.evict(now_micros=now_micros)
+        return True
+
+    def evict(self, now=None, now_micros=None):
+        """
+        Drop plays older than the window
+
+        Args:
+            now: Optional epoch seconds (default: current time)
+
+        Returns:
+            Number of plays evicted
+        """
+        if now_micros is None:
+            now_micros = self._now_micros(now)
+        cutoff = now_micros - self.window_micros
+
+        evicted = 0
+        if self.plays and self.plays[0][TS] <= cutoff:
+            evicted = bisect.bisect_left(self.plays, (cutoff + 1,))
+            for play in self.plays[:evicted]:
+                self._keys.discard((play[TS], play[SONG], play[ARTIST]))
+                self._apply(play, -1)
+            del self.plays[:evicted]
+            self.changes += 1
+
+        if not self.plays:
+            # Reset the float sums so rounding error can't accumulate across empty periods
+            self.total_seconds = self.energy_sum = self.energy_seconds = 0.0
+            self.valence_sum = self.valence_seconds = 0.0
+            self.hour_seconds = [0.0] * 24
+        return evicted
+
+    @staticmethod
+    def _now_micros(now):
+        return int((time.time() if now is None else now) * 1_000_000)
+
+    def summary(self, now=None, limit=3):
+        """
+        Summarize the current window
+
+        Args:
+            now: Optional epoch seconds to evict against first (default: current time)
+            limit: Number of top songs, artists and albums to include
+
+        Returns:
+            Dictionary with totals, leaders, the hourly histogram and energy/mood
+        """
+        from spotispy.database import epoch_micros_to_iso
+
+        self.evict(now)
+
+        def top(counts, label):
+            leaders = heapq.nlargest(limit, counts.items(), key=lambda item: item[1])
+            return [(label(key), count) for key, count in leaders]
+
+        peak_hour = None
+        if self.plays:
+            peak = max(range(24), key=lambda hour: self.hour_seconds[hour])
+            peak_hour = f"{peak:02d}:00"
+
+        total_seconds = max(self.total_seconds, 0.0)
+        return {
+            'total_songs': len(self.plays),
+            'total_seconds': total_seconds,
+            'formatted_time': format_time_duration(total_seconds),
+            'first_played_at': epoch_micros_to_iso(self.plays[0][TS]) if self.plays else None,
+            'last_played_at': epoch_micros_to_iso(self.plays[-1][TS]) if self.plays else None,
+            'top_songs': top(self.song_counts, lambda key: f"{key[0]} by {key[1]}"),
+            'top_artists': top(self.artist_counts, lambda key: key),
+            'top_albums': top(self.album_counts, lambda key: f"{key[0]} by {key[1]}"),
+            'hourly_plays': list(self.hour_plays),
+            'hourly_seconds': [max(seconds, 0.0) for seconds in self.hour_seconds],
+            'peak_hour': peak_hour,
+            'energy_level': _percentage(self.energy_sum, self.energy_seconds),
+            'mood_level': _percentage(self.valence_sum, self.valence_seconds),
+        }
+
+    def to_dict(self):
+        return {'version': SNAPSHOT_VERSION, 'window_micros': self.window_micros,
+                'plays': [list(play) for play in self.plays]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a window (and its aggregates) from to_dict() output"""
+        window = cls(window_seconds=data['window_micros'] / 1_000_000)
+        for play in data.get('plays', []):
+            play = tuple(play)
+            window.plays.append(play)
+            window._keys.add((play[TS], play[SONG], play[ARTIST]))
+            window._apply(play, 1)
+        window.plays.sort()
+        return window
+
+    def save(self, path):
+        """Write a snapshot atomically (temp file, fsync, rename)"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, window_seconds=None):
+        """
+        Load a snapshot, or start an empty window if there isn't a usable one
+
+        Args:
+            path: Snapshot file path
+            window_seconds: Window length to use (default: the snapshot's, else the configured one)
+
+        Returns:
+            LiveWindow
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(window_seconds)
+        except (OSError, ValueError) as e:
+            get_logger().warning("Ignoring unreadable live window snapshot %s: %s", path, e)
+            return cls(window_seconds)
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            return cls(window_seconds)
+        if window_seconds is not None:
+            data['window_micros'] = int(window_seconds * 1_000_000)
+        return cls.from_dict(data)
+
+
+def _percentage(weighted_sum, seconds):
+    if seconds <= 0:
+        return 0
+    return round(weighted_sum / seconds * 100, 1)
+
+
+def get_snapshot_path():
+    return get_config_value('SPOTISPY_LIVE_WINDOW_PATH') or default_snapshot_path()
+
+
+# Window held between batches in this process: (path, snapshot stamp it matches, LiveWindow)
+_cached = None
+
+
+def _snapshot_stamp(path):
+    """Modification time and size of the snapshot, to tell whether another process wrote it"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock next to the snapshot so concurrent collectors don't lose plays"""
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def record_live_plays(songs, path=None):
+    """
+    Add freshly collected plays to the snapshotted live window
+
+    No-op when the live window is disabled. The snapshot is only read when
+    another process has written it since this one last did, and only
+    rewritten when the batch changed the window.
+
+    Args:
+        songs: List of song dictionaries that were just collected
+
+    Returns:
+        Number of plays added
+    """
+    if not songs or not is_live_window_enabled():
+        return 0
+
+    global _cached
+    path = path or get_snapshot_path()
+    try:
+        with _locked(path):
+            stamp = _snapshot_stamp(path)
+            if _cached is not None and _cached[:2] == (path, stamp):
+                window = _cached[2]
+            else:
+                window = LiveWindow.load(path)
+            _cached = None  # Until the snapshot matches the window again
+
+            changes = window.changes
+            added = window.add_songs(songs)
+            if window.changes != changes:
+                window.save(path)
+                stamp = _snapshot_stamp(path)
+            _cached = (path, stamp, window)
+        return added
+    except (OSError, KeyError, ValueError) as e:
+        get_logger().error("Could not update live window: %s", e)
+        return 0
+
+
+def get_live_summary(path=None, limit=3):
+    """
+    Get the current live window summary from the snapshot
+
+    Returns:
+        Summary dictionary (see LiveWindow.summary)
+    """
+    return LiveWindow.load(path or get_snapshot_path()).summary(limit=limit)
+
+
+if __name__ == "__main__":
+    # Show what the live window holds right now
+    logger = get_logger()
+    summary = get_live_summary()
+    logger.info("Last %s: %s songs, %s, peak hour %s, energy %s%%, mood %s%%",
+                format_time_duration(LiveWindow().window_micros / 1_000_000), summary['total_songs'],
+                summary['formatted_time'], summary['peak_hour'], summary['energy_level'], summary['mood_level'])
+    for name, count in summary['top_artists']:
+        logger.info("  %s (%s plays)", name, count)
@@ -0,0 +1,488 @@
+"""
+Local SQLite mirror of the Supabase songs table
+
+Keeps a WAL-mode copy of `songs` on disk so daily and weekly reports run as
+local queries and keep working when the network blips. The mirror syncs
+incrementally from a persisted created_at high-water mark, and the read
+functions in spotispy.database use it as a read-through cache when enabled
+(SPOTISPY_LOCAL_STORE=1).
+
+The mirror also keeps per-day rollups (Central time): per-hour play counts,
+seconds and energy/valence weighted sums, and per-artist/album/song counts.
+A day's rollup is recomputed whenever rows for that day enter the mirror, so
+reports can read a handful of rollup rows instead of scanning plays.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from spotispy.helpers import get_logger, get_config_value, safe_int
+from spotispy.records import Play, ValuePool
+
+# Columns mirrored locally (anything else the remote table returns is ignored)
+SONG_COLUMNS = ('id', 'song', 'artist', 'album', 'duration', 'release_date', 'played_at',
+                'song_popularity', 'source', 'energy', 'valence', 'created_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id TEXT PRIMARY KEY,
+    song TEXT,
+    artist TEXT,
+    album TEXT,
+    duration REAL,
+    release_date TEXT,
+    played_at TEXT NOT NULL,
+    song_popularity INTEGER,
+    source TEXT,
+    energy REAL,
+    valence REAL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_songs_played_at ON songs (played_at);
+CREATE INDEX IF NOT EXISTS idx_songs_artist ON songs (artist);
+CREATE INDEX IF NOT EXISTS idx_songs_song_artist ON songs (song, artist);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS hourly_rollup (
+    local_date TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    plays INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    energy_sum REAL NOT NULL,
+    energy_seconds REAL NOT NULL,
+    valence_sum REAL NOT NULL,
+    valence_seconds REAL NOT NULL,
+    PRIMARY KEY (local_date, hour)
+);
+
+CREATE TABLE IF NOT EXISTS item_rollup (
+    local_date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    plays INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (local_date, kind, name, artist)
+);
+"""
+
+# Bump when the rollup definition changes so existing mirrors are rebuilt
+ROLLUP_VERSION = '1'
+
+# Item kinds kept in item_rollup and the songs column each is keyed on
+ROLLUP_ITEM_COLUMNS = {'artist': 'artist', 'album': 'album', 'song': 'song'}
+
+# Don't hit Supabase again if the mirror synced within this many seconds
+DEFAULT_SYNC_INTERVAL = 300
+
+
+def default_store_path():
+    """Get the default mirror location (project root, next to logs/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'spotispy_local.db')
+
+
+def is_local_store_enabled():
+    """Check whether reads should go through the local mirror"""
+    return str(get_config_value('SPOTISPY_LOCAL_STORE', '')).lower() in ('1', 'true', 'yes')
+
+
+def normalize_timestamp(value):
+    """
+    Normalize an ISO timestamp to fixed-width UTC so string order matches time order
+
+    Args:
+        value: ISO timestamp string (Z, +00:00 or naive UTC)
+
+    Returns:
+        String like '2025-03-15T10:30:00.000000+00:00'
+    """
+    from spotispy.database import parse_datetime_robust
+
+    dt = parse_datetime_robust(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _placeholder_id(song):
+    """Stable id for a collected song that hasn't come back from Supabase yet"""
+    return f"local:{normalize_timestamp(song['played_at'])}:{song.get('song')}:{song.get('artist')}"
+
+
+def _row_id(song):
+    """Use the remote id when present, otherwise a stable local id"""
+    if song.get('id'):
+        return str(song['id'])
+    return _placeholder_id(song)
+
+
+def _central_offset_modifier():
+    """SQLite datetime modifier that shifts UTC to Central time"""
+    from spotispy.database import CENTRAL_TZ
+    return f"{int(CENTRAL_TZ.utcoffset(None).total_seconds())} seconds"
+
+
+def _local_date(normalized_played_at):
+    """Central calendar date for a normalized UTC timestamp"""
+    from spotispy.database import CENTRAL_TZ
+    return datetime.fromisoformat(normalized_played_at).astimezone(CENTRAL_TZ).strftime('%Y-%m-%d')
+
+
+def _day_bounds(local_date):
+    """Normalized UTC [start, end) bounds of a Central calendar day"""
+    from spotispy.database import CENTRAL_TZ
+    start = datetime.strptime(local_date, '%Y-%m-%d').replace(tzinfo=CENTRAL_TZ)
+    return (start.astimezone(timezone.utc).isoformat(timespec='microseconds'),
+            (start + timedelta(days=1)).astimezone(timezone.utc).isoformat(timespec='microseconds'))
+
+
+class LocalStore:
+    """SQLite (WAL) mirror of the songs table with incremental sync"""
+
+    def __init__(self, path=None):
+        self.path = path or get_config_value('SPOTISPY_LOCAL_STORE_PATH') or default_store_path()
+        self.sync_interval = safe_int(
+            get_config_value('SPOTISPY_LOCAL_STORE_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL), DEFAULT_SYNC_INTERVAL)
+        self._lock = threading.Lock()
+        self._last_sync = None
+
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+        if self.get_state('rollup_version') != ROLLUP_VERSION:
+            self.rebuild_rollups()
+
+    def upsert_songs(self, songs):
+        """
+        Insert or replace songs in the mirror and refresh the affected days' rollups
+
+        A remote row replaces the placeholder written for the same play at
+        collection time, and a song without an id is skipped when the mirror
+        already has that play (same played_at, song and artist), so a play is
+        never counted twice.
+
+        Args:
+            songs: List of song dictionaries (remote rows or freshly collected songs)
+
+        Returns:
+            Number of rows written
+        """
+        played_at_index = SONG_COLUMNS.index('played_at')
+        song_index, artist_index = SONG_COLUMNS.index('song'), SONG_COLUMNS.index('artist')
+        rows = []
+        placeholders_to_drop = []
+        dates = set()
+        for song in songs:
+            row = [song.get(column) for column in SONG_COLUMNS]
+            row[0] = _row_id(song)
+            row[played_at_index] = normalize_timestamp(song['played_at'])
+            rows.append(row)
+            dates.add(_local_date(row[played_at_index]))
+            if song.get('id'):
+                placeholders_to_drop.append((_placeholder_id(song),))
+
+        placeholders = ', '.join('?' for _ in SONG_COLUMNS)
+        with self._lock, self.conn:
+            if placeholders_to_drop:
+                self.conn.executemany("DELETE FROM songs WHERE id = ?", placeholders_to_drop)
+            # A placeholder for a play the mirror already holds (e.g. the remote row synced first)
+            rows = [row for row in rows if not row[0].startswith('local:') or self.conn.execute(
+                "SELECT 1 FROM songs WHERE played_at = ? AND song IS ? AND artist IS ? AND id != ? LIMIT 1",
+                (row[played_at_index], row[song_index], row[artist_index], row[0])).fetchone() is None]
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO songs ({', '.join(SONG_COLUMNS)}) VALUES ({placeholders})", rows)
+            self._refresh_rollups(sorted(dates))
+        return len(rows)
+
+    def _refresh_rollups(self, dates):
+        """Recompute the rollup rows for the given Central dates (lock and transaction held)"""
+        modifier = _central_offset_modifier()
+        for local_date in dates:
+            start, end = _day_bounds(local_date)
+            self.conn.execute("DELETE FROM hourly_rollup WHERE local_date = ?", (local_date,))
+            self.conn.execute("DELETE FROM item_rollup WHERE local_date = ?", (local_date,))
+            self.conn.execute(
+                """
+                INSERT INTO hourly_rollup (local_date, hour, plays, seconds, energy_sum, energy_seconds,
+                                           valence_sum, valence_seconds)
+                SELECT ?, CAST(strftime('%H', substr(played_at, 1, 19), ?) AS INTEGER) AS hour,
+                       COUNT(*), TOTAL(duration),
+                       TOTAL(energy * duration), TOTAL(CASE WHEN energy IS NOT NULL THEN duration END),
+                       TOTAL(valence * duration), TOTAL(CASE WHEN valence IS NOT NULL THEN duration END)
+                FROM songs
+                WHERE played_at >= ? AND played_at < ?
+                GROUP BY hour
+                """, (local_date, modifier, start, end))
+            for kind, column in ROLLUP_ITEM_COLUMNS.items():
+                self.conn.execute(
+                    f"""
+                    INSERT INTO item_rollup (local_date, kind, name, artist, plays, seconds)
+                    SELECT ?, ?, COALESCE({column}, ''), COALESCE(artist, ''), COUNT(*), TOTAL(duration)
+                    FROM songs
+                    WHERE played_at >= ? AND played_at < ?
+                    GROUP BY 3, 4
+                    """, (local_date, kind, start, end))
+
+    def rebuild_rollups(self):
+        """Recompute every day's rollups from the mirrored plays"""
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT DISTINCT date(substr(played_at, 1, 19), ?) FROM songs",
+                (_central_offset_modifier(),)).fetchall()
+            self.conn.execute("DELETE FROM hourly_rollup")
+            self.conn.execute("DELETE FROM item_rollup")
+            self._refresh_rollups([row[0] for row in rows])
+        self.set_state('rollup_version', ROLLUP_VERSION)
+
+    def daily_totals(self, dates):
+        """
+        Get play counts and seconds per Central date from the rollups
+
+        Args:
+            dates: ISO date strings
+
+        Returns:
+            Dictionary mapping each date (in input order) to {'plays': n, 'seconds': s}
+        """
+        dates = list(dates)
+        totals = {date: {'plays': 0, 'seconds': 0.0} for date in dates}
+        if not dates:
+            return totals
+
+        marks = ', '.join('?' for _ in dates)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT local_date, SUM(plays), SUM(seconds) FROM hourly_rollup "
+                f"WHERE local_date IN ({marks}) GROUP BY local_date", dates).fetchall()
+        for local_date, plays, seconds in rows:
+            totals[local_date] = {'plays': plays, 'seconds': seconds}
+        return totals
+
+    def hourly_rollup(self, local_date):
+        """
+        Get one day's per-hour rollup rows
+
+        Args:
+            local_date: ISO date string (Central time)
+
+        Returns:
+            List of dictionaries ordered by hour
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM hourly_rollup WHERE local_date = ? ORDER BY hour", (local_date,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def top_items(self, kind, dates, limit=5):
+        """
+        Get the most listened artists, albums or songs across some dates
+
+        Args:
+            kind: 'artist', 'album' or 'song'
+            dates: ISO date strings (Central time)
+            limit: Number of items to return (None returns every item)
+
+        Returns:
+            List of dictionaries with name, artist, plays and seconds, most seconds first
+        """
+        dates = list(dates)
+        if not dates:
+            return []
+
+        marks = ', '.join('?' for _ in dates)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT name, artist, SUM(plays) AS plays, SUM(seconds) AS seconds FROM item_rollup "
+                f"WHERE kind = ? AND local_date IN ({marks}) GROUP BY name, artist "
+                f"ORDER BY seconds DESC, plays DESC, name LIMIT ?",
+                [kind, *dates, -1 if limit is None else limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def most_popular(self, local_date):
+        """
+        Get one day's most popular play (highest song_popularity)
+
+        Args:
+            local_date: ISO date string (Central time)
+
+        Returns:
+            Song dictionary with song, artist, album and song_popularity, or
+            None if no play that day has a popularity
+        """
+        start, end = _day_bounds(local_date)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT song, artist, album, song_popularity FROM songs "
+                "WHERE played_at >= ? AND played_at < ? AND song_popularity > 0 "
+                "ORDER BY song_popularity DESC, played_at DESC LIMIT 1", (start, end)).fetchone()
+        return dict(row) if row else None
+
+    def query_window(self, start, end=None, columns=None, compact=False):
+        """
+        Get songs played in [start, end) from the mirror, newest first
+
+        Args:
+            start: ISO timestamp string for the start of the window
+            end: ISO timestamp string for the end of the window (None = open-ended)
+            columns: Columns to return (None returns every mirrored column)
+            compact: If True, return lean Play records without null values
+
+        Returns:
+            List of song dictionaries
+        """
+        selected = [column for column in (columns or SONG_COLUMNS) if column in SONG_COLUMNS]
+        sql = f"SELECT {', '.join(selected)} FROM songs WHERE played_at >= ?"
+        params = [normalize_timestamp(start)]
+        if end is not None:
+            sql += " AND played_at < ?"
+            params.append(normalize_timestamp(end))
+        sql += " ORDER BY played_at DESC, id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        if compact:
+            pool = ValuePool()
+            return [Play(zip(selected, row), pool) for row in rows]
+        return [dict(row) for row in rows]
+
+    def count(self):
+        """Get the number of mirrored rows"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def get_state(self, key, default=None):
+        """Read a persisted sync value"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_state(self, key, value):
+        """Persist a sync value"""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def sync(self, force=False):
+        """
+        Pull rows created since the last sync from Supabase
+
+        Pages are applied and the high-water mark advanced one page at a time,
+        so an interrupted sync resumes where it stopped. Raises
+        requests.RequestException if Supabase can't be reached.
+
+        Args:
+            force: Sync even if the last sync was within the sync interval
+
+        Returns:
+            Number of rows pulled
+        """
+        from spotispy.database import iter_song_pages
+
+        if not force and self._last_sync is not None and time.monotonic() - self._last_sync < self.sync_interval:
+            return 0
+
+        logger = get_logger()
+        high_water = self.get_state('last_created_at')
+
+        # gte rather than gt: rows sharing the mark are simply replaced by id
+        filters = [f"created_at=gte.{urllib.parse.quote(high_water)}"] if high_water else []
+
+        pulled = 0
+        latest_played = self.get_state('last_played_at')
+        for page in iter_song_pages(filters, columns=SONG_COLUMNS, order_by='created_at', descending=False):
+            self.upsert_songs(page)
+            pulled += len(page)
+
+            page_latest = max(normalize_timestamp(song['played_at']) for song in page)
+            if latest_played is None or page_latest > latest_played:
+                latest_played = page_latest
+            self.set_state('last_created_at', page[-1]['created_at'])
+            self.set_state('last_played_at', latest_played)
+
+        self.set_state('last_sync_at', datetime.now(timezone.utc).isoformat())
+        self._last_sync = time.monotonic()
+        logger.info("Local store synced %s rows (%s total)", pulled, self.count())
+        return pulled
+
+    def close(self):
+        self.conn.close()
+
+
+# Global store instance shared by the database read functions
+_store = None
+
+def get_local_store():
+    """Get the shared local store (opened on first use)"""
+    global _store
+    if _store is None:
+        _store = LocalStore()
+    return _store
+
+
+def get_synced_local_store():
+    """
+    Get the shared store after syncing new rows, for reads
+
+    If Supabase is unreachable the mirror is returned as-is.
+
+    Returns:
+        LocalStore, or None if the mirror is disabled or unusable
+    """
+    import requests
+
+    if not is_local_store_enabled():
+        return None
+
+    logger = get_logger()
+    try:
+        store = get_local_store()
+        try:
+            store.sync()
+        except requests.RequestException as e:
+            logger.warning("Local store sync failed, serving mirrored rows: %s", e)
+        return store
+    except sqlite3.Error as e:
+        logger.error("Local store unavailable, reading from Supabase: %s", e)
+        return None
+
+
+def record_plays(songs):
+    """
+    Add freshly collected plays to the mirror so rollups update at collection time
+
+    No-op when the mirror is disabled. The remote rows replace these
+    placeholders on the next sync.
+
+    Args:
+        songs: List of song dictionaries that were just saved
+    """
+    if not songs or not is_local_store_enabled():
+        return
+
+    try:
+        get_local_store().upsert_songs(songs)
+    except sqlite3.Error as e:
+        get_logger().error("Could not record plays in local store: %s", e)
+
+
+if __name__ == "__main__":
+    # Sync the mirror and report its size
+    logger = get_logger()
+    logger.info("Syncing local store...")
+
+    store = get_local_store()
+    store.sync(force=True)
+    logger.info("Mirror at %s holds %s songs (high-water mark %s)",
+                store.path, store.count(), store.get_state('last_created_at'))
@@ -6,12 +6,20 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from spotispy.helpers import get_logger
+from spotispy.helpers import get_logger, format_time_duration
+from spotispy.leaderboards import top_counts
+from spotispy.personal_records import RECORD_NAMES
 
 load_dotenv()
 
+# Service endpoints (overridable so the local fake services can stand in)
+SLACK_API_URL = os.getenv('SLACK_API_URL', 'https://slack.com/api').rstrip('/') + '/'
+SPOTIFY_ACCOUNTS_URL = os.getenv('SPOTIFY_ACCOUNTS_URL', 'https://accounts.spotify.com').rstrip('/')
+SPOTIFY_API_URL = os.getenv('SPOTIFY_API_URL', 'https://api.spotify.com/v1').rstrip('/')
+GIPHY_API_URL = os.getenv('GIPHY_API_URL', 'https://api.giphy.com/v1').rstrip('/')
+
 # Initialize Slack client
-client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"), base_url=SLACK_API_URL)
 SPOTIFY_CHANNEL_ID = "C063HV2H62V"
 
 # Spotify API credentials
@@ -127,7 +135,7 @@ def get_spotify_access_token():
         data = {'grant_type': 'client_credentials'}
         
         response = requests.post(
-            'https://accounts.spotify.com/api/token',
+            f'{SPOTIFY_ACCOUNTS_URL}/api/token',
             headers=headers,
             data=data,
             timeout=10
@@ -177,7 +185,7 @@ def get_artist_genres_by_name(artist_name):
         }
         
         search_response = requests.get(
-            'https://api.spotify.com/v1/search',
+            f'{SPOTIFY_API_URL}/search',
             headers=headers,
             params=search_params,
             timeout=10
@@ -262,7 +270,7 @@ def get_character_gif(character_name):
     try:
         # Use Giphy's public API (no key required for basic usage)
         search_term = character_name.replace(' ', '+')
-        url = f"https://api.giphy.com/v1/gifs/search?api_key=dc6zaTOxFJmzC&q={search_term}&limit=10&rating=pg"
+        url = f"{GIPHY_API_URL}/gifs/search?api_key=dc6zaTOxFJmzC&q={search_term}&limit=10&rating=pg"
         
         response = requests.get(url, timeout=5)
         if response.status_code == 200:
@@ -695,8 +703,8 @@ def format_top_items(items_dict, item_type, verb="listens"):
     if not items_dict:
         return f"No repeated {item_type} from yesterday!"
     
-    # Sort by play count and take top 3
-    sorted_items = sorted(items_dict.items(), key=lambda x: x[1], reverse=True)[:3]
+    # Take the top 3 by play count without sorting the whole dictionary
+    sorted_items = top_counts(items_dict, 3)
     
     if len(sorted_items) == 1:
         header = f"*Your top {item_type[:-1]} from yesterday!*\n"
@@ -712,6 +720,36 @@ def format_top_items(items_dict, item_type, verb="listens"):
 
 
 
+def format_personal_record(name, records):
+    """
+    Describe one all-time record in a line
+
+    Args:
+        name: Record name (see personal_records.RECORD_NAMES)
+        records: Records summary from personal_records
+
+    Returns:
+        String, or None if the record hasn't been set yet
+    """
+    if name == 'longest_streak':
+        streak = records['longest_streak']
+        return f"Longest streak: {streak['days']} days" if streak['days'] else None
+
+    record = records.get(name)
+    if not record:
+        return None
+    if name == 'best_day':
+        day = datetime.fromisoformat(record['date']).strftime('%b %d, %Y')
+        return f"Biggest day: {record['formatted_time']}, {record['songs']} songs ({day})"
+    if name == 'best_week':
+        week = datetime.fromisoformat(record['start_date']).strftime('%b %d, %Y')
+        return f"Biggest week: {record['formatted_time']} (week of {week})"
+    if name == 'top_song_day':
+        return f"Most plays in a day: {record['song']} by {record['artist']} ({record['plays']}x)"
+    return (f"Longest album binge: \"{record['album']}\" by {record['artist']}, "
+            f"{record['song_count']} tracks ({record['formatted_duration']})")
+
+
 def format_daily_summary(analysis_results, songs_data=None):
     """
     Format daily summary with Ready Player One character commentary and visuals
@@ -771,6 +809,19 @@ def format_daily_summary(analysis_results, songs_data=None):
     
     message_parts.append(overview)
     
+    # All-time records the day set, and the streak it extended
+    records = analysis_results.get('personal_records')
+    if records and (records['new_records'] or records['current_streak']['days'] > 1):
+        records_section = "*PERSONAL RECORDS*\n"
+        streak = records['current_streak']['days']
+        if streak > 1:
+            records_section += f"🔥 Listening streak: {streak} days (longest: {records['longest_streak']['days']})\n"
+        for name in records['new_records']:
+            line = format_personal_record(name, records)
+            if line:
+                records_section += f"🏆 New record! {line}\n"
+        message_parts.append(records_section.rstrip())
+    
     # Mood & Energy with character commentary
     if analysis_results['energy_level'] > 0 or analysis_results['mood_level'] > 0:
         energy_bar = create_progress_bar(analysis_results['energy_level'], max_width=10)
@@ -809,7 +860,12 @@ def format_daily_summary(analysis_results, songs_data=None):
     
     # Top Hits with character commentary
     if analysis_results['top_songs']:
-        top_songs = sorted(analysis_results['top_songs'].items(), key=lambda x: x[1], reverse=True)[:3]
+        # Rank repeated songs by plays, breaking ties by listening time when the leaderboard is available
+        leaderboard = analysis_results.get('leaderboards', {}).get('song')
+        if leaderboard is not None:
+            top_songs = [(song, count) for song, count, _ in leaderboard.top_labels(3, min_plays=2)]
+        else:
+            top_songs = top_counts(analysis_results['top_songs'], 3)
         
         hits_section = f"*TOP HITS*\n{character['top_hits_intro']}\n"
         medals = ["🥇", "🥈", "🥉"]
@@ -1052,6 +1108,9 @@ def format_weekly_summary(weekly_analysis):
     if weekly_analysis['streak'] > 0:
         insights_section = "🔥 *STREAK STATUS*\n"
         insights_section += f"📅 Current listening streak: {weekly_analysis['streak']} days strong!"
+        records = weekly_analysis.get('personal_records')
+        if records and records['longest_streak']['days'] > weekly_analysis['streak']:
+            insights_section += f"\n🏆 Longest ever: {records['longest_streak']['days']} days"
         
         if weekly_analysis['streak'] >= 14:
             if character['name'] == 'Parzival':
@@ -1067,6 +1126,20 @@ def format_weekly_summary(weekly_analysis):
         
         message_parts.append(insights_section)
     
+    # All-time records, marking the ones set this week
+    records = weekly_analysis.get('personal_records')
+    if records:
+        week_dates = set(weekly_analysis['daily_stats'])
+        record_lines = []
+        for name in RECORD_NAMES:
+            line = format_personal_record(name, records)
+            if line:
+                record = records[name]
+                is_new = any(record.get(key) in week_dates for key in ('date', 'start_date', 'end_date'))
+                record_lines.append(f"{'🆕' if is_new else '🏆'} {line}")
+        if record_lines:
+            message_parts.append("🏆 *ALL-TIME RECORDS*\n" + "\n".join(record_lines))
+    
     # Character-specific closing for weekly
     if character['name'] == 'Parzival':
         closing = "That's your week in the musical OASIS, gunter! Keep questing, keep discovering, and remember: _\"Being human is the only way to live.\"_ See you in the next cycle! 🎮"
@@ -1134,6 +1207,201 @@ def send_weekly_summary(weekly_data=None):
         return False
 
 
+# Wrapped greetings, keyed by character name (closings reuse the daily ones)
+WRAPPED_GREETINGS = {
+    'Parzival': "*pulls up a leaderboard that stretches back the whole {period}* Yo gunter! The full quest log is in - every key, every gate, every track:",
+    'Aech': "*slides out from under the Iron Giant with a {period}'s worth of diagnostics* What's good, Z! Time for the full-season audio teardown:",
+    'Art3mis': "*unrolls a {period}-long tapestry of listening data* Greetings, music lover! Here's the story your {period} told through sound:",
+    'Halliday': "*flickers into view beside an archive of {period}-long recordings* Ah, the complete compilation is ready. Every play, catalogued and cross-referenced:",
+    'Sorrento': "*slides a bound annual report across the desk* Sorrento here. IOI analysts have completed your full {period} performance review:",
+    'Ogden Morrow': "*settles into an armchair with a {period} of memories* Greetings, my friend! What a journey it has been - let's look back on it together:",
+}
+
+HEATMAP_SHADES = " ░▒▓█"
+
+
+def create_listening_heatmap(weekday_hour_seconds):
+    """
+    Create a day-of-week by hour heatmap
+    
+    Args:
+        weekday_hour_seconds: 7 rows (Monday first) of 24 per-hour listening seconds
+        
+    Returns:
+        String with one line per weekday, darker cells for more listening
+    """
+    peak = max(max(row) for row in weekday_hour_seconds)
+    if peak <= 0:
+        return "No listening detected"
+    
+    lines = ["     0     6     12    18"]
+    for day, row in zip(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], weekday_hour_seconds):
+        cells = ""
+        for seconds in row:
+            level = 0 if seconds <= 0 else 1 + int(seconds / peak * (len(HEATMAP_SHADES) - 2))
+            cells += HEATMAP_SHADES[level]
+        lines.append(f"{day}  {cells}")
+    return "\n".join(lines)
+
+
+def format_wrapped_summary(report):
+    """
+    Format a yearly or monthly Wrapped report with Ready Player One character commentary
+    
+    Args:
+        report: Dictionary from wrapped.build_wrapped()
+        
+    Returns:
+        String with formatted Wrapped message
+    """
+    if not report or not report.get('total_songs'):
+        title = report['title'] if report else ''
+        return f"🎁 {title} WRAPPED\n\nNo listening data available for this period. Time to start your musical quest! 🎵"
+    
+    message_parts = []
+    
+    # The same character presents the same report every time it is generated
+    import hashlib
+    characters = list(RPO_CHARACTERS.keys())
+    title_hash = hashlib.md5(report['title'].encode()).hexdigest()
+    character = RPO_CHARACTERS[characters[int(title_hash[:2], 16) % len(characters)]].copy()
+    
+    gif_url = get_character_gif(character['giphy_search'])
+    if gif_url:
+        character['gif_url'] = gif_url
+    
+    period = report['period']
+    greeting_section = f"{character['emoji']} *{character['name']} - {period.upper()} IN REVIEW*\n"
+    greeting_section += WRAPPED_GREETINGS[character['name']].format(period=period)
+    if 'gif_url' in character:
+        greeting_section += f"\n{character['gif_url']}"
+    message_parts.append(greeting_section)
+    
+    message_parts.append(f"🎁 *{report['title'].upper()} WRAPPED*\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    
+    # The numbers
+    total_seconds = report['total_seconds']
+    numbers_section = "📊 *THE NUMBERS*\n"
+    numbers_section += f"🎧 Total: {format_time_decimal_hours(format_duration_to_time_string(total_seconds))}\n"
+    numbers_section += f"🎵 {report['total_songs']} songs\n"
+    numbers_section += f"🔥 Active listening days: {report['active_days']}/{report['days']}"
+    if report['active_days']:
+        average = format_time_decimal_hours(format_duration_to_time_string(total_seconds / report['active_days']))
+        numbers_section += f"\n📊 Average listening day: {average}"
+    if report['biggest_day']:
+        biggest = report['biggest_day']
+        biggest_date = datetime.fromisoformat(biggest['date']).strftime('%A, %b %d')
+        numbers_section += f"\n🏆 Biggest day: {biggest_date} with {biggest['formatted_time']}"
+    message_parts.append(numbers_section)
+    
+    # Top artists, with their share of the period
+    if report['top_artists']:
+        artists_section = f"🎤 *TOP ARTISTS OF THE {period.upper()}*\n"
+        for artist, plays, seconds in report['top_artists']:
+            formatted_time = format_time_decimal_hours(format_duration_to_time_string(seconds))
+            percentage = seconds / total_seconds * 100 if total_seconds > 0 else 0
+            artists_section += f"🎯 {artist}\n"
+            artists_section += f"   └ {formatted_time}, {plays} songs ({percentage:.0f}%)\n"
+        message_parts.append(artists_section.rstrip())
+    
+    # Top songs
+    if report['top_songs']:
+        hits_section = f"*TOP HITS*\n{character['top_hits_intro']}\n"
+        medals = ["🥇", "🥈", "🥉"]
+        for i, (song, plays, _) in enumerate(report['top_songs']):
+            medal = medals[i] if i < 3 else f"{i+1}."
+            hits_section += f"{medal} {song} ({plays}x)\n"
+        message_parts.append(hits_section.rstrip())
+    
+    # Top albums
+    if report['top_albums']:
+        albums_section = "💿 *TOP ALBUMS*\n"
+        for album, plays, seconds in report['top_albums'][:3]:
+            formatted_time = format_time_decimal_hours(format_duration_to_time_string(seconds))
+            albums_section += f"🎯 {album} ({formatted_time})\n"
+        message_parts.append(albums_section.rstrip())
+    
+    # Streaks
+    longest = report['longest_streak']
+    if longest['days'] > 0:
+        streak_section = "🔥 *STREAKS*\n"
+        start = datetime.fromisoformat(longest['start_date']).strftime('%b %d')
+        end = datetime.fromisoformat(longest['end_date']).strftime('%b %d')
+        streak_section += f"📅 Longest streak: {longest['days']} days ({start} - {end})"
+        if report['current_streak'] > 0:
+            streak_section += f"\n🎵 Still going: {report['current_streak']} days and counting!"
+        if longest['days'] >= 30:
+            if character['name'] == 'Parzival':
+                streak_section += "\n🏆 A month or more without missing a day - that's high-score-table dedication, gunter!"
+            elif character['name'] == 'Sorrento':
+                streak_section += "\n📊 Sustained daily engagement well above projections. Noted in your file."
+            else:
+                streak_section += "\n🌟 That kind of daily dedication is truly inspiring!"
+        message_parts.append(streak_section)
+    
+    # Album deep dives
+    if report['album_binges']:
+        binges_section = "💿 *ALBUM DEEP DIVES*\n"
+        for binge in report['album_binges'][:3]:
+            binge_date = datetime.fromisoformat(binge['date']).strftime('%b %d')
+            binges_section += f"🎯 \"{binge['album']}\" by {binge['artist']}\n"
+            binges_section += f"   └ {binge['song_count']} tracks, {binge['formatted_duration']} on {binge_date}\n"
+        message_parts.append(binges_section.rstrip())
+    
+    # Peak hours and the heatmap
+    if report['peak_hour']:
+        days = ['Mondays', 'Tuesdays', 'Wednesdays', 'Thursdays', 'Fridays', 'Saturdays', 'Sundays']
+        busiest = max(range(7), key=lambda day: report['weekday_seconds'][day])
+        peak_section = f"*PEAK ACTIVITY*\n{character['peak_activity_intro']}\n"
+        peak_section += f"🕒 Peak hour: {format_hour_12h(report['peak_hour'])}\n"
+        peak_section += f"📅 Favorite day: {days[busiest]}\n"
+        peak_section += "```\n" + create_listening_heatmap(report['weekday_hour_seconds']) + "\n```"
+        message_parts.append(peak_section)
+    
+    # Month by month, for yearly reports
+    monthly_seconds = report.get('monthly_seconds', {})
+    if period == 'year' and monthly_seconds:
+        top_month = max(monthly_seconds.values())
+        months_section = "📈 *MONTH BY MONTH*\n```\n"
+        for month, seconds in monthly_seconds.items():
+            month_name = datetime.strptime(month, '%Y-%m').strftime('%b')
+            percentage = seconds / top_month * 100 if top_month > 0 else 0
+            months_section += f"{month_name} {create_ascii_bar(percentage)}  {format_time_duration(seconds)}\n"
+        months_section += "```"
+        message_parts.append(months_section)
+    
+    # Vibes
+    if report['energy_level'] or report['mood_level']:
+        vibe_section = f"*VIBE CHECK*\n{character['mood_energy_intro']}\n"
+        vibe_section += f"⚡ Energy: {create_progress_bar(report['energy_level'])} {report['energy_level']}%\n"
+        vibe_section += f"😊 Mood:   {create_progress_bar(report['mood_level'])} {report['mood_level']}%"
+        message_parts.append(vibe_section)
+    
+    message_parts.append(character['closing'])
+    
+    return "\n\n".join(message_parts)
+
+
+def send_wrapped_summary(report):
+    """
+    Send a yearly or monthly Wrapped report
+    
+    Args:
+        report: Dictionary from wrapped.build_wrapped()
+        
+    Returns:
+        Boolean indicating success
+    """
+    logger = get_logger()
+    logger.info("Sending %s Wrapped...", report.get('title'))
+    
+    try:
+        response = send_slack_message(format_wrapped_summary(report))
+        return response is not None
+    except Exception as e:
+        logger.error("Error sending Wrapped summary: %s", e, exc_info=True)
+        return False
+
 if __name__ == "__main__":
     # Test message formatting
     logger = get_logger()
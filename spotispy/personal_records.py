@@ -0,0 +1,348 @@
+"""
+All-time streaks and personal records
+
+A persisted index of the all-time bests: the current and longest listening
+streaks, the best day, the best (Monday-first) week, the most plays of one
+song in a day and the longest album binge. Each Central calendar day is
+closed into the index exactly once, from its one-day ListeningAggregate
+(rollups when the local store is on, otherwise that day's plays), so the
+daily and weekly reports can cite all-time records without rescanning
+history. Album runs still going at midnight are carried over and stitched
+to the next day's first run, as range_analysis does.
+
+The index is a small JSON file (SPOTISPY_RECORDS_PATH, default
+personal_records.json in the project root):
+
+    python -m spotispy.personal_records                     # Close days through yesterday
+    python -m spotispy.personal_records --since 2024-01-01  # Backfill from a date
+"""
+
+import argparse
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from spotispy.helpers import get_logger, get_config_value, format_time_duration
+
+RECORDS_VERSION = 1
+
+# Record names, in the order reports list them
+RECORD_NAMES = ('longest_streak', 'best_day', 'best_week', 'top_song_day', 'longest_binge')
+
+
+def default_records_path():
+    """Get the default index location (project root, next to logs/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'personal_records.json')
+
+
+def get_records_path():
+    return get_config_value('SPOTISPY_RECORDS_PATH') or default_records_path()
+
+
+def _next_date(local_date):
+    return (datetime.strptime(local_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def _week_start(local_date):
+    day = datetime.strptime(local_date, '%Y-%m-%d')
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+
+
+class PersonalRecords:
+    """All-time records, updated one closed day at a time"""
+
+    def __init__(self):
+        self.last_date = None  # Last Central date closed into the index
+        self.current_streak = {'days': 0, 'start_date': None, 'end_date': None}
+        self.longest_streak = {'days': 0, 'start_date': None, 'end_date': None}
+        self.best_day = None  # {'date', 'songs', 'seconds'}
+        self.week = None  # Week in progress: {'start_date', 'songs', 'seconds'}
+        self.best_week = None
+        self.top_song_day = None  # {'date', 'song', 'artist', 'plays'}
+        self.longest_binge = None  # Binge dictionary (see sessions.find_album_binges)
+        self.open_run = None  # Album run that ended the last closed day
+
+    def close_day(self, local_date, aggregate):
+        """
+        Fold one finished day into the records
+
+        Days must be closed in date order; a day on or before the last
+        closed one is ignored, so catching up twice is harmless.
+
+        Args:
+            local_date: ISO date string (Central time)
+            aggregate: ListeningAggregate covering just that day
+
+        Returns:
+            List of record names the day set (a record held by an earlier
+            streak, day or week being beaten; growing the holder doesn't count)
+        """
+        from spotispy.range_analysis import MIN_BINGE_SONGS
+        from spotispy.sessions import join_runs
+
+        if self.last_date is not None and local_date <= self.last_date:
+            return []
+
+        new_records = []
+        songs, seconds = aggregate.days.get(local_date, (0, 0.0))
+
+        # Streaks
+        if songs:
+            if self.current_streak['days'] and self.last_date is not None \
+                    and _next_date(self.last_date) == local_date:
+                self.current_streak = dict(self.current_streak, days=self.current_streak['days'] + 1,
+                                           end_date=local_date)
+            else:
+                self.current_streak = {'days': 1, 'start_date': local_date, 'end_date': local_date}
+            if self.current_streak['days'] > self.longest_streak['days']:
+                if self.longest_streak['start_date'] != self.current_streak['start_date']:
+                    new_records.append('longest_streak')
+                self.longest_streak = dict(self.current_streak)
+        else:
+            self.current_streak = {'days': 0, 'start_date': None, 'end_date': None}
+
+        # Best day and week
+        if songs and (self.best_day is None or seconds > self.best_day['seconds']):
+            new_records.append('best_day')
+            self.best_day = {'date': local_date, 'songs': songs, 'seconds': seconds}
+
+        week_start = _week_start(local_date)
+        if self.week is None or self.week['start_date'] != week_start:
+            self.week = {'start_date': week_start, 'songs': 0, 'seconds': 0.0}
+        self.week['songs'] += songs
+        self.week['seconds'] += seconds
+        if songs and (self.best_week is None or self.week['seconds'] > self.best_week['seconds']):
+            if self.best_week is None or self.best_week['start_date'] != week_start:
+                new_records.append('best_week')
+            self.best_week = dict(self.week)
+
+        # Most plays of one song
+        top_song = aggregate.leaderboards['song'].top(1)
+        if top_song:
+            (song, artist), plays, _ = top_song[0]
+            if self.top_song_day is None or plays > self.top_song_day['plays']:
+                new_records.append('top_song_day')
+                self.top_song_day = {'date': local_date, 'song': song, 'artist': artist, 'plays': plays}
+
+        # Longest binge, carrying a run that was still going at midnight into this day
+        first_run, last_run = aggregate.first_run, aggregate.last_run
+        if self.open_run is not None and first_run is not None:
+            joined = join_runs(self.open_run, first_run)
+            if joined is not None:
+                if last_run is first_run:
+                    last_run = joined
+                first_run = joined
+        candidates = [run for run in (*aggregate.binges, first_run, last_run)
+                      if run is not None and run['song_count'] >= MIN_BINGE_SONGS]
+        if candidates:
+            binge = max(candidates, key=lambda run: run['total_duration'])
+            if self.longest_binge is None or binge['total_duration'] > self.longest_binge['total_duration']:
+                if self.longest_binge is None or self.longest_binge['start_ts'] != binge['start_ts']:
+                    new_records.append('longest_binge')
+                self.longest_binge = binge
+        self.open_run = last_run
+
+        self.last_date = local_date
+        return new_records
+
+    def summary(self):
+        """
+        Get the records for reports
+
+        Returns:
+            Dictionary with last_date, current_streak, longest_streak,
+            best_day, best_week, top_song_day and longest_binge (None until
+            set); days and weeks carry formatted_time
+        """
+        def timed(entry):
+            return dict(entry, formatted_time=format_time_duration(entry['seconds'])) if entry else None
+
+        return {
+            'last_date': self.last_date,
+            'current_streak': dict(self.current_streak),
+            'longest_streak': dict(self.longest_streak),
+            'best_day': timed(self.best_day),
+            'best_week': timed(self.best_week),
+            'top_song_day': dict(self.top_song_day) if self.top_song_day else None,
+            'longest_binge': dict(self.longest_binge) if self.longest_binge else None,
+        }
+
+    def to_dict(self):
+        return {'version': RECORDS_VERSION, 'last_date': self.last_date,
+                'current_streak': self.current_streak, 'longest_streak': self.longest_streak,
+                'best_day': self.best_day, 'week': self.week, 'best_week': self.best_week,
+                'top_song_day': self.top_song_day, 'longest_binge': self.longest_binge,
+                'open_run': self.open_run}
+
+    @classmethod
+    def from_dict(cls, data):
+        records = cls()
+        for name in ('last_date', 'current_streak', 'longest_streak', 'best_day', 'week', 'best_week',
+                     'top_song_day', 'longest_binge', 'open_run'):
+            if name in data:
+                setattr(records, name, data[name])
+        return records
+
+    def save(self, path):
+        """Write the index atomically (temp file, fsync, rename)"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load the index, or start empty if there isn't a usable one"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            get_logger().warning("Ignoring unreadable records index %s: %s", path, e)
+            return cls()
+
+        if data.get('version') != RECORDS_VERSION:
+            return cls()
+        return cls.from_dict(data)
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock next to the index so overlapping runs don't close a day twice"""
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _yesterday():
+    from spotispy.database import CENTRAL_TZ
+    return (datetime.now(CENTRAL_TZ).date() - timedelta(days=1)).isoformat()
+
+
+def update_personal_records(through_date=None, since=None, path=None, workers=None):
+    """
+    Close every day after the last closed one and return the records
+
+    Args:
+        through_date: Last date to close (default: yesterday, Central time)
+        since: First date to close when the index is empty (default: through_date)
+        path: Index file path (default: SPOTISPY_RECORDS_PATH)
+        workers: Worker processes for raw plays (see range_analysis.aggregate_range)
+
+    Days are closed in order; if a day's plays can't be fetched, the days
+    before it are saved and it is retried on the next call, so an outage is
+    never closed as a day without listening.
+
+    Returns:
+        Records summary (see PersonalRecords.summary) plus 'new_records', the
+        record names set by the days closed in this call, or None if the
+        index couldn't be updated
+    """
+    import requests
+    from spotispy.range_analysis import iter_range_aggregates
+
+    logger = get_logger()
+    through_date = str(through_date or _yesterday())
+    path = path or get_records_path()
+    try:
+        with _locked(path):
+            records = PersonalRecords.load(path)
+            start = _next_date(records.last_date) if records.last_date else str(since or through_date)
+
+            new_records = []
+            if start <= through_date:
+                try:
+                    for dates, aggregate in iter_range_aggregates(start, through_date, 'day', workers=workers):
+                        new_records.extend(name for name in records.close_day(dates[0], aggregate)
+                                           if name not in new_records)
+                except requests.RequestException as e:
+                    logger.error("Stopped closing personal records after %s: %s", records.last_date, e)
+                if records.last_date is not None and records.last_date >= start:
+                    records.save(path)
+                    logger.info("Closed %s to %s into personal records", start, records.last_date)
+    except (OSError, KeyError, ValueError) as e:
+        logger.error("Could not update personal records: %s", e)
+        return None
+
+    summary = records.summary()
+    summary['new_records'] = [name for name in RECORD_NAMES if name in new_records]
+    return summary
+
+
+def get_personal_records(path=None):
+    """
+    Get the records as of the last closed day, without updating the index
+
+    Returns:
+        Records summary (see PersonalRecords.summary)
+    """
+    return PersonalRecords.load(path or get_records_path()).summary()
+
+
+def current_streak(records, daily_stats):
+    """
+    Extend the all-time streak through days the index hasn't closed yet
+
+    Args:
+        records: Records summary
+        daily_stats: Dictionary of daily statistics (with total_minutes) covering
+            the days after records['last_date'], e.g. the weekly window
+
+    Returns:
+        Current streak in days
+    """
+    last_date = records['last_date']
+    open_dates = sorted((d for d in daily_stats if last_date is None or d > last_date), reverse=True)
+
+    streak = 0
+    for local_date in open_dates:
+        if daily_stats[local_date]['total_minutes'] <= 0:
+            return streak
+        streak += 1
+    if open_dates and last_date is not None and open_dates[-1] != _next_date(last_date):
+        return streak
+    return streak + records['current_streak']['days']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the all-time streak and personal records index')
+    parser.add_argument('--since', help='First date to close when the index is empty, YYYY-MM-DD')
+    parser.add_argument('--through', help='Last date to close (default: yesterday), YYYY-MM-DD')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    logger = get_logger()
+    records = update_personal_records(args.through, since=args.since, workers=args.workers)
+    if records is None:
+        raise SystemExit(1)
+
+    logger.info("Records through %s", records['last_date'])
+    logger.info("Current streak: %s days, longest: %s days", records['current_streak']['days'],
+                records['longest_streak']['days'])
+    if records['best_day']:
+        logger.info("Best day: %s (%s, %s songs)", records['best_day']['date'],
+                    records['best_day']['formatted_time'], records['best_day']['songs'])
+    if records['best_week']:
+        logger.info("Best week: week of %s (%s)", records['best_week']['start_date'],
+                    records['best_week']['formatted_time'])
+    if records['top_song_day']:
+        top = records['top_song_day']
+        logger.info("Most plays in a day: %s by %s, %s plays on %s", top['song'], top['artist'],
+                    top['plays'], top['date'])
+    if records['longest_binge']:
+        binge = records['longest_binge']
+        logger.info("Longest binge: %s by %s, %s tracks (%s) on %s", binge['album'], binge['artist'],
+                    binge['song_count'], binge['formatted_duration'], binge['date'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+"""
+Date-range analysis
+
+analyze_range(start, end, granularity) reports on any inclusive range of
+Central calendar dates. The range is split into day or week partitions, each
+partition is reduced to a ListeningAggregate (per-day totals, hour and
+weekday-by-hour histograms, energy/valence weighted sums, song/artist/album
+leaderboards and the longest album binges), and the partitions are merged in
+date order. Merging is associative, so a month or a year is just more
+partitions, and album runs at partition edges are stitched back together so
+a binge that crosses midnight (or a week boundary) still counts once:
+
+- With the local store enabled, partitions are built from its rollups; only
+  the album binges read plays, four columns at a time per partition.
+- Otherwise each partition's plays are fetched and aggregated in a worker
+  process, so long ranges scale with the number of cores.
+
+    python -m spotispy.range_analysis 2025-01-01 2025-03-31 --granularity week
+"""
+
+import argparse
+import heapq
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import chain
+from spotispy.helpers import get_logger, get_config_value, safe_int, format_time_duration
+from spotispy.leaderboards import KINDS, Leaderboard
+
+GRANULARITIES = ('day', 'week')
+
+# Columns the aggregates read from each play
+RANGE_ANALYSIS_COLUMNS = ('song', 'artist', 'album', 'duration', 'played_at', 'energy', 'valence')
+
+# Columns album binge detection reads when the totals come from rollups
+BINGE_COLUMNS = ('artist', 'album', 'duration', 'played_at')
+
+# Album binges an aggregate keeps (the longest ones)
+MAX_BINGES = 10
+
+# Consecutive plays of one album that make a binge
+MIN_BINGE_SONGS = 3
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _weekday(local_date):
+    return datetime.strptime(local_date, '%Y-%m-%d').weekday()
+
+
+def _partition_bounds(dates):
+    """Central-time [start, end) datetimes covering consecutive ISO dates"""
+    from spotispy.database import CENTRAL_TZ
+
+    start = datetime.strptime(dates[0], '%Y-%m-%d').replace(tzinfo=CENTRAL_TZ)
+    end = datetime.strptime(dates[-1], '%Y-%m-%d').replace(tzinfo=CENTRAL_TZ) + timedelta(days=1)
+    return start, end
+
+
+def _add_album_runs(aggregate, songs):
+    """Record a partition's album binges and edge runs (see sessions.split_album_runs)"""
+    from spotispy.sessions import split_album_runs
+
+    binges, aggregate.first_run, aggregate.last_run = split_album_runs(songs, MIN_BINGE_SONGS)
+    return aggregate.add_binges(binges)
+
+
+def partition_dates(start, end, granularity='day'):
+    """
+    Split an inclusive date range into partitions
+
+    Week partitions follow calendar weeks (Monday to Sunday), so the first and
+    last may be partial.
+
+    Args:
+        start: First date (ISO string or date)
+        end: Last date, inclusive (ISO string or date)
+        granularity: 'day' or 'week'
+
+    Returns:
+        List of partitions, each a list of ISO date strings, oldest first
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r} (expected one of {', '.join(GRANULARITIES)})")
+    start, end = _to_date(start), _to_date(end)
+    if end < start:
+        raise ValueError(f"Range ends ({end}) before it starts ({start})")
+
+    partitions = []
+    day = start
+    while day <= end:
+        if granularity == 'day' or not partitions or day.weekday() == 0:
+            partitions.append([])
+        partitions[-1].append(day.isoformat())
+        day += timedelta(days=1)
+    return partitions
+
+
+class ListeningAggregate:
+    """Mergeable listening totals for a set of Central calendar dates"""
+
+    __slots__ = ('days', 'hour_plays', 'hour_seconds', 'weekday_hour_seconds', 'energy_sum',
+                 'energy_seconds', 'valence_sum', 'valence_seconds', 'leaderboards', 'binges',
+                 'first_run', 'last_run')
+
+    def __init__(self, dates=()):
+        # Date -> [plays, seconds]; dates without plays are kept so gaps stay visible
+        self.days = {local_date: [0, 0.0] for local_date in dates}
+        self.hour_plays = [0] * 24
+        self.hour_seconds = [0.0] * 24
+        # Monday-first rows of 24 hours, for day-of-week heatmaps
+        self.weekday_hour_seconds = [[0.0] * 24 for _ in range(7)]
+        self.energy_sum = 0.0
+        self.energy_seconds = 0.0
+        self.valence_sum = 0.0
+        self.valence_seconds = 0.0
+        self.leaderboards = {kind: Leaderboard(kind) for kind in KINDS}
+        self.binges = []  # Longest first, at most MAX_BINGES
+        # Album runs at the start and end of the covered plays, which may continue
+        # into the neighbouring aggregates (the same run when the plays form one)
+        self.first_run = None
+        self.last_run = None
+
+    @property
+    def total_songs(self):
+        return sum(plays for plays, _ in self.days.values())
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for _, seconds in self.days.values())
+
+    def add_songs(self, songs):
+        """
+        Fold plays into the aggregate
+
+        Missing song, album and artist names count as '', as they do in the
+        local store's rollups.
+
+        Returns:
+            This aggregate
+        """
+        from spotispy.database import add_time_fields
+
+        add_time_fields(songs)
+        days = self.days
+        hour_plays = self.hour_plays
+        hour_seconds = self.hour_seconds
+        weekday_hour_seconds = self.weekday_hour_seconds
+        weekdays = {}
+        add_song = self.leaderboards['song'].add
+        add_artist = self.leaderboards['artist'].add
+        add_album = self.leaderboards['album'].add
+
+        for song in songs:
+            if 'local_hour' not in song:
+                continue
+            duration = float(song.get('duration') or 0)
+            local_date = song['local_date']
+            day = days.get(local_date)
+            if day is None:
+                day = days[local_date] = [0, 0.0]
+            day[0] += 1
+            day[1] += duration
+            hour = song['local_hour']
+            hour_plays[hour] += 1
+            hour_seconds[hour] += duration
+            weekday = weekdays.get(local_date)
+            if weekday is None:
+                weekday = weekdays[local_date] = _weekday(local_date)
+            weekday_hour_seconds[weekday][hour] += duration
+
+            energy = song.get('energy')
+            if energy is not None:
+                self.energy_sum += energy * duration
+                self.energy_seconds += duration
+            valence = song.get('valence')
+            if valence is not None:
+                self.valence_sum += valence * duration
+                self.valence_seconds += duration
+
+            artist = song.get('artist') or ''
+            add_song((song.get('song') or '', artist), duration)
+            add_artist(artist, duration)
+            add_album((song.get('album') or '', artist), duration)
+        return self
+
+    def add_binges(self, binges):
+        """Keep the longest album binges among the current ones and these"""
+        self.binges = heapq.nlargest(MAX_BINGES, chain(self.binges, binges),
+                                     key=lambda binge: binge['total_duration'])
+        return self
+
+    @classmethod
+    def from_rollups(cls, store, dates):
+        """
+        Build an aggregate from the local store's rollups
+
+        Album binges need play order, so the partition's plays are read from
+        the mirror for those (only the few columns binge detection uses).
+
+        Args:
+            store: LocalStore
+            dates: Consecutive ISO date strings
+
+        Returns:
+            ListeningAggregate
+        """
+        aggregate = cls(dates)
+        for local_date in dates:
+            weekday_seconds = aggregate.weekday_hour_seconds[_weekday(local_date)]
+            for row in store.hourly_rollup(local_date):
+                day = aggregate.days[local_date]
+                day[0] += row['plays']
+                day[1] += row['seconds']
+                aggregate.hour_plays[row['hour']] += row['plays']
+                aggregate.hour_seconds[row['hour']] += row['seconds']
+                weekday_seconds[row['hour']] += row['seconds']
+                aggregate.energy_sum += row['energy_sum']
+                aggregate.energy_seconds += row['energy_seconds']
+                aggregate.valence_sum += row['valence_sum']
+                aggregate.valence_seconds += row['valence_seconds']
+
+        for kind, leaderboard in aggregate.leaderboards.items():
+            for item in store.top_items(kind, dates, limit=None):
+                key = item['name'] if kind == 'artist' else (item['name'], item['artist'])
+                leaderboard.add(key, item['seconds'], item['plays'])
+
+        start, end = _partition_bounds(dates)
+        songs = store.query_window(start.isoformat(), end.isoformat(), columns=BINGE_COLUMNS, compact=True)
+        return _add_album_runs(aggregate, songs)
+
+    def merge(self, other):
+        """
+        Fold a later aggregate into this one
+
+        Totals merge in any order, but album runs are stitched end to start,
+        so other must cover dates after this aggregate's.
+
+        Returns:
+            This aggregate
+        """
+        for local_date, (plays, seconds) in other.days.items():
+            day = self.days.get(local_date)
+            if day is None:
+                self.days[local_date] = [plays, seconds]
+            else:
+                day[0] += plays
+                day[1] += seconds
+        for hour in range(24):
+            self.hour_plays[hour] += other.hour_plays[hour]
+            self.hour_seconds[hour] += other.hour_seconds[hour]
+        for row, other_row in zip(self.weekday_hour_seconds, other.weekday_hour_seconds):
+            for hour in range(24):
+                row[hour] += other_row[hour]
+        self.energy_sum += other.energy_sum
+        self.energy_seconds += other.energy_seconds
+        self.valence_sum += other.valence_sum
+        self.valence_seconds += other.valence_seconds
+        for kind, leaderboard in self.leaderboards.items():
+            leaderboard.merge(other.leaderboards[kind])
+        self.add_binges(other.binges)
+        self._merge_runs(other)
+        return self
+
+    def _merge_runs(self, other):
+        """Stitch this aggregate's last album run to other's first one"""
+        from spotispy.sessions import join_runs
+
+        if other.first_run is None:
+            return
+        if self.first_run is None:
+            self.first_run, self.last_run = other.first_run, other.last_run
+            return
+
+        self_single = self.first_run is self.last_run
+        other_single = other.first_run is other.last_run
+        joined = join_runs(self.last_run, other.first_run)
+        if joined is None:
+            closed = [run for run, single in ((self.last_run, self_single), (other.first_run, other_single))
+                      if not single]
+            first_run, last_run = self.first_run, other.last_run
+        else:
+            # The joined run is an edge if either side was a single run, otherwise it is closed
+            closed = [joined] if not self_single and not other_single else []
+            first_run = joined if self_single else self.first_run
+            last_run = joined if other_single else other.last_run
+
+        self.add_binges(run for run in closed if run['song_count'] >= MIN_BINGE_SONGS)
+        self.first_run, self.last_run = first_run, last_run
+
+    def album_binges(self):
+        """The longest album binges, including runs still open at either edge"""
+        edges = (self.first_run,) if self.first_run is self.last_run else (self.first_run, self.last_run)
+        candidates = chain(self.binges, (run for run in edges
+                                         if run is not None and run['song_count'] >= MIN_BINGE_SONGS))
+        return heapq.nlargest(MAX_BINGES, candidates, key=lambda binge: binge['total_duration'])
+
+    @classmethod
+    def combine(cls, aggregates):
+        """Merge several aggregates into a new one (the inputs are left unchanged)"""
+        combined = cls()
+        for aggregate in aggregates:
+            combined.merge(aggregate)
+        return combined
+
+    def summary(self, limit=5):
+        """
+        Summarize the aggregate
+
+        Songs are ranked by plays, artists and albums by listening time.
+
+        Args:
+            limit: Number of top songs, artists and albums to include
+
+        Returns:
+            Dictionary with totals, daily stats, streaks, leaders, hourly and
+        weekday-by-hour histograms, album binges and energy/mood
+        """
+        from spotispy.analysis import _weighted_percentage
+        from spotispy.weekly_analysis import _day_stats, calculate_listening_streak, find_longest_streak
+
+        dates = sorted(self.days)
+        daily_stats = {local_date: _day_stats(*self.days[local_date]) for local_date in dates}
+        total_seconds = self.total_seconds
+        peak_hour = None
+        biggest_day = None
+        if any(self.hour_plays):
+            peak_hour = f"{max(range(24), key=lambda hour: self.hour_seconds[hour]):02d}:00"
+            biggest_date = max(dates, key=lambda local_date: self.days[local_date][1])
+            biggest_day = {'date': biggest_date, **daily_stats[biggest_date]}
+
+        return {
+            'start_date': dates[0] if dates else None,
+            'end_date': dates[-1] if dates else None,
+            'total_songs': self.total_songs,
+            'total_seconds': total_seconds,
+            'total_time_formatted': format_time_duration(total_seconds),
+            'active_days': sum(1 for plays, _ in self.days.values() if plays),
+            'daily_stats': daily_stats,
+            'biggest_day': biggest_day,
+            'current_streak': calculate_listening_streak(daily_stats),
+            'longest_streak': find_longest_streak(daily_stats),
+            'top_songs': self.leaderboards['song'].top_labels(limit),
+            'top_artists': self.leaderboards['artist'].top_labels(limit, by='seconds'),
+            'top_albums': self.leaderboards['album'].top_labels(limit, by='seconds'),
+            'hourly_seconds': list(self.hour_seconds),
+            'weekday_hour_seconds': [list(row) for row in self.weekday_hour_seconds],
+            'peak_hour': peak_hour,
+            'album_binges': self.album_binges(),
+            'energy_level': _weighted_percentage(self.energy_sum, self.energy_seconds),
+            'mood_level': _weighted_percentage(self.valence_sum, self.valence_seconds)
+        }
+
+
+def aggregate_partition(dates):
+    """
+    Fetch one partition's plays and aggregate them (runs in a worker process)
+
+    Raises requests.RequestException if the plays can't be fetched, so a
+    failed fetch is never merged as a partition without listening.
+
+    Args:
+        dates: Consecutive ISO date strings, oldest first
+
+    Returns:
+        ListeningAggregate
+    """
+    from spotispy.database import get_songs_in_window
+
+    start, end = _partition_bounds(dates)
+    songs = get_songs_in_window(start, end, columns=RANGE_ANALYSIS_COLUMNS, compact=True, strict=True)
+    return _add_album_runs(ListeningAggregate(dates).add_songs(songs), songs)
+
+
+def _rollup_aggregates(partitions):
+    """Aggregates for every partition from the local store, or None if it's disabled or unusable"""
+    from spotispy.local_store import get_synced_local_store
+
+    store = get_synced_local_store()
+    if store is None:
+        return None
+    try:
+        return [ListeningAggregate.from_rollups(store, dates) for dates in partitions]
+    except sqlite3.Error as e:
+        get_logger().error("Could not read rollups, using raw plays: %s", e)
+        return None
+
+
+def _reset_worker_state():
+    """
+    Drop the shared clients a worker inherits from the parent over fork
+
+    The pooled requests session, the SQLite connection and the window cache
+    belong to the parent; each worker opens its own on first use.
+    """
+    from spotispy import database, local_store
+
+    database._client = None
+    database.clear_window_cache()
+    local_store._store = None
+
+
+def iter_range_aggregates(start, end, granularity='day', workers=None, use_rollups=True):
+    """
+    Aggregate each partition of a date range, yielding them in date order
+
+    A partition whose plays can't be fetched raises requests.RequestException
+    when it is reached, after the partitions before it have been yielded.
+
+    Args:
+        start: First date (ISO string or date)
+        end: Last date, inclusive (ISO string or date)
+        granularity: 'day' or 'week'
+        workers: Worker processes for raw plays (default: SPOTISPY_RANGE_WORKERS, else CPU count)
+        use_rollups: Read the local store's rollups when it is enabled
+
+    Yields:
+        (dates, ListeningAggregate) tuples, oldest partition first
+    """
+    logger = get_logger()
+    partitions = partition_dates(start, end, granularity)
+
+    aggregates = _rollup_aggregates(partitions) if use_rollups else None
+    if aggregates is not None:
+        logger.info("Aggregated %s %s partitions from rollups", len(partitions), granularity)
+        yield from zip(partitions, aggregates)
+        return
+
+    if workers is None:
+        workers = safe_int(get_config_value('SPOTISPY_RANGE_WORKERS', 0), 0) or None
+    if workers == 1 or len(partitions) == 1:
+        for dates in partitions:
+            yield dates, aggregate_partition(dates)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_reset_worker_state) as pool:
+            # map keeps partition order, so merges are deterministic
+            yield from zip(partitions, pool.map(aggregate_partition, partitions))
+    logger.info("Aggregated %s %s partitions from raw plays", len(partitions), granularity)
+
+
+def aggregate_range(start, end, granularity='day', workers=None, use_rollups=True):
+    """
+    Aggregate each partition of a date range
+
+    Raises requests.RequestException if any partition's plays can't be
+    fetched, rather than returning totals that silently miss it.
+
+    Args:
+        start: First date (ISO string or date)
+        end: Last date, inclusive (ISO string or date)
+        granularity: 'day' or 'week'
+        workers: Worker processes for raw plays (default: SPOTISPY_RANGE_WORKERS, else CPU count)
+        use_rollups: Read the local store's rollups when it is enabled
+
+    Returns:
+        List of (dates, ListeningAggregate) tuples, oldest partition first
+    """
+    return list(iter_range_aggregates(start, end, granularity, workers=workers, use_rollups=use_rollups))
+
+
+def analyze_range(start, end, granularity='day', limit=5, workers=None, use_rollups=True):
+    """
+    Analyze listening over an arbitrary range of Central calendar dates
+
+    Args:
+        start: First date (ISO string or date)
+        end: Last date, inclusive (ISO string or date)
+        granularity: 'day' or 'week' partitions
+        limit: Number of top songs, artists and albums per summary
+        workers: Worker processes for raw plays (default: SPOTISPY_RANGE_WORKERS, else CPU count)
+        use_rollups: Read the local store's rollups when it is enabled
+
+    Returns:
+        Summary of the whole range (see ListeningAggregate.summary) with
+        'granularity' and 'periods', the summary of each partition in order
+
+    Raises:
+        requests.RequestException: A partition's plays couldn't be fetched
+    """
+    partitions = aggregate_range(start, end, granularity, workers=workers, use_rollups=use_rollups)
+    total = ListeningAggregate.combine(aggregate for _, aggregate in partitions)
+
+    results = total.summary(limit)
+    results['granularity'] = granularity
+    results['periods'] = [aggregate.summary(limit) for _, aggregate in partitions]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze listening over a date range (Central time)')
+    parser.add_argument('start', help='First date, YYYY-MM-DD')
+    parser.add_argument('end', help='Last date (inclusive), YYYY-MM-DD')
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='day')
+    parser.add_argument('--limit', type=int, default=5, help='Top items per summary (default: 5)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    import requests
+
+    logger = get_logger()
+    try:
+        results = analyze_range(args.start, args.end, args.granularity, limit=args.limit, workers=args.workers)
+    except requests.RequestException as e:
+        logger.error("Could not fetch every partition, not reporting partial totals: %s", e)
+        raise SystemExit(1)
+    logger.info("%s to %s: %s songs, %s over %s active days, peak hour %s",
+                results['start_date'], results['end_date'], results['total_songs'],
+                results['total_time_formatted'], results['active_days'], results['peak_hour'])
+    for period in results['periods']:
+        leader = period['top_artists'][0][0] if period['top_artists'] else '-'
+        logger.info("  %s: %s songs, %s, top artist %s", period['start_date'], period['total_songs'],
+                    period['total_time_formatted'], leader)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compact play records
+
+A Play is a slotted, read-mostly stand-in for a song dictionary. It supports
+the mapping operations the rest of the package uses on songs (song['artist'],
+song.get('energy'), 'energy' in song, iteration, dict(song), comparison with
+dicts), so readers can return Plays wherever they returned compact dicts.
+
+Missing and null columns are simply unset, matching compact rows where
+`'energy' in song` means the value is present. Repeated values (song, artist,
+album, source, release date, local date, and the duration, popularity and
+audio-feature numbers) are dictionary-encoded per column through a
+ValuePool, so a long range holds one copy of each artist name instead of
+one per play.
+"""
+
+from collections.abc import Mapping
+
+# Every column a Play can hold: the songs table plus the derived time fields
+PLAY_FIELDS = ('id', 'song', 'artist', 'album', 'duration', 'release_date', 'played_at',
+               'song_popularity', 'source', 'energy', 'valence', 'created_at', 'play_key',
+               'played_ts', 'local_date', 'local_hour')
+
+# Columns whose values repeat across plays and are worth sharing
+POOLED_FIELDS = frozenset(('song', 'artist', 'album', 'release_date', 'source', 'local_date',
+                           'duration', 'song_popularity', 'energy', 'valence'))
+
+_FIELD_SET = frozenset(PLAY_FIELDS)
+
+
+class ValuePool:
+    """Per-column dictionary encoding: equal values in a column share one object"""
+
+    __slots__ = ('_columns',)
+
+    def __init__(self):
+        self._columns = {}
+
+    def __len__(self):
+        return sum(len(values) for values in self._columns.values())
+
+    def intern(self, column, value):
+        values = self._columns.get(column)
+        if values is None:
+            values = self._columns[column] = {}
+        return values.setdefault(value, value)
+
+
+class Play(Mapping):
+    """One play, stored in slots instead of a per-row dictionary"""
+
+    __slots__ = PLAY_FIELDS
+
+    def __init__(self, row=(), pool=None):
+        items = row.items() if isinstance(row, Mapping) else row
+        for key, value in items:
+            if value is None:
+                continue
+            if pool is not None and key in POOLED_FIELDS:
+                value = pool.intern(key, value)
+            object.__setattr__(self, key, value)
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"Play has no column {key!r}")
+        if value is None:
+            self.pop(key, None)
+        else:
+            object.__setattr__(self, key, value)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        object.__delattr__(self, key)
+        return value
+
+    # Fast paths for the lookups analysis does per play (Mapping's versions go through KeyError)
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return default
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __iter__(self):
+        for key in PLAY_FIELDS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        # Pickle as (class, items) so process pools can ship plays compactly
+        return (_restore_play, (tuple(self.items()),))
+
+    def __repr__(self):
+        return f"Play({dict(self)!r})"
+
+    __hash__ = None
+
+
+def _restore_play(items):
+    return Play(items)
+
+
+def can_hold(row):
+    """Check whether every column of a row fits in a Play"""
+    return _FIELD_SET.issuperset(row)
+
+
+def to_plays(rows, columns=None, pool=None):
+    """
+    Convert song dictionaries to Plays, keeping only requested, non-null columns
+
+    Rows with columns a Play has no slot for (an unexpected select=* result)
+    are kept as compact dictionaries instead.
+
+    Args:
+        rows: Iterable of song dictionaries
+        columns: Iterable of column names to keep (None keeps every column)
+        pool: ValuePool shared across calls that belong to one read (default: a new pool)
+
+    Returns:
+        List of Play records (and dictionaries, for rows that don't fit)
+    """
+    pool = pool if pool is not None else ValuePool()
+    keep = tuple(columns) if columns is not None else None
+
+    plays = []
+    for row in rows:
+        if keep is not None:
+            items = [(key, row.get(key)) for key in keep]
+        else:
+            items = row.items()
+        if keep is None and not can_hold(row):
+            plays.append({key: value for key, value in items if value is not None})
+        else:
+            plays.append(Play(items, pool))
+    return plays
+
@@ -0,0 +1,228 @@
+"""
+Listening sessions and album binges
+
+Plays are sorted once by epoch time and split into sessions wherever the
+silence between one play ending and the next starting is longer than the
+session gap (SPOTISPY_SESSION_GAP_MINUTES, 30 by default). Album binges are
+runs of consecutive plays from the same album and artist within a session,
+found with run-length encoding over integer codes. Neither resets at
+midnight, so a late-night album run counts once, on the day it started.
+
+Everything is array arithmetic after one dictionary-encoding pass, so the
+work is linear in plays (plus the sort) for any range.
+
+Requires NumPy (installed with pandas, listed in requirements.txt).
+"""
+
+from spotispy.helpers import get_config_value, safe_int, format_time_duration
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+DEFAULT_SESSION_GAP_MINUTES = 30
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Session detection needs NumPy: pip install numpy")
+
+
+def get_session_gap_seconds(gap_seconds=None):
+    """
+    Resolve the silence that ends a session
+
+    Args:
+        gap_seconds: Explicit gap, or None to read SPOTISPY_SESSION_GAP_MINUTES
+
+    Returns:
+        Gap in seconds
+    """
+    if gap_seconds is not None:
+        return gap_seconds
+    minutes = safe_int(get_config_value('SPOTISPY_SESSION_GAP_MINUTES', DEFAULT_SESSION_GAP_MINUTES),
+                       DEFAULT_SESSION_GAP_MINUTES)
+    return minutes * 60
+
+
+def _encode(values):
+    """Dictionary-encode a sequence into integer codes"""
+    codes = {}
+    return np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype='int64', count=len(values))
+
+
+def _sorted_plays(songs):
+    """Plays with played_at in time order, with their epoch and end-of-play microseconds"""
+    from spotispy.database import add_time_fields
+
+    add_time_fields(songs)
+    plays = [song for song in songs if 'played_ts' in song]
+    ts = np.fromiter((song['played_ts'] for song in plays), dtype='int64', count=len(plays))
+    order = np.argsort(ts, kind='stable')
+    plays = [plays[i] for i in order]
+    durations = np.fromiter((song.get('duration', 0) or 0 for song in plays), dtype='float64', count=len(plays))
+    ts = ts[order]
+    return plays, ts, durations, ts + (durations * 1_000_000).astype('int64')
+
+
+def session_starts(ts, ends, gap_seconds):
+    """
+    Mark the plays that start a session
+
+    Args:
+        ts: Sorted epoch microseconds of each play
+        ends: Epoch microseconds each play ended
+        gap_seconds: Silence that ends a session
+
+    Returns:
+        Boolean array, True where a new session starts
+    """
+    starts = np.ones(len(ts), dtype=bool)
+    starts[1:] = ts[1:] - ends[:-1] > gap_seconds * 1_000_000
+    return starts
+
+
+def album_runs(ts, ends, durations, album_codes, artist_codes, gap_seconds):
+    """
+    Run-length encode same-album stretches within sessions
+
+    Args:
+        ts, ends, durations: Per-play arrays in time order
+        album_codes, artist_codes: Integer codes per play
+        gap_seconds: Silence that ends a session (and any run)
+
+    Returns:
+        Tuple of (first index, last index, play count, seconds) arrays, one entry per run
+    """
+    starts = session_starts(ts, ends, gap_seconds)
+    starts[1:] |= (album_codes[1:] != album_codes[:-1]) | (artist_codes[1:] != artist_codes[:-1])
+    run_ids = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:] - 1, len(ts) - 1)
+    return first, last, np.bincount(run_ids), np.bincount(run_ids, weights=durations)
+
+
+def _binge(plays, first, last, count, seconds, ends):
+    """Binge dictionary for one run (the shape detect_album_binges returns)"""
+    first_play = plays[first]
+    return {
+        'date': first_play['local_date'],
+        'end_date': plays[last]['local_date'],
+        'album': first_play.get('album', ''),
+        'artist': first_play.get('artist', ''),
+        'song_count': int(count),
+        'total_duration': float(seconds),
+        'formatted_duration': format_time_duration(seconds),
+        'start_ts': int(first_play['played_ts']),
+        'end_ts': int(ends[last]),
+    }
+
+
+def _runs(songs, gap_seconds):
+    _require_numpy()
+    plays, ts, durations, ends = _sorted_plays(songs)
+    if not plays:
+        return plays, ends, None
+    albums = _encode([song.get('album', '') for song in plays])
+    artists = _encode([song.get('artist', '') for song in plays])
+    return plays, ends, album_runs(ts, ends, durations, albums, artists, get_session_gap_seconds(gap_seconds))
+
+
+def find_album_binges(songs, min_consecutive=3, gap_seconds=None):
+    """
+    Find album binges across any range of plays
+
+    Args:
+        songs: List of song dictionaries (any order)
+        min_consecutive: Minimum consecutive songs to count as a binge
+        gap_seconds: Silence that ends a run (default: the session gap)
+
+    Returns:
+        List of binge dictionaries, longest first
+    """
+    plays, ends, runs = _runs(songs, gap_seconds)
+    if runs is None:
+        return []
+    first, last, counts, seconds = runs
+    binges = [_binge(plays, first[i], last[i], counts[i], seconds[i], ends)
+              for i in np.flatnonzero(counts >= min_consecutive)]
+    return sorted(binges, key=lambda x: x['total_duration'], reverse=True)
+
+
+def split_album_runs(songs, min_consecutive=3, gap_seconds=None):
+    """
+    Find album binges, holding back the first and last runs
+
+    The first and last runs may continue into the neighbouring ranges, so
+    they are returned separately for join_runs to stitch when ranges are
+    combined.
+
+    Returns:
+        Tuple of (binges between the edges, first run, last run); the first
+        run is the last run when the plays form one run, and both are None
+        without plays
+    """
+    plays, ends, runs = _runs(songs, gap_seconds)
+    if runs is None:
+        return [], None, None
+    first, last, counts, seconds = runs
+    first_run = _binge(plays, first[0], last[0], counts[0], seconds[0], ends)
+    if len(first) == 1:
+        return [], first_run, first_run
+    last_run = _binge(plays, first[-1], last[-1], counts[-1], seconds[-1], ends)
+    binges = [_binge(plays, first[i], last[i], counts[i], seconds[i], ends)
+              for i in np.flatnonzero(counts[1:-1] >= min_consecutive) + 1]
+    return binges, first_run, last_run
+
+
+def join_runs(earlier, later, gap_seconds=None):
+    """
+    Stitch a run ending one range to the run starting the next
+
+    Returns:
+        The combined run, or None if they are different albums or a session gap apart
+    """
+    if (earlier['album'] != later['album'] or earlier['artist'] != later['artist']
+            or later['start_ts'] - earlier['end_ts'] > get_session_gap_seconds(gap_seconds) * 1_000_000):
+        return None
+    total_duration = earlier['total_duration'] + later['total_duration']
+    return dict(earlier, end_date=later['end_date'], song_count=earlier['song_count'] + later['song_count'],
+                total_duration=total_duration, formatted_duration=format_time_duration(total_duration),
+                end_ts=later['end_ts'])
+
+
+def find_sessions(songs, gap_seconds=None):
+    """
+    Split plays into listening sessions
+
+    Args:
+        songs: List of song dictionaries (any order)
+        gap_seconds: Silence that ends a session (default: SPOTISPY_SESSION_GAP_MINUTES)
+
+    Returns:
+        List of session dictionaries in time order, with date, start_played_at,
+        end_played_at, song_count, total_duration and formatted_duration
+    """
+    from spotispy.database import epoch_micros_to_iso
+
+    _require_numpy()
+    plays, ts, durations, ends = _sorted_plays(songs)
+    if not plays:
+        return []
+
+    starts = session_starts(ts, ends, get_session_gap_seconds(gap_seconds))
+    session_ids = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:] - 1, len(plays) - 1)
+    counts = np.bincount(session_ids)
+    seconds = np.bincount(session_ids, weights=durations)
+
+    return [{
+        'date': plays[first[i]]['local_date'],
+        'start_played_at': epoch_micros_to_iso(int(ts[first[i]])),
+        'end_played_at': epoch_micros_to_iso(int(ends[last[i]])),
+        'song_count': int(counts[i]),
+        'total_duration': float(seconds[i]),
+        'formatted_duration': format_time_duration(seconds[i]),
+    } for i in range(len(first))]
@@ -0,0 +1,311 @@
+"""
+Durable write-ahead spool for collector writes
+
+The collectors append new songs to an fsync'd, append-only JSONL spool on
+disk before anything touches Supabase, then drain the spool in batches. If
+Supabase rejects or times out, the plays stay on disk and the next run
+(or `python -m spotispy.spool`) flushes them.
+
+Layout of the spool directory:
+    active.jsonl            Segment currently being appended to
+    segment-<ns>.jsonl      Sealed segments waiting to be drained (oldest first)
+    rejected.jsonl          Rows the database refused outright (kept for inspection)
+"""
+
+import fcntl
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+from spotispy.helpers import get_logger, get_config_value, safe_int, chunks
+
+ACTIVE_SEGMENT = 'active.jsonl'
+REJECTED_FILE = 'rejected.jsonl'
+
+# Seal the active segment once it grows past this many bytes
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+
+
+def default_spool_dir():
+    """Get the default spool location (project root, next to logs/)"""
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..'))
+    return os.path.join(project_root, 'spool')
+
+
+def _fsync_dir(path):
+    """Flush a directory entry so renames and new files survive a crash"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_durably(path, data, append=True):
+    """Write bytes to a file and fsync before returning"""
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(path, flags, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode(songs):
+    """Serialize songs as JSON lines (play_key is derived again on drain)"""
+    lines = []
+    for song in songs:
+        row = {key: value for key, value in song.items() if key != 'play_key'}
+        lines.append(json.dumps(row, default=str, separators=(',', ':')))
+    return ''.join(line + '\n' for line in lines).encode('utf-8')
+
+
+def _play_identity(song):
+    """Identify a play across the copies write_songs may make"""
+    return song.get('played_at'), song.get('song'), song.get('artist')
+
+
+class Spool:
+    """Append-only, segmented on-disk queue of songs waiting to be saved"""
+
+    def __init__(self, path=None, segment_bytes=None):
+        self.path = path or get_config_value('SPOTISPY_SPOOL_DIR') or default_spool_dir()
+        if segment_bytes is None:
+            segment_bytes = safe_int(get_config_value('SPOTISPY_SPOOL_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES),
+                                     DEFAULT_SEGMENT_BYTES)
+        self.segment_bytes = segment_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def active_path(self):
+        return os.path.join(self.path, ACTIVE_SEGMENT)
+
+    @property
+    def rejected_path(self):
+        return os.path.join(self.path, REJECTED_FILE)
+
+    @contextmanager
+    def _lock(self, name, blocking=True):
+        """
+        Hold an exclusive lock file in the spool directory
+
+        Yields:
+            True if the lock was acquired (always True when blocking)
+        """
+        with open(os.path.join(self.path, name), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, songs):
+        """
+        Durably append songs to the active segment
+
+        Args:
+            songs: List of song dictionaries
+
+        Returns:
+            Number of songs spooled
+        """
+        if not songs:
+            return 0
+
+        data = _encode(songs)
+        with self._lock('.append.lock'):
+            created = not os.path.exists(self.active_path)
+            _write_durably(self.active_path, data)
+            if created:
+                _fsync_dir(self.path)
+            if os.path.getsize(self.active_path) >= self.segment_bytes:
+                self._seal()
+        return len(songs)
+
+    def _seal(self):
+        """Rename the active segment so it can be drained (append lock must be held)"""
+        if not os.path.exists(self.active_path) or os.path.getsize(self.active_path) == 0:
+            return None
+        sealed = os.path.join(self.path, f"segment-{time.time_ns()}.jsonl")
+        os.replace(self.active_path, sealed)
+        _fsync_dir(self.path)
+        return sealed
+
+    def seal(self):
+        """Seal the active segment now"""
+        with self._lock('.append.lock'):
+            return self._seal()
+
+    def sealed_segments(self):
+        """Get sealed segment paths, oldest first"""
+        return sorted(glob.glob(os.path.join(self.path, 'segment-*.jsonl')))
+
+    def read_segment(self, path):
+        """
+        Read the songs in a segment
+
+        A torn final line (crash mid-append) is skipped rather than failing the drain.
+
+        Args:
+            path: Segment file path
+
+        Returns:
+            List of song dictionaries
+        """
+        logger = get_logger()
+        songs = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    songs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable line {line_number} in {os.path.basename(path)}")
+        return songs
+
+    def pending_count(self):
+        """Get the number of songs waiting in the spool"""
+        paths = self.sealed_segments()
+        if os.path.exists(self.active_path):
+            paths.append(self.active_path)
+        return sum(len(self.read_segment(path)) for path in paths)
+
+    def drain(self, upsert=None):
+        """
+        Flush sealed segments to Supabase, oldest first
+
+        A segment is deleted once every row is saved. Rows the database refuses
+        are moved to rejected.jsonl; rows that failed for transient reasons are
+        written back to the segment and draining stops until the next run.
+        Only one drain runs at a time; a concurrent call returns immediately.
+
+        A segment may hold rows that already reached the database (a crash
+        after a successful write, or a failure that left the outcome unknown),
+        so in insert mode rows already stored are dropped before sending;
+        upsert mode leaves that to the play_key constraint.
+
+        Args:
+            upsert: Passed through to write_songs (default: SUPABASE_INGEST_MODE setting)
+
+        Returns:
+            Dictionary with 'saved', 'rejected' and 'pending' row counts
+        """
+        from spotispy.database import DUPLICATE_CHECK_BATCH, check_for_duplicates, is_upsert_mode, write_songs
+        from spotispy.local_store import record_plays
+
+        logger = get_logger()
+        report = {'saved': 0, 'rejected': 0, 'pending': 0}
+        if upsert is None:
+            upsert = is_upsert_mode()
+
+        with self._lock('.drain.lock', blocking=False) as acquired:
+            if not acquired:
+                logger.info("Spool drain already running elsewhere, skipping")
+                report['pending'] = self.pending_count()
+                return report
+
+            self.seal()
+            segments = self.sealed_segments()
+            for index, segment in enumerate(segments):
+                songs = self.read_segment(segment)
+                new_songs = songs if upsert else [
+                    song for batch in chunks(songs, DUPLICATE_CHECK_BATCH) for song in check_for_duplicates(batch)]
+                result = write_songs(new_songs, upsert=upsert)
+                report['saved'] += result['saved']
+
+                # Keep the local rollups current at collection time
+                unsaved = {_play_identity(song) for song in result['failed']}
+                record_plays([song for song in songs if _play_identity(song) not in unsaved])
+
+                rejected_ids = {id(song) for song in result['rejected']}
+                if result['rejected']:
+                    _write_durably(self.rejected_path, _encode(result['rejected']))
+                    report['rejected'] += len(result['rejected'])
+
+                retry = [song for song in result['failed'] if id(song) not in rejected_ids]
+                if retry:
+                    # Keep only the unsaved rows so a later drain doesn't resend saved ones
+                    temp_path = segment + '.tmp'
+                    _write_durably(temp_path, _encode(retry), append=False)
+                    os.replace(temp_path, segment)
+                    _fsync_dir(self.path)
+                    report['pending'] = len(retry) + sum(
+                        len(self.read_segment(path)) for path in segments[index + 1:])
+                    logger.warning(f"Spool drain stopped: {report['pending']} songs held for the next run")
+                    break
+
+                os.remove(segment)
+
+        if report['saved'] or report['rejected']:
+            logger.info(f"Spool drained: {report['saved']} saved, {report['rejected']} rejected")
+        return report
+
+
+# Global spool instance shared by the collectors
+_spool = None
+
+def get_spool():
+    """Get the shared spool (created on first use)"""
+    global _spool
+    if _spool is None:
+        _spool = Spool()
+    return _spool
+
+
+def drain_spool(upsert=None):
+    """Flush everything waiting in the shared spool to Supabase"""
+    return get_spool().drain(upsert=upsert)
+
+
+def spool_songs(song_list):
+    """
+    Spool songs durably, then try to drain them to Supabase
+
+    Args:
+        song_list: List of song dictionaries to save
+
+    Returns:
+        Boolean indicating the songs are safe (saved, or held in the spool)
+    """
+    logger = get_logger()
+
+    if not song_list:
+        return True
+
+    # Live stats don't depend on Supabase, so they update as soon as plays are collected
+    from spotispy.live_window import record_live_plays
+    record_live_plays(song_list)
+
+    try:
+        get_spool().append(song_list)
+    except OSError as e:
+        # Without a working spool, fall back to writing straight to the database
+        from spotispy.database import save_songs
+        logger.error(f"Could not spool songs, saving directly: {e}")
+        return save_songs(song_list)
+
+    report = drain_spool()
+    if report['pending']:
+        logger.warning(f"Supabase unavailable, {report['pending']} songs held in spool")
+    return True
+
+
+if __name__ == "__main__":
+    # Drain whatever the collectors left behind
+    logger = get_logger()
+    spool = get_spool()
+    logger.info(f"Draining spool at {spool.path} ({spool.pending_count()} songs waiting)...")
+
+    report = spool.drain()
+    logger.info(f"Saved {report['saved']}, rejected {report['rejected']}, still pending {report['pending']}")
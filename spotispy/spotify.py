@@ -26,6 +26,15 @@ def normalize_release_date(date_str):
 
 def create_spotify_client():
     """Create and return authenticated Spotify client"""
+    # A fixed token and API base skip the OAuth flow (used with the local fake services)
+    access_token = os.getenv("SPOTIFY_ACCESS_TOKEN")
+    if access_token:
+        spotify = spotipy.Spotify(auth=access_token)
+        api_url = os.getenv("SPOTIFY_API_URL")
+        if api_url:
+            spotify.prefix = api_url.rstrip('/') + '/'
+        return spotify
+
     spotify_id = os.getenv("SPOTIFY_CLIENT_ID")
     spotify_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
     redirect_uri = os.getenv("SPOTIPY_REDIRECT_URI")
@@ -10,155 +10,326 @@ Provides comprehensive weekly listening analytics including:
 - Listening consistency analysis
 """
 
-from collections import defaultdict, Counter
+from collections import Counter
 from datetime import datetime, timedelta
-from spotispy.helpers import get_logger, get_date_string, format_time_duration
+from spotispy.helpers import get_logger, format_time_duration
+from spotispy.analysis import get_analysis_backend
+from spotispy.leaderboards import Leaderboard
+
+# Columns the weekly totals, top artists and album binge detection read from each song
+WEEKLY_ANALYSIS_COLUMNS = ('song', 'artist', 'album', 'duration', 'played_at')
+
+
+def get_week_window(days=7, now=None):
+    """
+    Get the Central-time window covering the last N calendar days (including today)
+
+    Args:
+        days: Number of calendar days in the window
+        now: Optional aware datetime to anchor the window (default: current time)
+
+    Returns:
+        Tuple of (window_start datetime, list of ISO date strings newest first)
+    """
+    from spotispy.database import CENTRAL_TZ
+
+    now_central = (now or datetime.now(CENTRAL_TZ)).astimezone(CENTRAL_TZ)
+    today_start = now_central.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start = today_start - timedelta(days=days - 1)
+    dates = [(today_start - timedelta(days=days_ago)).strftime('%Y-%m-%d') for days_ago in range(days)]
+    return window_start, dates
+
+
+def partition_songs_by_day(songs, dates):
+    """
+    Split songs into Central-time calendar days in a single pass
+
+    Args:
+        songs: List of song dictionaries
+        dates: ISO date strings to bucket into (songs on other days are dropped)
+
+    Returns:
+        Dictionary with date strings as keys and song lists as values (in `dates` order)
+    """
+    from spotispy.database import local_time_fields
+
+    songs_by_day = {date: [] for date in dates}
+    for song in songs:
+        local_date, _ = local_time_fields(song)
+        day_songs = songs_by_day.get(local_date)
+        if day_songs is not None:
+            day_songs.append(song)
+    return songs_by_day
+
+
+def prefetch_week_window(columns=WEEKLY_ANALYSIS_COLUMNS, days=7):
+    """
+    Fetch the whole weekly window once so later reports in this process reuse it
+
+    Args:
+        columns: Columns to fetch - use the widest set any report in this run needs
+        days: Number of calendar days in the window
+
+    Returns:
+        List of song dictionaries in the window
+    """
+    from spotispy.database import get_songs_in_window
+
+    window_start, _ = get_week_window(days)
+    return get_songs_in_window(window_start, columns=columns, compact=True)
 
 
 def get_last_7_days_data():
     """
-    Get listening data for the last 7 days
+    Get listening data for the last 7 days with one range query
     
     Returns:
         Dictionary with date strings as keys and song lists as values
     """
-    from spotispy.database import get_songs_for_single_date
+    from spotispy.database import get_songs_in_window
     
     logger = get_logger()
-    songs_by_day = {}
+    window_start, dates = get_week_window(7)
+    
+    songs = get_songs_in_window(window_start, columns=WEEKLY_ANALYSIS_COLUMNS, compact=True)
+    songs_by_day = partition_songs_by_day(songs, dates)
     
-    for days_ago in range(7):
-        date_str = get_date_string(days_ago)
-        songs = get_songs_for_single_date(date_str)
-        songs_by_day[date_str] = songs
-        logger.info("Date %s: %s songs", date_str, len(songs))
+    for date_str, day_songs in songs_by_day.items():
+        logger.info("Date %s: %s songs", date_str, len(day_songs))
     
     return songs_by_day
 
 
-def calculate_daily_totals(songs_by_day):
+def calculate_daily_totals(songs_by_day, backend=None):
     """
     Calculate daily listening totals
     
     Args:
         songs_by_day: Dictionary with date keys and song lists as values
+        backend: 'python' or 'pandas' (default: SPOTISPY_ANALYSIS_BACKEND, else 'python')
         
     Returns:
         Dictionary with daily statistics
     """
+    if get_analysis_backend(backend) == 'pandas':
+        from spotispy.frame_analysis import songs_by_day_to_frame, daily_totals_frame
+        return daily_totals_frame(songs_by_day_to_frame(songs_by_day))
+    
     daily_stats = {}
     
     for date, songs in songs_by_day.items():
         total_seconds = sum(song.get('duration', 0) for song in songs)
-        total_minutes = total_seconds / 60
-        
-        daily_stats[date] = {
-            'songs': len(songs),
-            'total_seconds': total_seconds,
-            'total_minutes': total_minutes,
-            'formatted_time': format_time_duration(total_seconds)
-        }
+        daily_stats[date] = _day_stats(len(songs), total_seconds)
     
     return daily_stats
 
 
-def find_weekly_top_artists(songs_by_day, limit=5):
+def _day_stats(song_count, total_seconds):
+    """Build one day's statistics entry"""
+    return {
+        'songs': song_count,
+        'total_seconds': total_seconds,
+        'total_minutes': total_seconds / 60,
+        'formatted_time': format_time_duration(total_seconds)
+    }
+
+
+def get_rollup_weekly_stats(dates, limit=5):
+    """
+    Read daily totals and top artists from the local store's rollups
+    
+    Args:
+        dates: ISO date strings to report on
+        limit: Number of top artists to return
+        
+    Returns:
+        Tuple of (daily_stats, top_artists) in the same shapes as
+        calculate_daily_totals and find_weekly_top_artists, or None if the
+        local store is disabled or unusable
+    """
+    import sqlite3
+    from spotispy.local_store import get_synced_local_store
+    
+    store = get_synced_local_store()
+    if store is None:
+        return None
+    
+    try:
+        totals = store.daily_totals(dates)
+        top_artists = store.top_items('artist', dates, limit=limit)
+    except sqlite3.Error as e:
+        get_logger().error("Could not read rollups, using raw plays: %s", e)
+        return None
+    
+    daily_stats = {date: _day_stats(day['plays'], day['seconds']) for date, day in totals.items()}
+    return daily_stats, [(item['name'], item['seconds'], item['plays']) for item in top_artists]
+
+
+def get_rollup_day_summaries(dates):
+    """
+    Read each day's totals and leaders from the local store's rollups
+    
+    Args:
+        dates: ISO date strings to summarize
+        
+    Returns:
+        Dictionary mapping each date to a summarize_day-shaped summary, or
+        None if the local store is disabled or unusable
+    """
+    import sqlite3
+    from spotispy.analysis import _day_summary
+    from spotispy.leaderboards import KINDS, item_label
+    from spotispy.local_store import get_synced_local_store
+    
+    store = get_synced_local_store()
+    if store is None:
+        return None
+    
+    try:
+        totals = store.daily_totals(dates)
+        summaries = {}
+        for date, day in totals.items():
+            leaders = {}
+            for kind in KINDS:
+                top = store.top_items(kind, [date], limit=1)
+                if not top:
+                    leaders[f'top_{kind}'] = None
+                elif kind == 'artist':
+                    leaders[f'top_{kind}'] = top[0]['name']
+                else:
+                    leaders[f'top_{kind}'] = item_label((top[0]['name'], top[0]['artist']))
+            summaries[date] = _day_summary(day['plays'], day['seconds'], **leaders)
+    except sqlite3.Error as e:
+        get_logger().error("Could not read rollups, using raw plays: %s", e)
+        return None
+    return summaries
+
+
+def summarize_days(songs_by_day):
+    """
+    Get totals and leaders for each day, from the rollups when the local store has them
+    
+    Args:
+        songs_by_day: Dictionary with date keys and song lists as values
+        
+    Returns:
+        Dictionary mapping each date to a summary (see analysis.summarize_day)
+    """
+    from spotispy.analysis import summarize_day
+    
+    summaries = get_rollup_day_summaries(list(songs_by_day))
+    if summaries is not None:
+        return summaries
+    return {date: summarize_day(songs) for date, songs in songs_by_day.items()}
+
+
+def find_weekly_top_artists(songs_by_day, limit=5, backend=None):
     """
     Find top artists across the entire week
     
     Args:
         songs_by_day: Dictionary with date keys and song lists as values
         limit: Number of top artists to return
+        backend: 'python' or 'pandas' (default: SPOTISPY_ANALYSIS_BACKEND, else 'python')
         
     Returns:
         List of tuples (artist, total_seconds, song_count)
     """
-    artist_stats = defaultdict(lambda: {'seconds': 0, 'songs': 0})
+    if get_analysis_backend(backend) == 'pandas':
+        from spotispy.frame_analysis import songs_by_day_to_frame, top_artists_frame
+        return top_artists_frame(songs_by_day_to_frame(songs_by_day), limit=limit)
+    
+    leaderboard = Leaderboard('artist')
     
     for date, songs in songs_by_day.items():
         for song in songs:
-            artist = song.get('artist', 'Unknown Artist')
-            duration = song.get('duration', 0)
-            
-            artist_stats[artist]['seconds'] += duration
-            artist_stats[artist]['songs'] += 1
-    
-    # Sort by total listening time
-    sorted_artists = sorted(
-        artist_stats.items(),
-        key=lambda x: x[1]['seconds'],
-        reverse=True
-    )
+            leaderboard.add(song.get('artist', 'Unknown Artist'), song.get('duration', 0))
     
+    # Most listening time first, ties broken by play count
     return [
-        (artist, stats['seconds'], stats['songs'])
-        for artist, stats in sorted_artists[:limit]
+        (artist, seconds, plays)
+        for artist, plays, seconds in leaderboard.top(limit, by='seconds')
     ]
 
 
-def detect_album_binges(songs_by_day, min_consecutive=3):
+def detect_album_binges(songs_by_day, min_consecutive=3, backend=None, gap_seconds=None):
     """
     Detect album listening sessions (3+ consecutive songs from same album)
     
+    Plays are walked in time order across the whole range, so a run that
+    carries on past midnight counts once, on the day it started. A silence
+    longer than the session gap ends a run.
+    
     Args:
         songs_by_day: Dictionary with date keys and song lists as values
         min_consecutive: Minimum consecutive songs to count as a binge
+        backend: 'python' or 'pandas' (default: SPOTISPY_ANALYSIS_BACKEND, else 'python')
+        gap_seconds: Silence that ends a run (default: SPOTISPY_SESSION_GAP_MINUTES)
         
     Returns:
-        List of album binge sessions
+        List of album binge sessions, longest first
     """
+    from spotispy.database import add_time_fields
+    from spotispy.sessions import get_session_gap_seconds
+
+    if get_analysis_backend(backend) == 'pandas':
+        from spotispy.frame_analysis import songs_by_day_to_frame, album_binges_frame
+        return album_binges_frame(songs_by_day_to_frame(songs_by_day), min_consecutive, gap_seconds)
+
+    gap_micros = get_session_gap_seconds(gap_seconds) * 1_000_000
+    songs = add_time_fields([song for songs in songs_by_day.values() for song in songs if song.get('played_at')])
+    
+    # Sort the whole range once by play time (epoch integers, not ISO strings)
+    sorted_songs = sorted(songs, key=lambda x: x['played_ts'])
+    
     all_binges = []
+    current_sequence = []
+    sequence_end = None
     
-    for date, songs in songs_by_day.items():
-        if not songs:
-            continue
-            
-        # Sort songs by played_at time
-        sorted_songs = sorted(songs, key=lambda x: x.get('played_at', ''))
+    for song in sorted_songs:
+        album = song.get('album', '')
+        artist = song.get('artist', '')
         
-        current_sequence = []
-        
-        for song in sorted_songs:
-            album = song.get('album', '')
-            artist = song.get('artist', '')
+        # Check if this continues the current album sequence
+        if (current_sequence and 
+            album == current_sequence[-1].get('album', '') and
+            artist == current_sequence[-1].get('artist', '') and
+            song['played_ts'] - sequence_end <= gap_micros):
+            current_sequence.append(song)
+        else:
+            # End of sequence - check if it was long enough to be a binge
+            if len(current_sequence) >= min_consecutive:
+                all_binges.append(_binge_entry(current_sequence, sequence_end))
             
-            # Check if this continues the current album sequence
-            if (current_sequence and 
-                album == current_sequence[-1].get('album', '') and
-                artist == current_sequence[-1].get('artist', '')):
-                current_sequence.append(song)
-            else:
-                # End of sequence - check if it was long enough to be a binge
-                if len(current_sequence) >= min_consecutive:
-                    total_duration = sum(s.get('duration', 0) for s in current_sequence)
-                    all_binges.append({
-                        'date': date,
-                        'album': current_sequence[0].get('album', ''),
-                        'artist': current_sequence[0].get('artist', ''),
-                        'song_count': len(current_sequence),
-                        'total_duration': total_duration,
-                        'formatted_duration': format_time_duration(total_duration)
-                    })
-                
-                # Start new sequence
-                current_sequence = [song]
+            # Start new sequence
+            current_sequence = [song]
         
-        # Check final sequence
-        if len(current_sequence) >= min_consecutive:
-            total_duration = sum(s.get('duration', 0) for s in current_sequence)
-            all_binges.append({
-                'date': date,
-                'album': current_sequence[0].get('album', ''),
-                'artist': current_sequence[0].get('artist', ''),
-                'song_count': len(current_sequence),
-                'total_duration': total_duration,
-                'formatted_duration': format_time_duration(total_duration)
-            })
+        sequence_end = song['played_ts'] + int((song.get('duration', 0) or 0) * 1_000_000)
+    
+    # Check final sequence
+    if len(current_sequence) >= min_consecutive:
+        all_binges.append(_binge_entry(current_sequence, sequence_end))
     
     # Sort by duration (longest binges first)
     return sorted(all_binges, key=lambda x: x['total_duration'], reverse=True)
 
 
+def _binge_entry(sequence, end_ts):
+    """Build one album binge entry from its plays"""
+    total_duration = float(sum(s.get('duration', 0) or 0 for s in sequence))
+    return {
+        'date': sequence[0]['local_date'],
+        'end_date': sequence[-1]['local_date'],
+        'album': sequence[0].get('album', ''),
+        'artist': sequence[0].get('artist', ''),
+        'song_count': len(sequence),
+        'total_duration': total_duration,
+        'formatted_duration': format_time_duration(total_duration),
+        'start_ts': sequence[0]['played_ts'],
+        'end_ts': end_ts
+    }
+
+
 def analyze_listening_patterns(daily_stats):
     """
     Analyze weekly listening patterns and trends
@@ -245,6 +416,33 @@ def calculate_listening_streak(daily_stats):
     return streak
 
 
+def find_longest_streak(daily_stats):
+    """
+    Find the longest run of consecutive days with music
+    
+    Args:
+        daily_stats: Dictionary with daily statistics (one entry per calendar day)
+        
+    Returns:
+        Dictionary with days, start_date and end_date (dates are None without any listening)
+    """
+    longest = {'days': 0, 'start_date': None, 'end_date': None}
+    run_start = None
+    run_days = 0
+    
+    for date in sorted(daily_stats.keys()):
+        if daily_stats[date]['total_minutes'] > 0:
+            if run_days == 0:
+                run_start = date
+            run_days += 1
+            if run_days > longest['days']:
+                longest = {'days': run_days, 'start_date': run_start, 'end_date': date}
+        else:
+            run_days = 0
+    
+    return longest
+
+
 def create_weekly_chart(daily_stats, max_width=10):
     """
     Create ASCII chart showing weekly listening pattern
@@ -311,6 +509,8 @@ def run_weekly_analysis():
     Returns:
         Dictionary with complete weekly analysis results
     """
+    from spotispy.personal_records import current_streak, update_personal_records
+    
     logger = get_logger()
     logger.info("Starting comprehensive weekly analysis")
     
@@ -318,20 +518,38 @@ def run_weekly_analysis():
         # Get last 7 days of data
         songs_by_day = get_last_7_days_data()
         
-        # Calculate daily totals
-        daily_stats = calculate_daily_totals(songs_by_day)
+        # The pandas backend loads the week into one frame shared by every metric
+        frame = None
+        if get_analysis_backend() == 'pandas':
+            from spotispy import frame_analysis
+            frame = frame_analysis.songs_by_day_to_frame(songs_by_day)
+        
+        # Daily totals and top artists come from the rollups when the local store has them
+        rollup_stats = get_rollup_weekly_stats(list(songs_by_day), limit=5)
+        if rollup_stats is not None:
+            daily_stats, top_artists = rollup_stats
+        elif frame is not None:
+            daily_stats = frame_analysis.daily_totals_frame(frame)
+            top_artists = frame_analysis.top_artists_frame(frame, limit=5)
+        else:
+            daily_stats = calculate_daily_totals(songs_by_day)
+            top_artists = find_weekly_top_artists(songs_by_day, limit=5)
         
         # Analyze overall patterns
         patterns = analyze_listening_patterns(daily_stats)
         
-        # Find top artists
-        top_artists = find_weekly_top_artists(songs_by_day, limit=5)
-        
         # Detect album binges
-        album_binges = detect_album_binges(songs_by_day)
+        if frame is not None:
+            album_binges = frame_analysis.album_binges_frame(frame)
+        else:
+            album_binges = detect_album_binges(songs_by_day)
         
-        # Calculate streak
-        streak = calculate_listening_streak(daily_stats)
+        # Calculate streak, reaching back past this week through the all-time records
+        records = update_personal_records()
+        if records is not None:
+            streak = current_streak(records, daily_stats)
+        else:
+            streak = calculate_listening_streak(daily_stats)
         
         # Create weekly chart
         weekly_chart = create_weekly_chart(daily_stats)
@@ -342,6 +560,7 @@ def run_weekly_analysis():
             'top_artists': top_artists,
             'album_binges': album_binges[:3],  # Top 3 binges
             'streak': streak,
+            'personal_records': records,
             'weekly_chart': weekly_chart,
             'raw_data': songs_by_day
         }
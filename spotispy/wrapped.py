@@ -0,0 +1,110 @@
+"""
+Year and month Wrapped reports
+
+A Wrapped report covers one calendar year or month (up to today, if it is
+still in progress): totals, top artists/songs/albums, streaks, album binges,
+peak hours and a day-of-week by hour heatmap. It is built from the mergeable
+partition aggregates in spotispy.range_analysis, week partitions for a year
+and day partitions for a month, so a full year never holds every play in
+memory at once and comes straight from rollups when the local store is on.
+
+    python -m spotispy.wrapped 2025             # Log the 2025 report
+    python -m spotispy.wrapped 2025 --month 3   # March 2025
+    python -m spotispy.wrapped 2025 --send      # Post it to Slack
+"""
+
+import argparse
+import calendar
+from datetime import date, datetime
+from spotispy.helpers import get_logger
+
+
+def wrapped_window(year, month=None, today=None):
+    """
+    Get the dates a Wrapped report covers
+
+    Args:
+        year: Calendar year
+        month: Optional month number (1-12) for a monthly report
+        today: Optional date to clip an in-progress period to (default: today in Central time)
+
+    Returns:
+        Tuple of (start date, end date), inclusive
+    """
+    from spotispy.database import CENTRAL_TZ
+
+    if month is None:
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    else:
+        start = date(year, month, 1)
+        end = date(year, month, calendar.monthrange(year, month)[1])
+
+    today = today or datetime.now(CENTRAL_TZ).date()
+    if start > today:
+        raise ValueError(f"{start.isoformat()} is in the future")
+    return start, min(end, today)
+
+
+def build_wrapped(year, month=None, limit=5, workers=None, today=None):
+    """
+    Build a yearly or monthly Wrapped report
+
+    Args:
+        year: Calendar year
+        month: Optional month number (1-12) for a monthly report
+        limit: Number of top songs, artists and albums
+        workers: Worker processes for raw plays (see range_analysis.aggregate_range)
+        today: Optional date to clip an in-progress period to
+
+    Returns:
+        Dictionary with the range summary (see range_analysis.analyze_range)
+        plus title, period, days, weekday_seconds and monthly_seconds
+
+    Raises:
+        requests.RequestException: Part of the period couldn't be fetched
+    """
+    from spotispy.range_analysis import analyze_range
+
+    start, end = wrapped_window(year, month, today)
+    report = analyze_range(start, end, 'day' if month else 'week', limit=limit, workers=workers)
+
+    report['title'] = str(year) if month is None else start.strftime('%B %Y')
+    report['period'] = 'year' if month is None else 'month'
+    report['days'] = (end - start).days + 1
+    report['weekday_seconds'] = [sum(row) for row in report['weekday_hour_seconds']]
+
+    monthly_seconds = {}
+    for local_date, stats in report['daily_stats'].items():
+        monthly_seconds[local_date[:7]] = monthly_seconds.get(local_date[:7], 0) + stats['total_seconds']
+    report['monthly_seconds'] = monthly_seconds
+
+    get_logger().info("Built %s Wrapped: %s songs, %s over %s active days", report['title'],
+                      report['total_songs'], report['total_time_formatted'], report['active_days'])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a yearly or monthly Wrapped report')
+    parser.add_argument('year', type=int, help='Calendar year')
+    parser.add_argument('--month', type=int, choices=range(1, 13), help='Month number for a monthly report')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--send', action='store_true', help='Post the report to Slack')
+    args = parser.parse_args()
+
+    import requests
+    from spotispy.messages import format_wrapped_summary, send_wrapped_summary
+
+    logger = get_logger()
+    try:
+        report = build_wrapped(args.year, args.month, workers=args.workers)
+    except requests.RequestException as e:
+        logger.error("Could not fetch the whole period, not sending a partial Wrapped: %s", e)
+        raise SystemExit(1)
+    if args.send:
+        success = send_wrapped_summary(report)
+        raise SystemExit(0 if success else 1)
+    logger.info("Wrapped report:\n%s", format_wrapped_summary(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 from ytmusicapi import YTMusic
 from .spotify import create_spotify_client, normalize_release_date
 from .helpers import get_logger
-from .database import save_songs, check_youtube_music_duplicates
+from .database import check_youtube_music_duplicates, get_client
+from .spool import spool_songs, drain_spool
 
 load_dotenv()
 
@@ -184,6 +185,9 @@ def collect_youtube_music_songs():
             logger.error(f"Authentication test failed: {auth_test_error}")
             return False
         
+        # Flush plays left over from earlier runs so the duplicate check sees them
+        drain_spool()
+        
         # Get all YouTube Music history
         songs = get_recent_youtube_music_history(ytmusic)
         
@@ -193,10 +197,6 @@ def collect_youtube_music_songs():
             
         logger.info(f"Found {len(songs)} songs from YouTube Music")
         
-        # Add small delay to ensure any previous database transactions are committed
-        logger.debug("Waiting for database consistency...")
-        time.sleep(3)
-        
         # Check for duplicates using YouTube Music-specific logic (content-based)
         logger.info("Checking for duplicates in database...")
         new_songs = check_youtube_music_duplicates(songs, hours_back=2)
@@ -207,12 +207,12 @@ def collect_youtube_music_songs():
             
         logger.info(f"Found {len(new_songs)} new songs to save")
         
-        # Save new songs to database
+        # Spool to disk first, then drain to the database
         logger.info("Saving songs to database...")
-        success = save_songs(new_songs)
+        success = spool_songs(new_songs)
         
         if success:
-            logger.info(f"Successfully saved {len(new_songs)} songs to database")
+            logger.info(f"Successfully spooled {len(new_songs)} songs")
             return True
         else:
             logger.error("Failed to save songs to database")
@@ -231,6 +231,7 @@ if __name__ == "__main__":
     logger.info("YouTube Music collection starting...")
     
     success = collect_youtube_music_songs()
+    get_client().log_stats()
     
     if success:
         logger.info("YouTube Music collection completed successfully")
@@ -99,4 +99,30 @@ def weeknd_album_binge():
             'song_popularity': 80
         })
     
-    return songs
\ No newline at end of file
+    return songs
+
+@pytest.fixture
+def make_play():
+    """Factory for one play dictionary (extra keyword arguments become fields)"""
+    def play(song, played_at, artist='Artist', album='Album', duration=200, **fields):
+        return {'song': song, 'artist': artist, 'album': album, 'duration': duration,
+                'played_at': played_at, **fields}
+    return play
+
+
+@pytest.fixture
+def serve_plays(monkeypatch):
+    """Serve database.get_songs_in_window from a fixed list of plays instead of Supabase"""
+    from spotispy import database
+
+    def serve(songs):
+        prepared = database.add_time_fields([dict(song) for song in songs])
+
+        def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+            start_ts = database.to_epoch_micros(start.isoformat())
+            end_ts = database.to_epoch_micros(end.isoformat())
+            return [dict(song) for song in prepared if start_ts <= song['played_ts'] < end_ts]
+
+        monkeypatch.setattr(database, 'get_songs_in_window', get_songs_in_window)
+        return get_songs_in_window
+    return serve
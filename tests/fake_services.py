@@ -0,0 +1,475 @@
+"""
+Local stand-ins for the services SpotiSpy talks to
+
+One HTTP server on localhost emulates:
+    /rest/v1/...                     Supabase PostgREST (in-memory songs table)
+    /api/token                       Spotify accounts (client credentials)
+    /v1/me/player/recently-played    Spotify recently played
+    /v1/search                       Spotify artist/track search
+    /api/chat.postMessage            Slack
+    /v1/gifs/search                  Giphy
+
+Latency, error rates and 429s are configurable, so the collectors and
+reports can be run end to end (and under load) with no network:
+
+    python -m tests.fake_services --port 8765 --latency 0.05 --error-rate 0.02 --seed-days 7
+
+prints the environment variables that point SpotiSpy at the server.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Columns with a unique constraint in the stand-in table
+UNIQUE_COLUMNS = ('play_key',)
+
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict')
+
+
+def _comparable(value):
+    """Compare timestamps as datetimes and everything else as-is"""
+    if isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return value
+    return value
+
+
+def _matches(row, column, expression):
+    """Evaluate one PostgREST filter expression (e.g. 'gte.2025-03-15') against a row"""
+    op, _, operand = expression.partition('.')
+    value = row.get(column)
+
+    if op == 'in':
+        options = [option.strip().strip('"') for option in operand.strip('()').split(',')]
+        return _comparable(value) in [_comparable(option) for option in options]
+    if value is None:
+        return False
+    if op == 'eq':
+        return str(value) == operand
+    if op == 'neq':
+        return str(value) != operand
+
+    left, right = _comparable(value), _comparable(operand)
+    try:
+        if op == 'gt':
+            return left > right
+        if op == 'gte':
+            return left >= right
+        if op == 'lt':
+            return left < right
+        if op == 'lte':
+            return left <= right
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class FakePostgREST:
+    """In-memory songs table with just enough PostgREST semantics for spotispy"""
+
+    def __init__(self):
+        self.rows = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def select(self, query):
+        """Apply filters, ordering, projection and limit/offset to the table"""
+        params = urllib.parse.parse_qs(query, keep_blank_values=True)
+        with self.lock:
+            rows = list(self.rows)
+
+        for column, expressions in params.items():
+            if column in RESERVED_PARAMS:
+                continue
+            for expression in expressions:
+                rows = [row for row in rows if _matches(row, column, expression)]
+
+        for clause in reversed(params.get('order', [''])[0].split(',')):
+            if not clause:
+                continue
+            column, _, direction = clause.partition('.')
+            rows.sort(key=lambda row: (_comparable(row.get(column)) is None, _comparable(row.get(column))),
+                      reverse=direction.startswith('desc'))
+
+        offset = int(params.get('offset', ['0'])[0])
+        limit = params.get('limit')
+        rows = rows[offset:offset + int(limit[0])] if limit else rows[offset:]
+
+        select = params.get('select', ['*'])[0]
+        if select != '*':
+            columns = select.split(',')
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return rows
+
+    def insert(self, payload, on_conflict=None, prefer=''):
+        """
+        Insert rows, honouring unique columns and Prefer resolution
+
+        Returns:
+            Tuple of (status code, response body)
+        """
+        new_rows = payload if isinstance(payload, list) else [payload]
+        ignore_duplicates = 'resolution=ignore-duplicates' in prefer
+        merge_duplicates = 'resolution=merge-duplicates' in prefer
+
+        with self.lock:
+            inserted = []
+            for row in new_rows:
+                conflict = None
+                for column in UNIQUE_COLUMNS:
+                    if row.get(column) is None:
+                        continue
+                    conflict = next((existing for existing in self.rows
+                                     if existing.get(column) == row[column]), None)
+                    if conflict:
+                        break
+
+                if conflict is not None:
+                    if on_conflict and ignore_duplicates:
+                        continue
+                    if on_conflict and merge_duplicates:
+                        conflict.update(row)
+                        continue
+                    return 409, {'code': '23505', 'message': 'duplicate key value violates unique constraint'}
+
+                stored = dict(row)
+                stored.setdefault('id', str(uuid.uuid4()))
+                stored.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+                self.rows.append(stored)
+                inserted.append(stored)
+        return 201, inserted
+
+
+class Chaos:
+    """Latency and failure injection applied to every request"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        """Seconds to wait before answering"""
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def fault(self):
+        """Status code to fail with (429 or 503), or None to answer normally"""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+
+class FakeSpotify:
+    """
+    Generated catalog and a deterministic listening history
+
+    Plays happen every `play_interval` seconds on a fixed epoch-aligned grid and
+    the track for each slot is derived from the slot number, so repeated calls
+    (and separate processes with the same seed) see the same plays.
+    """
+
+    GENRES = ['indie rock', 'dance pop', 'hip hop', 'house', 'neo soul', 'indie folk', 'jazz', 'pop punk']
+
+    def __init__(self, seed=0, artists=40, albums_per_artist=3, tracks_per_album=8, play_interval=210):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.play_interval = play_interval
+        self.artists = []
+        self.tracks = []
+
+        for a in range(artists):
+            artist = {'name': f'Artist {a}', 'genres': rng.sample(self.GENRES, 2), 'popularity': rng.randint(10, 90)}
+            self.artists.append(artist)
+            for b in range(albums_per_artist):
+                album = {
+                    'name': f'Album {a}-{b}',
+                    'release_date': f'{rng.randint(1970, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                    'artists': [{'name': artist['name']}],
+                }
+                for t in range(tracks_per_album):
+                    self.tracks.append({
+                        'id': f'track-{a}-{b}-{t}',
+                        'name': f'Song {a}-{b}-{t}',
+                        'duration_ms': rng.randint(90, play_interval) * 1000,
+                        'popularity': rng.randint(0, 100),
+                        'album': album,
+                        'artists': [{'name': artist['name']}],
+                    })
+
+    def track_for_slot(self, slot):
+        digest = hashlib.md5(f'{self.seed}:{slot}'.encode()).digest()
+        return self.tracks[int.from_bytes(digest[:4], 'big') % len(self.tracks)]
+
+    def plays_between(self, start, end):
+        """
+        Get plays in [start, end), newest first
+
+        Args:
+            start: Aware datetime
+            end: Aware datetime
+
+        Returns:
+            List of (played_at datetime, track) tuples
+        """
+        first = int(start.timestamp()) // self.play_interval + 1
+        last = int(end.timestamp()) // self.play_interval
+        plays = []
+        for slot in range(last, first - 1, -1):
+            played_at = datetime.fromtimestamp(slot * self.play_interval, tz=timezone.utc)
+            if start <= played_at < end:
+                plays.append((played_at, self.track_for_slot(slot)))
+        return plays
+
+    def recently_played(self, after_ms=None, limit=50):
+        """Response body for GET /v1/me/player/recently-played"""
+        end = datetime.now(timezone.utc)
+        start = (datetime.fromtimestamp(int(after_ms) / 1000, tz=timezone.utc) if after_ms
+                 else end - timedelta(seconds=self.play_interval * limit))
+        plays = self.plays_between(start, end)[:limit]
+        return {
+            'items': [{'track': track, 'played_at': played_at.isoformat().replace('+00:00', 'Z')}
+                      for played_at, track in plays],
+            'limit': limit,
+        }
+
+    def search(self, q, search_type='track', limit=1):
+        """Response body for GET /v1/search (artist or track)"""
+        terms = dict(part.split(':', 1) for part in q.split(' ') if ':' in part)
+        if 'artist' in search_type.split(','):
+            name = terms.get('artist', q).lower()
+            items = [artist for artist in self.artists if artist['name'].lower() == name] or self.artists[:1]
+            return {'artists': {'items': items[:limit]}}
+
+        title = terms.get('track', q).lower()
+        items = [track for track in self.tracks if track['name'].lower().startswith(title)]
+        return {'tracks': {'items': items[:limit]}}
+
+    def song_rows(self, start, end):
+        """Plays in [start, end) as rows in the shape save_songs writes"""
+        return [{
+            'song': track['name'],
+            'artist': track['artists'][0]['name'],
+            'album': track['album']['name'],
+            'duration': track['duration_ms'] / 1000,
+            'release_date': track['album']['release_date'],
+            'played_at': played_at.isoformat(),
+            'song_popularity': track['popularity'],
+        } for played_at, track in self.plays_between(start, end)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def _send_json(self, status, body=None, extra_headers=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _split(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        return parsed.path, parsed.query
+
+    def _read_body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def _inject_chaos(self):
+        """Apply configured latency and faults; returns True if the request was answered"""
+        chaos = self.server.services.chaos
+        delay = chaos.delay()
+        if delay:
+            time.sleep(delay)
+
+        status = chaos.fault()
+        if status == 429:
+            self._send_json(429, {'message': 'rate limited'}, {'Retry-After': chaos.retry_after})
+            return True
+        if status is not None:
+            self._send_json(status, {'message': 'service unavailable'})
+            return True
+        return False
+
+    def do_GET(self):
+        services = self.server.services
+        path, query = self._split()
+        params = urllib.parse.parse_qs(query)
+        services.record('GET', self.path)
+        if self._inject_chaos():
+            return
+
+        if path.startswith('/rest/v1/'):
+            services.postgrest.requests.append(('GET', self.path))
+            self._send_json(200, services.postgrest.select(query))
+        elif path == '/v1/me/player/recently-played':
+            self._send_json(200, services.spotify.recently_played(
+                params.get('after', [None])[0], int(params.get('limit', ['50'])[0])))
+        elif path == '/v1/search':
+            self._send_json(200, services.spotify.search(
+                params.get('q', [''])[0], params.get('type', ['track'])[0], int(params.get('limit', ['1'])[0])))
+        elif path == '/v1/gifs/search':
+            term = params.get('q', ['gif'])[0]
+            self._send_json(200, {'data': [
+                {'images': {'fixed_width': {'url': f'{services.url}/gifs/{urllib.parse.quote(term)}-{i}.gif'}}}
+                for i in range(3)]})
+        else:
+            self._send_json(404, {'message': 'not found'})
+
+    def do_POST(self):
+        services = self.server.services
+        path, query = self._split()
+        body = self._read_body()
+        services.record('POST', self.path)
+        if self._inject_chaos():
+            return
+
+        if path.startswith('/rest/v1/'):
+            services.postgrest.requests.append(('POST', self.path))
+            params = urllib.parse.parse_qs(query)
+            prefer = self.headers.get('Prefer', '')
+            status, result = services.postgrest.insert(
+                json.loads(body), on_conflict=params.get('on_conflict', [None])[0], prefer=prefer)
+
+            if status == 201 and 'return=minimal' in prefer:
+                self._send_json(201)
+            else:
+                self._send_json(status, result)
+        elif path == '/api/token':
+            self._send_json(200, {'access_token': 'fake-token', 'token_type': 'Bearer', 'expires_in': 3600})
+        elif path == '/api/chat.postMessage':
+            if 'json' in self.headers.get('Content-Type', ''):
+                message = json.loads(body or b'{}')
+            else:
+                message = {key: values[0] for key, values in urllib.parse.parse_qs(body.decode()).items()}
+            services.slack_messages.append(message)
+            self._send_json(200, {'ok': True, 'channel': message.get('channel'), 'ts': f'{time.time():.6f}'})
+        else:
+            self._send_json(404, {'message': 'not found'})
+
+
+class FakeServices:
+    """Run the stand-ins on a background thread (use as a context manager)"""
+
+    def __init__(self, host='127.0.0.1', port=0, chaos=None, spotify=None):
+        self.postgrest = FakePostgREST()
+        self.spotify = spotify or FakeSpotify()
+        self.chaos = chaos or Chaos()
+        self.slack_messages = []
+        self.requests = []
+        self._requests_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.services = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, method, path):
+        with self._requests_lock:
+            self.requests.append((method, path))
+
+    def env(self):
+        """Environment variables that point SpotiSpy at these stand-ins"""
+        return {
+            'SUPABASE_URL': self.url,
+            'SUPABASE_KEY': 'fake-key',
+            'SPOTIFY_CLIENT_ID': 'fake-client-id',
+            'SPOTIFY_CLIENT_SECRET': 'fake-client-secret',
+            'SPOTIPY_REDIRECT_URI': 'http://127.0.0.1/callback',
+            'SPOTIFY_ACCESS_TOKEN': 'fake-token',
+            'SPOTIFY_API_URL': f'{self.url}/v1',
+            'SPOTIFY_ACCOUNTS_URL': self.url,
+            'SLACK_BOT_TOKEN': 'xoxb-fake',
+            'SLACK_API_URL': f'{self.url}/api',
+            'GIPHY_API_URL': f'{self.url}/v1',
+            # Keep fake plays out of the real spool
+            'SPOTISPY_SPOOL_DIR': os.path.join(tempfile.gettempdir(), f'spotispy-fake-spool-{self.server.server_address[1]}'),
+        }
+
+    def seed_history(self, days):
+        """Fill the songs table with the last N days of generated plays"""
+        end = datetime.now(timezone.utc)
+        rows = self.spotify.song_rows(end - timedelta(days=days), end)
+        self.postgrest.insert(rows)
+        return len(rows)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run local stand-ins for Supabase, Spotify, Slack and Giphy')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- seconds around the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--seed-days', type=int, default=0, help='Pre-fill the songs table with N days of plays')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the catalog and faults')
+    args = parser.parse_args()
+
+    chaos = Chaos(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                  throttle_rate=args.throttle_rate, seed=args.seed)
+    services = FakeServices(args.host, args.port, chaos=chaos, spotify=FakeSpotify(seed=args.seed))
+    if args.seed_days:
+        print(f"# Seeded {services.seed_history(args.seed_days)} plays")
+
+    for key, value in services.env().items():
+        print(f"export {key}={value}")
+    print(f"# Serving on {services.url} (Ctrl-C to stop)", flush=True)
+
+    try:
+        services.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        services.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,13 @@ from spotispy.analysis import (
     calculate_daily_mood,
     analyze_listening_day,
     find_top_items,
-    find_most_popular_song
+    find_most_popular_song,
+    calculate_hourly_totals,
+    calculate_total_listening_time,
+    find_peak_listening_hour,
+    format_listening_duration,
+    DailyAccumulator,
+    summarize_day
 )
 
 
@@ -122,4 +128,65 @@ class TestAnalysisIntegration:
         
         assert most_popular is not None
         assert most_popular['song'] == 'Blinding Lights'  # Highest popularity in sample data
-        assert most_popular['song_popularity'] == 87
\ No newline at end of file
+        assert most_popular['song_popularity'] == 87
+
+
+class TestSinglePassAnalysis:
+    
+    def test_matches_multi_pass_analysis(self, sample_songs_with_audio_features, weeknd_album_binge):
+        """Single-pass results should be identical to the nested hour walks"""
+        from spotispy.database import group_songs_by_hour
+        
+        # Repeats, an hour revisited out of order and a popularity tie across hours
+        songs = (weeknd_album_binge + sample_songs_with_audio_features
+                 + [dict(weeknd_album_binge[0], played_at='2025-03-15T08:00:00')]
+                 + [{**sample_songs_with_audio_features[1], 'song_popularity': 87}])
+        
+        day_data = group_songs_by_hour(songs)
+        calculate_hourly_totals(day_data)
+        peak_hour, peak_minutes = find_peak_listening_hour(day_data['history'])
+        
+        result = analyze_listening_day(songs)
+        
+        assert result['total_time'] == calculate_total_listening_time(day_data)
+        assert result['total_time_formatted'] == format_listening_duration(songs)
+        # Same order too: the message formatter's stable sort breaks count ties by it
+        for key, item_type in (('top_songs', 'song'), ('top_artists', 'artist'), ('top_albums', 'album')):
+            assert list(result[key].items()) == list(find_top_items(day_data, item_type).items())
+        assert result['most_popular'] is find_most_popular_song(day_data['history'])
+        assert (result['peak_hour'], result['peak_minutes']) == (peak_hour, peak_minutes)
+        assert result['energy_level'] == calculate_daily_energy(songs)
+        assert result['mood_level'] == calculate_daily_mood(songs)
+        assert result['structured_data'] == day_data
+    
+    def test_incremental_adds_match_batch(self, sample_songs_with_audio_features):
+        """Adding songs one at a time should give the same result as a batch"""
+        accumulator = DailyAccumulator()
+        for song in sample_songs_with_audio_features:
+            accumulator.add(song)
+        
+        batch = DailyAccumulator().add_all(sample_songs_with_audio_features)
+        
+        assert (accumulator.result(sample_songs_with_audio_features)
+                == batch.result(sample_songs_with_audio_features))
+
+
+class TestDaySummary:
+    
+    def test_totals_and_leaders(self, sample_songs_with_audio_features):
+        """The summary should carry the totals and the most-listened song, artist and album"""
+        songs = sample_songs_with_audio_features + [dict(sample_songs_with_audio_features[1])]
+        
+        summary = summarize_day(songs)
+        
+        assert summary['total_songs'] == 4
+        assert summary['total_seconds'] == 820
+        assert summary['total_time'] == analyze_listening_day(songs)['total_time']
+        assert summary['top_song'] == 'Mad World by Gary Jules'
+        assert summary['top_artist'] == 'Gary Jules'
+        assert summary['top_album'] == 'Trading Snakeoil for Wolftickets by Gary Jules'
+    
+    def test_empty_day(self):
+        """A day without plays should have zero totals and no leaders"""
+        assert summarize_day([]) == {'total_songs': 0, 'total_seconds': 0, 'total_time': '00:00:00',
+                                     'top_song': None, 'top_artist': None, 'top_album': None}
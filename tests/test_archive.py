@@ -0,0 +1,87 @@
+import os
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from spotispy import archive
+
+
+def make_song(i, played_at, artist='Artist'):
+    return {'song': f'Song {i}', 'artist': artist, 'album': 'Album', 'duration': 200,
+            'release_date': '2020-01-01', 'played_at': played_at, 'song_popularity': 50}
+
+
+class TestArchive:
+
+    def test_partitions_by_central_date(self, tmp_path):
+        """Plays should be filed under their Central-time day"""
+        written = archive.write_songs_to_archive([
+            make_song(1, '2025-03-15T03:00:00Z'),   # Mar 14 in Central
+            make_song(2, '2025-03-15T15:00:00Z'),
+        ], root=str(tmp_path))
+
+        assert written == {'2025-03-14': 1, '2025-03-15': 1}
+        assert archive.list_partitions(str(tmp_path)) == ['2025-03-14', '2025-03-15']
+
+    def test_rewrites_merge_without_duplicates(self, tmp_path):
+        """Archiving the same play twice should keep one copy"""
+        song = make_song(1, '2025-03-15T15:00:00Z')
+        archive.write_songs_to_archive([song], root=str(tmp_path))
+        archive.write_songs_to_archive([dict(song, played_at='2025-03-15T15:00:00+00:00'),
+                                        make_song(2, '2025-03-15T16:00:00Z')], root=str(tmp_path))
+
+        rows = archive.read_archive(root=str(tmp_path))
+
+        assert [row['song'] for row in rows] == ['Song 1', 'Song 2']
+
+    def test_files_are_dictionary_encoded_and_compressed(self, tmp_path):
+        """String columns should be dictionary-encoded with zstd compression"""
+        archive.write_songs_to_archive([make_song(i, f'2025-03-15T15:{i:02d}:00Z') for i in range(5)],
+                                       root=str(tmp_path))
+
+        metadata = pq.ParquetFile(archive.partition_path('2025-03-15', str(tmp_path))).metadata
+        artist_column = metadata.row_group(0).column(1)
+        assert artist_column.compression == 'ZSTD'
+        assert any('DICTIONARY' in encoding for encoding in artist_column.encodings)
+
+    def test_reads_only_requested_dates_and_columns(self, tmp_path, monkeypatch):
+        """Partitions outside the range should never be opened"""
+        archive.write_songs_to_archive([make_song(i, f'2025-03-{10 + i}T15:00:00Z') for i in range(5)],
+                                       root=str(tmp_path))
+        opened = []
+        real_read_table = pq.read_table
+
+        def tracking_read_table(path, **kwargs):
+            opened.append(os.path.basename(os.path.dirname(path)))
+            return real_read_table(path, **kwargs)
+
+        monkeypatch.setattr(archive.pq, 'read_table', tracking_read_table)
+
+        rows = archive.read_archive('2025-03-11', '2025-03-13', columns=('artist', 'played_at'),
+                                    root=str(tmp_path))
+
+        assert opened == ['date=2025-03-11', 'date=2025-03-12']
+        assert rows == [{'artist': 'Artist', 'played_at': '2025-03-11T15:00:00+00:00'},
+                        {'artist': 'Artist', 'played_at': '2025-03-12T15:00:00+00:00'}]
+
+    def test_export_chunks_dont_overlap(self, tmp_path, monkeypatch):
+        """Month passes should read Central [start, end) bounds, so each play is exported once"""
+        from spotispy import database
+        songs = [make_song(1, '2025-02-20T05:00:00Z'),  # Feb 20 00:00 Central
+                 make_song(2, '2025-03-01T04:59:59Z'),  # Feb 28 Central, just before the month boundary
+                 make_song(3, '2025-03-01T05:00:00Z'),
+                 make_song(4, '2025-03-05T04:59:59Z'),  # Mar 4 Central
+                 make_song(5, '2025-03-05T05:00:00Z')]  # Mar 5 Central: past the exclusive end
+        requested = []
+
+        def iter_song_pages(filters, columns=None, **kwargs):
+            requested.append(filters)
+            start, end = (database.to_epoch_micros(f.split('.', 1)[1]) for f in filters)
+            yield [dict(song) for song in songs if start <= database.to_epoch_micros(song['played_at']) < end]
+
+        monkeypatch.setattr(database, 'iter_song_pages', iter_song_pages)
+
+        assert archive.archive_date_range('2025-02-20', '2025-03-05', root=str(tmp_path)) == 4
+        assert requested == [['played_at=gte.2025-02-20T05:00:00Z', 'played_at=lt.2025-03-01T05:00:00Z'],
+                             ['played_at=gte.2025-03-01T05:00:00Z', 'played_at=lt.2025-03-05T05:00:00Z']]
+        assert archive.list_partitions(str(tmp_path)) == ['2025-02-20', '2025-02-28', '2025-03-01', '2025-03-04']
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+import pytest
+import requests
+from datetime import datetime, timezone
+from spotispy import async_database, database
+
+
+class TestAsyncDatabase:
+
+    def test_fans_out_dates_concurrently(self, monkeypatch):
+        """Per-date queries should overlap instead of running back to back"""
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def slow_single_date(date_str, columns=None, compact=False):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+            return [{'played_at': f'{date_str}T10:00:00Z'}]
+
+        monkeypatch.setattr(database, 'get_songs_for_single_date', slow_single_date)
+        monkeypatch.setenv('SUPABASE_ASYNC_CONCURRENCY', '3')
+        dates = [f'2025-03-{day:02d}' for day in range(1, 8)]
+
+        songs_by_date = asyncio.run(async_database.get_songs_for_dates(dates))
+
+        assert list(songs_by_date) == dates
+        assert songs_by_date['2025-03-05'] == [{'played_at': '2025-03-05T10:00:00Z'}]
+        assert 1 < state['peak'] <= 3
+
+    def test_wraps_the_sync_implementation(self, monkeypatch):
+        """Async functions should return exactly what the sync API returns"""
+        monkeypatch.setattr(database, 'save_songs', lambda song_list, upsert=None: len(song_list) == 2)
+
+        assert asyncio.run(async_database.save_songs([{'song': 'A'}, {'song': 'B'}])) is True
+
+    def test_strict_window_errors_reach_the_caller(self, monkeypatch):
+        """strict=True should be passed through so an outage raises instead of returning []"""
+        def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+            if strict:
+                raise requests.ConnectionError("Supabase is down")
+            return []
+
+        monkeypatch.setattr(database, 'get_songs_in_window', get_songs_in_window)
+        start = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+        assert asyncio.run(async_database.get_songs_in_window(start)) == []
+        with pytest.raises(requests.RequestException):
+            asyncio.run(async_database.get_songs_in_window(start, strict=True))
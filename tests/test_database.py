@@ -0,0 +1,442 @@
+import pytest
+import requests
+import urllib.parse
+from spotispy import database
+from spotispy.database import SupabaseClient
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload=None, status_code=200):
+        self._payload = payload if payload is not None else []
+        self.status_code = status_code
+        self.text = str(self._payload)
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Shared client whose session records calls instead of hitting the network"""
+    client = SupabaseClient(base_url='https://example.supabase.co', api_key='test-key')
+    client.calls = []
+    client.responses = []
+
+    def fake_request(method, url, **kwargs):
+        client.calls.append((method, url, kwargs))
+        if client.responses:
+            return client.responses.pop(0)
+        return FakeResponse([])
+
+    monkeypatch.setattr(client.session, 'request', fake_request)
+    monkeypatch.setattr(database, '_client', client)
+    return client
+
+
+@pytest.fixture
+def paged_table(fake_client, monkeypatch):
+    """Serve rows the way PostgREST would for played_at.desc keyset queries"""
+    rows = []
+
+    def fake_request(method, url, **kwargs):
+        fake_client.calls.append((method, url, kwargs))
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        matching = sorted(rows, key=lambda r: (r['played_at'], r['id']), reverse=True)
+        for value in query.get('played_at', []):
+            op, _, ts = value.partition('.')
+            if op == 'lte':
+                matching = [r for r in matching if r['played_at'] <= ts]
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['1000'])[0])
+        return FakeResponse(matching[offset:offset + limit])
+
+    monkeypatch.setattr(fake_client.session, 'request', fake_request)
+    return rows
+
+
+class TestSupabaseClient:
+
+    def test_builds_rest_urls_from_table_paths(self):
+        """Table paths should be expanded to the REST endpoint"""
+        client = SupabaseClient(base_url='https://example.supabase.co/', api_key='k')
+
+        assert client.url('songs?select=*') == 'https://example.supabase.co/rest/v1/songs?select=*'
+        assert client.url('http://localhost:3000/rest/v1/songs') == 'http://localhost:3000/rest/v1/songs'
+
+    def test_mounts_pooled_adapter_with_retries(self):
+        """Session should use one pooled adapter with 5xx retries"""
+        client = SupabaseClient(base_url='https://example.supabase.co', api_key='k',
+                                pool_size=4, max_retries=2)
+        adapter = client.session.get_adapter('https://example.supabase.co')
+
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 2
+        assert 503 in adapter.max_retries.status_forcelist
+
+    def test_records_latency_per_method(self, fake_client):
+        """Every request should update the per-method counters"""
+        fake_client.responses = [FakeResponse([]), FakeResponse([], status_code=500)]
+
+        fake_client.get('songs')
+        fake_client.get('songs')
+        stats = fake_client.get_stats()
+
+        assert stats['GET']['requests'] == 2
+        assert stats['GET']['errors'] == 1
+        assert stats['GET']['avg_seconds'] >= 0
+
+    def test_module_functions_route_through_shared_client(self, fake_client):
+        """Database helpers should use the shared session, not bare requests"""
+        fake_client.responses = [FakeResponse([{'played_at': '2025-03-15T10:30:00Z'}])]
+
+        songs = database.get_songs_for_single_date('2025-03-15')
+
+        assert len(songs) == 1
+        method, url, kwargs = fake_client.calls[0]
+        assert method == 'GET'
+        assert url.startswith('https://example.supabase.co/rest/v1/songs?')
+        assert kwargs['timeout'] == fake_client.timeout
+
+    def test_save_failure_returns_false(self, fake_client):
+        """HTTP errors on save should still be reported as a failed save"""
+        fake_client.responses = [FakeResponse({'message': 'bad'}, status_code=400)]
+
+        assert database.save_songs([{'song': 'A'}]) is False
+
+
+class TestPagedReads:
+
+    def test_pages_through_every_row_including_ties(self, paged_table):
+        """Rows sharing a played_at across a page boundary must not be lost or repeated"""
+        for i in range(7):
+            paged_table.append({'id': f'id-{i}', 'played_at': '2025-03-15T10:00:00+00:00'})
+        for i in range(7, 12):
+            paged_table.append({'id': f'id-{i}', 'played_at': f'2025-03-15T09:{i:02d}:00+00:00'})
+
+        pages = list(database.iter_song_pages([], page_size=3))
+        ids = [row['id'] for page in pages for row in page]
+
+        assert len(ids) == 12
+        assert len(set(ids)) == 12
+        assert all(len(page) <= 3 for page in pages)
+
+    def test_max_rows_stops_early(self, paged_table, fake_client):
+        """max_rows should cap both the rows yielded and the requests made"""
+        for i in range(20):
+            paged_table.append({'id': f'id-{i}', 'played_at': f'2025-03-15T10:{i:02d}:00+00:00'})
+
+        pages = list(database.iter_song_pages([], page_size=4, max_rows=6))
+
+        assert sum(len(page) for page in pages) == 6
+        assert len(fake_client.calls) == 2
+
+    def test_date_range_collects_all_pages(self, paged_table, monkeypatch):
+        """get_songs_for_date_range should not be truncated at one page"""
+        monkeypatch.setenv('SUPABASE_PAGE_SIZE', '5')
+        for i in range(12):
+            paged_table.append({'id': f'id-{i}', 'played_at': f'2025-03-15T10:{i:02d}:00+00:00'})
+
+        songs = database.get_songs_for_date_range('2025-03-15', '2025-03-16')
+
+        assert len(songs) == 12
+        assert songs[0]['played_at'] > songs[-1]['played_at']
+
+
+class TestColumnProjection:
+
+    def test_requests_only_declared_columns(self, fake_client):
+        """Readers should send the consumer's columns as the select= projection"""
+        database.get_songs_for_single_date('2025-03-15', columns=('song', 'artist'))
+
+        method, url, kwargs = fake_client.calls[0]
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        assert query['select'] == ['song,artist,played_at']
+
+    def test_compact_rows_drop_unused_and_null_keys(self):
+        """Compact mode should keep only requested, non-null values"""
+        rows = [{'song': 'A', 'artist': 'B', 'energy': None, 'release_date': '2020-01-01'}]
+
+        compacted = database.compact_rows(rows, ('song', 'artist', 'energy'))
+
+        assert compacted == [{'song': 'A', 'artist': 'B'}]
+
+    def test_falls_back_to_all_columns_when_projection_rejected(self, fake_client):
+        """A missing optional column should not break the report"""
+        fake_client.responses = [
+            FakeResponse({'code': '42703', 'message': 'column songs.energy does not exist'}, status_code=400),
+            FakeResponse([{'song': 'A', 'played_at': '2025-03-15T10:30:00+00:00'}]),
+        ]
+
+        songs = database.get_songs_for_single_date('2025-03-15', columns=('song', 'energy'))
+
+        assert [database.strip_time_fields(song) for song in songs] == [
+            {'song': 'A', 'played_at': '2025-03-15T10:30:00+00:00'}]
+        assert 'select=*' in fake_client.calls[1][1]
+
+
+class TestWindowFetch:
+
+    @pytest.fixture(autouse=True)
+    def reset_cache(self):
+        database.clear_window_cache()
+        yield
+        database.clear_window_cache()
+
+    def test_narrower_window_is_served_from_cache(self, paged_table, fake_client):
+        """A daily fetch inside an already fetched weekly window should not query again"""
+        from datetime import datetime, timezone
+        for i in range(5):
+            paged_table.append({'id': f'id-{i}', 'played_at': f'2025-03-1{i}T12:00:00+00:00'})
+
+        week = database.get_songs_in_window(datetime(2025, 3, 10, tzinfo=timezone.utc),
+                                            columns=('song', 'artist', 'played_at'))
+        day = database.get_songs_in_window(datetime(2025, 3, 13, tzinfo=timezone.utc),
+                                           columns=('song', 'played_at'))
+
+        assert len(week) == 5
+        assert [song['id'] for song in day] == ['id-4', 'id-3']
+        assert len(fake_client.calls) == 1
+
+    def test_wider_columns_trigger_a_new_fetch(self, paged_table, fake_client):
+        """The cache can't answer requests for columns it didn't fetch"""
+        from datetime import datetime, timezone
+        start = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+        database.get_songs_in_window(start, columns=('song', 'played_at'))
+        database.get_songs_in_window(start, columns=('song', 'energy', 'played_at'))
+
+        assert len(fake_client.calls) == 2
+
+    def test_strict_fetch_raises_on_errors(self, fake_client):
+        """Callers that can't treat an outage as silence should get the error, not []"""
+        from datetime import datetime, timezone
+        start = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+        fake_client.responses = [FakeResponse({'message': 'down'}, status_code=503)]
+        assert database.get_songs_in_window(start) == []
+
+        fake_client.responses = [FakeResponse({'message': 'down'}, status_code=503)]
+        with pytest.raises(requests.RequestException):
+            database.get_songs_in_window(start, strict=True)
+
+
+class TestYoutubeMusicDuplicates:
+
+    def test_checks_all_songs_with_one_query(self, fake_client):
+        """Duplicate detection should cost one request regardless of batch size"""
+        fake_client.responses = [FakeResponse([
+            {'song': 'Body Gold', 'artist': 'Oh Wonder', 'created_at': '2025-03-15T10:00:00+00:00'},
+        ])]
+        songs = [
+            {'song': 'body gold ', 'artist': 'Oh Wonder', 'source': 'YoutubeMusic'},
+            {'song': 'Ultralife', 'artist': 'Oh Wonder', 'source': 'YoutubeMusic'},
+            {'song': 'Ultralife', 'artist': 'Oh Wonder', 'source': 'YoutubeMusic'},
+            {'song': 'Dazed', 'artist': 'Other', 'source': 'YoutubeMusic'},
+        ]
+
+        new_songs = database.check_youtube_music_duplicates(songs)
+
+        assert [song['song'] for song in new_songs] == ['Ultralife', 'Dazed']
+        assert len(fake_client.calls) == 1
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(fake_client.calls[0][1]).query)
+        assert query['source'] == ['eq.YoutubeMusic']
+        assert query['select'] == ['song,artist,created_at']
+
+    def test_returns_everything_when_check_fails(self, fake_client):
+        """If the check can't run, keep the songs rather than lose plays"""
+        fake_client.responses = [FakeResponse({'message': 'down'}, status_code=503)]
+        songs = [{'song': 'A', 'artist': 'B', 'source': 'YoutubeMusic'}]
+
+        assert database.check_youtube_music_duplicates(songs) == songs
+
+
+class TestUpsertIngestion:
+
+    @pytest.fixture
+    def stand_in(self, monkeypatch):
+        """Real HTTP round trips against the local PostgREST stand-in"""
+        from tests.fake_services import FakeServices
+        with FakeServices() as services:
+            client = SupabaseClient(base_url=services.url, api_key='test-key', max_retries=0)
+            monkeypatch.setattr(database, '_client', client)
+            yield services
+            client.close()
+
+    def test_play_key_is_deterministic(self):
+        """The same play should produce the same key regardless of timestamp format"""
+        a = {'song': 'Dazed', 'artist': 'Movements', 'played_at': '2025-03-15T10:30:00.123Z'}
+        b = {'song': 'DAZED', 'artist': 'Movements', 'played_at': '2025-03-15T10:30:00.123456+00:00'}
+
+        assert database.make_play_key(a) == database.make_play_key(b)
+        assert database.make_play_key(a) != database.make_play_key(dict(a, source='YoutubeMusic'))
+
+    def test_repeated_saves_do_not_duplicate(self, stand_in):
+        """Upsert writes should be idempotent without any pre-read"""
+        songs = [
+            {'song': 'Dazed', 'artist': 'Movements', 'played_at': '2025-03-15T10:30:00.123Z'},
+            {'song': 'Kept', 'artist': 'Movements', 'played_at': '2025-03-15T10:34:00.456Z'},
+        ]
+
+        assert database.save_songs(songs, upsert=True)
+        assert database.save_songs(songs + [
+            {'song': 'Full Circle', 'artist': 'Movements', 'played_at': '2025-03-15T10:38:00.000Z'},
+        ], upsert=True)
+
+        assert len(stand_in.postgrest.rows) == 3
+        assert all(method == 'POST' for method, _ in stand_in.postgrest.requests)
+
+    def test_plain_insert_conflicts_without_upsert(self, stand_in):
+        """Without on_conflict the unique constraint rejects a repeat, as Postgres would"""
+        song = {'song': 'Dazed', 'artist': 'Movements', 'played_at': '2025-03-15T10:30:00Z'}
+        database.save_songs([song], upsert=True)
+
+        assert database.save_songs([dict(song, play_key=database.make_play_key(song))], upsert=False) is False
+
+
+class TestBulkWriter:
+
+    @pytest.fixture
+    def rejecting_table(self, fake_client, monkeypatch):
+        """Accept every POST unless it contains a row whose song is 'poison'"""
+        import json
+        saved = []
+
+        def fake_request(method, url, **kwargs):
+            fake_client.calls.append((method, url, kwargs))
+            rows = json.loads(kwargs['data'])
+            if any(row['song'] == 'poison' for row in rows):
+                return FakeResponse({'code': '22P02', 'message': 'invalid input'}, status_code=400)
+            saved.extend(rows)
+            return FakeResponse(status_code=201)
+
+        monkeypatch.setattr(fake_client.session, 'request', fake_request)
+        monkeypatch.setattr(database.time, 'sleep', lambda seconds: None)
+        return saved
+
+    def test_splits_large_batches_into_chunks(self, rejecting_table, fake_client):
+        """Each request should carry at most chunk_size rows"""
+        songs = [{'song': f'Song {i}'} for i in range(12)]
+
+        report = database.write_songs(songs, upsert=False, chunk_size=5)
+
+        assert report['saved'] == 12
+        assert [chunk['rows'] for chunk in report['chunks']] == [5, 5, 2]
+        assert len(fake_client.calls) == 3
+
+    def test_bisects_to_isolate_poison_rows(self, rejecting_table):
+        """One bad row should not cost the good rows sharing its chunk"""
+        songs = [{'song': f'Song {i}'} for i in range(8)]
+        songs[5] = {'song': 'poison'}
+
+        report = database.write_songs(songs, upsert=False, chunk_size=8)
+
+        assert report['failed'] == [{'song': 'poison'}]
+        assert sorted(row['song'] for row in rejecting_table) == sorted(
+            song['song'] for song in songs if song['song'] != 'poison')
+        assert database.save_songs(songs, upsert=False) is False
+
+    def test_retries_throttled_chunks(self, fake_client, monkeypatch):
+        """429/503 mean nothing was written, so the chunk is retried"""
+        monkeypatch.setattr(database.time, 'sleep', lambda seconds: None)
+        fake_client.responses = [FakeResponse(status_code=429), FakeResponse(status_code=503),
+                                 FakeResponse(status_code=201)]
+
+        report = database.write_songs([{'song': 'A'}], upsert=False)
+
+        assert report['saved'] == 1
+        assert report['chunks'][0]['attempts'] == 3
+
+    def test_ambiguous_failures_only_retried_when_idempotent(self, fake_client, monkeypatch):
+        """A 502 may have written the rows, so plain inserts must not resend them"""
+        monkeypatch.setattr(database.time, 'sleep', lambda seconds: None)
+        fake_client.responses = [FakeResponse(status_code=502), FakeResponse(status_code=201)]
+
+        report = database.write_songs([{'song': 'A'}], upsert=False)
+
+        assert report['failed'] == [{'song': 'A'}]
+        assert len(fake_client.calls) == 1
+
+    @pytest.mark.parametrize('upsert', [False, True])
+    def test_reset_after_post_only_retried_when_idempotent(self, fake_client, monkeypatch, upsert):
+        """A connection dropped after the body went out may have written the rows"""
+        from urllib3.exceptions import ProtocolError
+        monkeypatch.setattr(database.time, 'sleep', lambda seconds: None)
+        reset = requests.ConnectionError(ProtocolError('Connection aborted.', ConnectionResetError(104, 'reset')))
+        responses = [reset, FakeResponse(status_code=201)]
+
+        def fake_request(method, url, **kwargs):
+            fake_client.calls.append((method, url, kwargs))
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        monkeypatch.setattr(fake_client.session, 'request', fake_request)
+        report = database.write_songs([{'song': 'A', 'artist': 'B', 'played_at': '2025-03-15T10:00:00Z'}],
+                                      upsert=upsert)
+
+        assert len(fake_client.calls) == (2 if upsert else 1)
+        assert report['saved'] == (1 if upsert else 0)
+
+    def test_failed_connection_is_retried(self):
+        """A connection that was never established sent nothing, so even inserts retry"""
+        from urllib3.exceptions import MaxRetryError, NewConnectionError
+        refused = requests.ConnectionError(MaxRetryError(None, '/rest/v1/songs',
+                                                         NewConnectionError(None, 'Connection refused')))
+
+        assert database._is_retryable(refused, None, idempotent=False)
+        assert database._is_retryable(requests.ConnectTimeout(), None, idempotent=False)
+        assert not database._is_retryable(requests.ReadTimeout(), None, idempotent=False)
+
+    def test_gzip_bodies_round_trip(self, monkeypatch):
+        """Compressed writes should land intact in the stand-in"""
+        from tests.fake_services import FakeServices
+        with FakeServices() as services:
+            client = SupabaseClient(base_url=services.url, api_key='test-key', max_retries=0)
+            monkeypatch.setattr(database, '_client', client)
+            songs = [{'song': f'Song {i}', 'artist': 'A', 'played_at': f'2025-03-15T10:{i:02d}:00Z'}
+                     for i in range(10)]
+
+            report = database.write_songs(songs, upsert=True, chunk_size=4, compress=True)
+            client.close()
+
+            assert report['saved'] == 10
+            assert len(services.postgrest.rows) == 10
+
+
+class TestTimeFields:
+
+    def test_adds_epoch_and_central_fields(self):
+        """Derived fields should match parsing played_at the slow way"""
+        songs = [{'played_at': '2025-03-16T03:30:00.123Z'}, {'played_at': '2025-03-15T14:00:00+00:00'}]
+
+        database.add_time_fields(songs)
+
+        assert songs[0]['played_ts'] == 1742095800123000
+        assert (songs[0]['local_date'], songs[0]['local_hour']) == ('2025-03-15', 22)
+        assert (songs[1]['local_date'], songs[1]['local_hour']) == ('2025-03-15', 9)
+
+    def test_derived_fields_are_not_written(self, fake_client):
+        """Supabase rejects unknown columns, so derived fields must be stripped on save"""
+        import json
+        song = database.add_time_fields([{'song': 'A', 'played_at': '2025-03-15T14:00:00Z'}])[0]
+        fake_client.responses = [FakeResponse(status_code=201)]
+
+        assert database.save_songs([song], upsert=False)
+
+        sent = json.loads(fake_client.calls[0][2]['data'])
+        assert sent == [{'song': 'A', 'played_at': '2025-03-15T14:00:00Z'}]
+
+    def test_duplicate_check_compares_instants(self, fake_client):
+        """Differently formatted timestamps for the same instant are duplicates"""
+        fake_client.responses = [FakeResponse([{'played_at': '2025-03-15T14:00:00.5+00:00'}])]
+        songs = [{'song': 'A', 'played_at': '2025-03-15T14:00:00.500Z'},
+                 {'song': 'B', 'played_at': '2025-03-15T14:05:00Z'}]
+
+        assert [song['song'] for song in database.check_for_duplicates(songs)] == ['B']
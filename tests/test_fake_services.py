@@ -0,0 +1,50 @@
+import pytest
+import requests
+from slack_sdk import WebClient
+from spotispy import database, messages, spool
+from tests.fake_services import Chaos, FakeServices
+
+
+@pytest.fixture
+def services(monkeypatch, tmp_path):
+    """Stand-ins running locally, with SpotiSpy pointed at them"""
+    with FakeServices() as services:
+        for key, value in services.env().items():
+            monkeypatch.setenv(key, value)
+        monkeypatch.setenv('SPOTISPY_SPOOL_DIR', str(tmp_path / 'spool'))
+        monkeypatch.setattr(spool, '_spool', None)
+
+        client = database.SupabaseClient(base_url=services.url, api_key='fake-key', max_retries=0)
+        monkeypatch.setattr(database, '_client', client)
+        yield services
+        client.close()
+
+
+class TestFakeServices:
+
+    def test_collector_runs_end_to_end(self, services):
+        """collect_songs should fetch, spool and save the last hour of generated plays"""
+        from collect_songs import collect_recent_songs
+
+        assert collect_recent_songs(hours_back=1)
+        first_run = len(services.postgrest.rows)
+        assert collect_recent_songs(hours_back=1)
+
+        assert first_run > 0
+        assert len(services.postgrest.rows) == first_run
+
+    def test_slack_messages_are_captured(self, services, monkeypatch):
+        """Messages should land in the stand-in instead of Slack"""
+        monkeypatch.setattr(messages, 'client', WebClient(token='xoxb-fake', base_url=f'{services.url}/api/'))
+
+        assert messages.send_slack_message('hello') is not None
+        assert services.slack_messages[0]['text'] == 'hello'
+
+    def test_throttling_sends_retry_after(self, services):
+        """Configured 429s should look like the real rate limiter"""
+        services.chaos = Chaos(throttle_rate=1.0)
+
+        response = requests.get(f'{services.url}/rest/v1/songs?select=*', timeout=5)
+
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,68 @@
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+
+pytest.importorskip('pandas')
+
+from spotispy.analysis import analyze_listening_day, get_analysis_backend
+from spotispy.weekly_analysis import calculate_daily_totals, find_weekly_top_artists, detect_album_binges
+
+
+def make_day(count, seed, start=datetime(2025, 3, 15, 5, tzinfo=timezone.utc)):
+    """Random plays over a small library so items repeat and album runs occur"""
+    rng = random.Random(seed)
+    songs = []
+    for i in range(count):
+        artist = f'Artist {rng.randrange(4)}'
+        song = {
+            'song': f'Song {rng.randrange(3)}',
+            'artist': artist,
+            'album': f'Album {rng.randrange(2)} of {artist}',
+            'duration': rng.randrange(90, 300),
+            'played_at': (start + timedelta(minutes=3 * i + rng.randrange(3))).isoformat(),
+            'song_popularity': rng.randrange(60),
+        }
+        if rng.random() < 0.8:
+            song['energy'] = rng.random()
+            song['valence'] = rng.random()
+        songs.append(song)
+    rng.shuffle(songs)
+    return songs
+
+
+class TestFrameBackend:
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_daily_analysis_matches_python_backend(self, seed):
+        """The pandas backend should return the same result, in the same order"""
+        songs = make_day(400, seed)
+
+        python_result = analyze_listening_day(songs, backend='python')
+        frame_result = analyze_listening_day(songs, backend='pandas')
+
+        for key in ('energy_level', 'mood_level'):
+            assert frame_result.pop(key) == pytest.approx(python_result.pop(key), abs=0.1)
+        for key in ('top_songs', 'top_artists', 'top_albums'):
+            assert list(frame_result[key].items()) == list(python_result[key].items())
+        assert frame_result['most_popular'] is python_result['most_popular']
+        assert frame_result == python_result
+
+    def test_weekly_metrics_match_python_backend(self):
+        """Daily totals, top artists and album binges should agree across backends"""
+        songs_by_day = {
+            '2025-03-15': make_day(120, 4),
+            '2025-03-14': [],
+            '2025-03-13': make_day(90, 5, start=datetime(2025, 3, 13, 5, tzinfo=timezone.utc)),
+        }
+
+        for function in (calculate_daily_totals, find_weekly_top_artists, detect_album_binges):
+            assert function(songs_by_day, backend='pandas') == function(songs_by_day, backend='python')
+
+    def test_backend_comes_from_environment(self, monkeypatch):
+        """SPOTISPY_ANALYSIS_BACKEND should select the backend and reject unknown names"""
+        monkeypatch.setenv('SPOTISPY_ANALYSIS_BACKEND', 'Pandas')
+        assert get_analysis_backend() == 'pandas'
+
+        monkeypatch.setenv('SPOTISPY_ANALYSIS_BACKEND', 'spark')
+        with pytest.raises(ValueError):
+            get_analysis_backend()
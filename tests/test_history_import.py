@@ -0,0 +1,123 @@
+import os
+import pandas as pd
+import pytest
+from spotispy import history_import
+from spotispy.history_import import ImportCheckpoint, import_history, parse_workbook
+
+
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, rows in sheets.items():
+            pd.DataFrame(rows).to_excel(writer, sheet_name=name, header=False, index=False)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_workbook(tmp_path / '2024-07-31.xlsx', {
+        '0000': [],
+        '0900': [
+            ['Too Slow', 'Gulfer', 'Third Wind', 127.058, '2024', '2024-07-31T13:56:09.687Z', 17],
+            ["What's My Age Again?", 'blink-182', 'Enema Of The State', 148.36, '1999-06-01',
+             '2024-07-31T13:54:18.896Z', 79],
+        ],
+        '1000': [['Only Song And Artist', 'Early Export']],
+    })
+    return tmp_path
+
+
+class TestParseWorkbook:
+
+    def test_normalizes_rows_to_save_songs_schema(self, data_dir):
+        """Rows should come back like save_songs input, oldest first"""
+        songs = parse_workbook(str(data_dir / '2024-07-31.xlsx'))
+
+        assert [song['song'] for song in songs] == ["What's My Age Again?", 'Too Slow']
+        assert songs[1] == {
+            'album': 'Third Wind', 'artist': 'Gulfer', 'duration': 127.058,
+            'played_at': '2024-07-31T13:56:09.687000+00:00', 'release_date': '2024-01-01',
+            'song': 'Too Slow', 'song_popularity': 17,
+        }
+
+    def test_skips_sheets_without_timestamps(self, data_dir):
+        """Two-column early exports have no played_at and can't be imported"""
+        songs = parse_workbook(str(data_dir / '2024-07-31.xlsx'))
+
+        assert 'Only Song And Artist' not in [song['song'] for song in songs]
+
+
+class TestImportHistory:
+
+    def test_reruns_skip_unchanged_files(self, data_dir, monkeypatch):
+        """Only new or changed workbooks should be parsed and loaded again"""
+        loaded = []
+        monkeypatch.setattr(history_import, 'load_songs', lambda songs, targets: loaded.append(len(songs)) or True)
+
+        first = import_history(str(data_dir), workers=1)
+        second = import_history(str(data_dir), workers=1)
+        write_workbook(data_dir / '2024-08-01.xlsx', {
+            '1200': [['New', 'Artist', 'Album', 200.0, '2020-01-01', '2024-08-01T17:00:00.000Z', 5]],
+        })
+        third = import_history(str(data_dir), workers=1)
+
+        assert (first['files'], second['files'], third['files']) == (1, 0, 1)
+        assert loaded == [2, 1]
+
+    def test_touched_file_with_same_content_is_skipped(self, data_dir):
+        """A new mtime alone should not force a re-import"""
+        path = str(data_dir / '2024-07-31.xlsx')
+        checkpoint = ImportCheckpoint(str(data_dir / 'checkpoint.json'))
+        checkpoint.mark_imported(path, 2)
+
+        os.utime(path, ns=(1, 1))
+
+        assert checkpoint.needs_import(path) is False
+
+    def test_failed_load_is_retried_next_run(self, data_dir, monkeypatch):
+        """A workbook that couldn't be loaded must not be checkpointed"""
+        monkeypatch.setattr(history_import, 'load_songs', lambda songs, targets: False)
+
+        summary = import_history(str(data_dir), workers=1)
+
+        assert summary['failed'] == ['2024-07-31.xlsx']
+        assert ImportCheckpoint(str(data_dir / '.import_checkpoint.json')).needs_import(
+            str(data_dir / '2024-07-31.xlsx'))
+
+    def test_dry_run_leaves_checkpoint_untouched(self, data_dir, monkeypatch):
+        """A dry run should neither load songs nor rewrite the checkpoint"""
+        loaded = []
+        monkeypatch.setattr(history_import, 'load_songs', lambda songs, targets: loaded.append(len(songs)) or True)
+        checkpoint_path = data_dir / '.import_checkpoint.json'
+        import_history(str(data_dir), workers=1)
+        os.utime(data_dir / '2024-07-31.xlsx', ns=(1, 1))
+        before = checkpoint_path.read_text()
+
+        summary = import_history(str(data_dir), workers=1, dry_run=True)
+
+        assert summary['files'] == 0
+        assert loaded == [2]
+        assert checkpoint_path.read_text() == before
+
+    def test_duplicate_check_is_batched(self, tmp_path, monkeypatch):
+        """A workbook larger than one lookup batch should be checked in several short requests"""
+        from spotispy import database
+        rows = [[f'Song {i}', 'Artist', 'Album', 200.0, '2020-01-01',
+                 f'2024-08-01T{10 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}.000Z', 5]
+                for i in range(database.DUPLICATE_CHECK_BATCH * 2 + 50)]
+        write_workbook(tmp_path / '2024-08-01.xlsx', {'1000': rows})
+        stored = {f'Song {i}' for i in range(0, len(rows), 2)}
+        batches, written = [], []
+
+        def check_for_duplicates(songs):
+            batches.append(len(songs))
+            return [song for song in songs if song['song'] not in stored]
+
+        monkeypatch.setattr(database, 'is_upsert_mode', lambda: False)
+        monkeypatch.setattr(database, 'check_for_duplicates', check_for_duplicates)
+        monkeypatch.setattr(database, 'write_songs', lambda songs, upsert=None: written.extend(songs) or
+                            {'saved': len(songs), 'failed': [], 'rejected': [], 'chunks': []})
+
+        import_history(str(tmp_path), workers=1)
+
+        assert sorted(batches) == [50, database.DUPLICATE_CHECK_BATCH, database.DUPLICATE_CHECK_BATCH]
+        assert len(written) == len(rows) - len(stored)
+        assert not stored & {song['song'] for song in written}
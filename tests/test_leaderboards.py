@@ -0,0 +1,70 @@
+import pytest
+from spotispy.analysis import analyze_listening_day
+from spotispy.leaderboards import Leaderboard, build_leaderboards, item_label, top_counts
+
+
+def play(song, artist, duration, album='Album'):
+    return {'song': song, 'artist': artist, 'album': album, 'duration': duration,
+            'played_at': '2025-03-15T15:00:00Z'}
+
+
+class TestLeaderboard:
+
+    def test_ties_on_plays_broken_by_seconds(self):
+        """Equal play counts should rank the longer-listened item first"""
+        board = Leaderboard('song').add_songs([
+            play('Short', 'A', 100), play('Short', 'A', 100),
+            play('Long', 'B', 300), play('Long', 'B', 300),
+            play('Once', 'C', 900),
+        ])
+
+        assert board.top(2) == [(('Long', 'B'), 2, 600), (('Short', 'A'), 2, 200)]
+        assert board.top(by='seconds')[0] == (('Once', 'C'), 1, 900)
+        assert board.top_labels(3, min_plays=2) == [('Long by B', 2, 600), ('Short by A', 2, 200)]
+
+    def test_full_ties_keep_first_added_order(self):
+        """Items tied on plays and seconds should rank in the order they were first added"""
+        board = Leaderboard('artist')
+        for artist in ('Zed', 'Abba', 'Moby'):
+            board.add(artist, 120)
+
+        assert [key for key, _, _ in board.top(3)] == ['Zed', 'Abba', 'Moby']
+
+    def test_merged_days_equal_one_range(self):
+        """Merging per-day boards should equal a board built over the whole range"""
+        days = [[play('S1', 'A', 100), play('S2', 'B', 200)],
+                [play('S1', 'A', 100)],
+                [play('S3', 'B', 50), play('S2', 'B', 200)]]
+
+        merged = Leaderboard.combine('song', (Leaderboard('song').add_songs(day) for day in days))
+        whole = Leaderboard('song').add_songs([song for day in days for song in day])
+
+        assert merged == whole
+        assert merged.top(1) == [(('S2', 'B'), 2, 400)]
+
+    def test_rejects_mismatched_kinds(self):
+        """Unknown kinds and cross-kind merges should raise ValueError"""
+        with pytest.raises(ValueError):
+            Leaderboard('genre')
+        with pytest.raises(ValueError):
+            Leaderboard('song').merge(Leaderboard('artist'))
+
+    def test_labels_and_top_counts(self):
+        """Tuple keys label as 'Name by Artist' and top_counts keeps dict order on ties"""
+        assert item_label(('Song', 'Artist')) == 'Song by Artist'
+        assert item_label('Artist') == 'Artist'
+        assert top_counts({'a': 2, 'b': 3, 'c': 2, 'd': 1}, 3) == [('b', 3), ('a', 2), ('c', 2)]
+
+
+class TestDailyLeaderboards:
+
+    def test_analysis_returns_leaderboards_on_request(self, sample_songs_with_audio_features):
+        """Leaderboards are opt-in and match a direct build over the day"""
+        songs = sample_songs_with_audio_features + [sample_songs_with_audio_features[0]]
+
+        assert 'leaderboards' not in analyze_listening_day(songs, lean=True)
+        result = analyze_listening_day(songs, lean=True, leaderboards=True)
+
+        assert result['leaderboards'] == build_leaderboards(songs)
+        repeated = result['leaderboards']['song'].top_labels(3, min_plays=2)
+        assert [(label, plays) for label, plays, _ in repeated] == list(result['top_songs'].items())
@@ -0,0 +1,118 @@
+import pytest
+from spotispy.analysis import calculate_daily_energy
+from spotispy.live_window import LiveWindow, record_live_plays, get_live_summary
+
+# 2025-03-15T12:00:00Z as epoch seconds
+NOON = 1742040000
+
+
+def make_song(i, minutes_before_noon, artist='Artist', energy=0.5):
+    hour, minute = divmod(12 * 60 - minutes_before_noon, 60)
+    return {'song': f'Song {i}', 'artist': artist, 'album': 'Album', 'duration': 200,
+            'played_at': f'2025-03-15T{hour:02d}:{minute:02d}:00Z', 'energy': energy, 'valence': 0.25}
+
+
+class TestLiveWindow:
+
+    def test_tracks_totals_and_leaders(self):
+        """Counts, seconds, hourly histogram and energy should match the added plays"""
+        songs = [make_song(1, 90, energy=1.0), make_song(1, 60, energy=0.0), make_song(2, 30, artist='Other')]
+        window = LiveWindow(window_seconds=3600 * 24)
+        window.add_songs(songs, now=NOON)
+
+        summary = window.summary(now=NOON)
+
+        assert summary['total_songs'] == 3
+        assert summary['total_seconds'] == 600
+        assert summary['top_songs'][0] == ('Song 1 by Artist', 2)
+        assert summary['top_artists'] == [('Artist', 2), ('Other', 1)]
+        assert summary['hourly_plays'][5] == 1 and summary['hourly_plays'][6] == 2  # Central hours
+        assert summary['energy_level'] == calculate_daily_energy(songs)
+
+    def test_evicts_plays_older_than_window(self):
+        """Plays should drop out, and their counts with them, once the window passes them"""
+        window = LiveWindow(window_seconds=3600)
+        window.add_songs([make_song(1, 50), make_song(2, 10)], now=NOON)
+
+        summary = window.summary(now=NOON + 20 * 60)
+
+        assert summary['total_songs'] == 1
+        assert summary['total_seconds'] == 200
+        assert [name for name, _ in summary['top_songs']] == ['Song 2 by Artist']
+
+    def test_ignores_repeats_and_stale_plays(self):
+        """Re-collected plays and plays already outside the window shouldn't count"""
+        window = LiveWindow(window_seconds=3600)
+
+        added = window.add_songs([make_song(1, 10), make_song(1, 10), make_song(2, 120)], now=NOON)
+
+        assert added == 1
+        assert len(window) == 1
+
+    def test_late_plays_keep_window_ordered(self):
+        """A play older than the newest one should still be evicted at the right time"""
+        window = LiveWindow(window_seconds=3600)
+        window.add(make_song(1, 10), now=NOON)
+        window.add(make_song(2, 50), now=NOON)
+
+        window.evict(now=NOON + 15 * 60)
+
+        assert [play[1] for play in window.plays] == ['Song 1']
+
+    def test_late_plays_are_inserted_in_order(self):
+        """Out-of-order batches should leave the plays sorted by time"""
+        window = LiveWindow(window_seconds=3600)
+        for i, minutes in enumerate([5, 40, 20, 55, 30, 10]):
+            window.add(make_song(i, minutes), now=NOON)
+
+        assert [play[1] for play in window.plays] == ['Song 3', 'Song 1', 'Song 4', 'Song 2', 'Song 5', 'Song 0']
+        assert window.evict(now=NOON + 26 * 60) == 2
+        assert [play[1] for play in window.plays] == ['Song 4', 'Song 2', 'Song 5', 'Song 0']
+
+    def test_snapshot_round_trip(self, tmp_path, monkeypatch):
+        """Collectors should build up the window across runs through the snapshot"""
+        monkeypatch.setenv('SPOTISPY_LIVE_WINDOW', '1')
+        monkeypatch.setenv('SPOTISPY_LIVE_WINDOW_HOURS', str(10 ** 6))  # Keep the fixed 2025 plays
+        path = str(tmp_path / 'live.json')
+
+        record_live_plays([make_song(1, 30)], path=path)
+        record_live_plays([make_song(1, 30), make_song(2, 20)], path=path)
+
+        rebuilt = LiveWindow()
+        rebuilt.add_songs([make_song(1, 30), make_song(2, 20)])
+        assert get_live_summary(path) == rebuilt.summary()
+        assert get_live_summary(path)['total_songs'] == 2
+
+    def test_disabled_by_default(self, tmp_path, monkeypatch):
+        """Without SPOTISPY_LIVE_WINDOW the collectors shouldn't write a snapshot"""
+        monkeypatch.delenv('SPOTISPY_LIVE_WINDOW', raising=False)
+        path = tmp_path / 'live.json'
+
+        assert record_live_plays([make_song(1, 30)], path=str(path)) == 0
+        assert not path.exists()
+
+    def test_snapshot_read_and_written_only_when_needed(self, tmp_path, monkeypatch):
+        """Batches in one process reuse the window, and a batch that changes nothing isn't written"""
+        from spotispy import live_window
+        monkeypatch.setenv('SPOTISPY_LIVE_WINDOW', '1')
+        monkeypatch.setenv('SPOTISPY_LIVE_WINDOW_HOURS', str(10 ** 6))
+        path = str(tmp_path / 'live.json')
+        loads, saves = [], []
+        real_load, real_save = LiveWindow.load.__func__, LiveWindow.save
+        monkeypatch.setattr(LiveWindow, 'load', classmethod(lambda cls, *args, **kwargs: loads.append(1) or
+                                                              real_load(cls, *args, **kwargs)))
+        monkeypatch.setattr(LiveWindow, 'save', lambda self, p: saves.append(1) or real_save(self, p))
+
+        record_live_plays([make_song(1, 30)], path=path)
+        record_live_plays([make_song(2, 20)], path=path)
+        record_live_plays([make_song(2, 20)], path=path)  # Already in the window
+        assert (len(loads), len(saves)) == (1, 2)
+
+        # Another collector's write is picked up before the next batch
+        other = LiveWindow.load(path)
+        other.add(make_song(3, 10))
+        other.save(path)
+        monkeypatch.setattr(live_window, '_snapshot_stamp', lambda p: ('changed', p))
+        record_live_plays([make_song(4, 5)], path=path)
+
+        assert get_live_summary(path)['total_songs'] == 4
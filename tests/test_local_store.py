@@ -0,0 +1,170 @@
+import pytest
+import requests
+from spotispy import database, local_store
+from spotispy.local_store import LocalStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalStore(str(tmp_path / 'mirror.db'))
+    yield store
+    store.close()
+
+
+def make_song(i, played_at, created_at=None):
+    return {
+        'id': f'id-{i}',
+        'song': f'Song {i}',
+        'artist': 'Artist',
+        'album': 'Album',
+        'duration': 200,
+        'played_at': played_at,
+        'created_at': created_at or played_at,
+        'energy': None,
+    }
+
+
+class TestLocalStore:
+
+    def test_uses_wal_journal(self, store):
+        """Mirror should run in WAL mode so readers don't block the collectors"""
+        mode = store.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+
+    def test_query_window_orders_newest_first(self, store):
+        """Window queries should match the Supabase readers' ordering and bounds"""
+        store.upsert_songs([
+            make_song(1, '2025-03-15T10:00:00Z'),
+            make_song(2, '2025-03-15T12:00:00+00:00'),
+            make_song(3, '2025-03-16T01:00:00Z'),
+        ])
+
+        songs = store.query_window('2025-03-15T00:00:00Z', '2025-03-16T00:00:00Z',
+                                   columns=('song', 'energy', 'played_at'), compact=True)
+
+        assert [song['song'] for song in songs] == ['Song 2', 'Song 1']
+        assert 'energy' not in songs[0]
+
+    def test_sync_resumes_from_high_water_mark(self, store, monkeypatch):
+        """Second sync should ask only for rows created since the last one"""
+        seen_filters = []
+        pages = [[make_song(1, '2025-03-15T10:00:00Z', '2025-03-15T10:05:00+00:00')]]
+
+        def fake_pages(filters, **kwargs):
+            seen_filters.append(filters)
+            yield from pages
+
+        monkeypatch.setattr(database, 'iter_song_pages', fake_pages)
+
+        assert store.sync(force=True) == 1
+        pages.clear()
+        store.sync(force=True)
+
+        assert seen_filters[0] == []
+        assert seen_filters[1] == ['created_at=gte.2025-03-15T10%3A05%3A00%2B00%3A00']
+        assert store.get_state('last_played_at') == '2025-03-15T10:00:00.000000+00:00'
+
+
+class TestReadThrough:
+
+    def test_reads_served_from_mirror_when_sync_fails(self, store, monkeypatch):
+        """A network blip should fall back to the rows already mirrored"""
+        store.upsert_songs([make_song(1, '2025-03-15T10:00:00Z')])
+
+        def failing_sync(force=False):
+            raise requests.ConnectionError("network down")
+
+        monkeypatch.setattr(store, 'sync', failing_sync)
+        monkeypatch.setattr(local_store, '_store', store)
+        monkeypatch.setenv('SPOTISPY_LOCAL_STORE', '1')
+
+        songs = database.get_songs_for_single_date('2025-03-15')
+
+        assert [song['id'] for song in songs] == ['id-1']
+
+
+class TestRollups:
+
+    def test_rollups_bucket_by_central_day_and_hour(self, store):
+        """Plays should land in Central-time days/hours with duration and energy sums"""
+        songs = [make_song(1, '2025-03-15T04:30:00Z'), make_song(2, '2025-03-15T05:10:00Z'),
+                 make_song(3, '2025-03-15T05:50:00Z')]
+        songs[2]['energy'] = 0.5
+        store.upsert_songs(songs)
+
+        assert store.daily_totals(['2025-03-15', '2025-03-14']) == {
+            '2025-03-15': {'plays': 2, 'seconds': 400.0},
+            '2025-03-14': {'plays': 1, 'seconds': 200.0},
+        }
+        hour = store.hourly_rollup('2025-03-15')[0]
+        assert (hour['hour'], hour['plays'], hour['energy_sum'], hour['energy_seconds']) == (0, 2, 100.0, 200.0)
+
+    def test_remote_row_replaces_collected_placeholder(self, store):
+        """A play recorded at collection time must not be counted again after sync"""
+        collected = {'song': 'Dazed', 'artist': 'Movements', 'duration': 180,
+                     'played_at': '2025-03-15T15:00:00.123Z'}
+        store.upsert_songs([collected])
+        store.upsert_songs([dict(collected, id='remote-1', played_at='2025-03-15T15:00:00.123+00:00')])
+
+        assert store.count() == 1
+        assert store.daily_totals(['2025-03-15'])['2025-03-15']['plays'] == 1
+
+    def test_placeholder_skipped_when_remote_row_synced_first(self, store, monkeypatch):
+        """Recording a play the mirror already has from Supabase must not add a second row"""
+        remote = {'id': 'remote-1', 'song': 'Dazed', 'artist': 'Movements', 'duration': 180,
+                  'played_at': '2025-03-15T15:00:00.123+00:00'}
+        store.upsert_songs([remote])
+        monkeypatch.setattr(local_store, 'is_local_store_enabled', lambda: True)
+        monkeypatch.setattr(local_store, 'get_local_store', lambda: store)
+
+        local_store.record_plays([dict(remote, id=None, played_at='2025-03-15T15:00:00.123Z')])
+        store.upsert_songs([{'song': 'Dazed', 'artist': 'Movements', 'duration': 180,
+                             'played_at': '2025-03-15 15:00:00.123'}])  # History import row
+
+        assert store.count() == 1
+        assert store.daily_totals(['2025-03-15'])['2025-03-15']['plays'] == 1
+
+    def test_daily_analysis_from_rollups_matches_plays(self, store, monkeypatch):
+        """The rollup-based daily report should agree with analyzing the day's plays"""
+        from spotispy.analysis import analyze_listening_day, get_rollup_day_analysis
+        songs = [make_song(i, f'2025-03-15T{14 + i // 3:02d}:{i * 7 % 60:02d}:00Z') for i in range(10)]
+        for i, song in enumerate(songs):
+            song.update(song=f'Song {i % 4}', energy=0.1 * i, valence=0.5, song_popularity=40 + i % 7,
+                        duration=150 + 10 * i)
+        store.upsert_songs(songs)
+        monkeypatch.setattr(local_store, 'get_synced_local_store', lambda: store)
+
+        rollup = get_rollup_day_analysis('2025-03-15')
+        plays = analyze_listening_day(database.add_time_fields(songs), lean=True, leaderboards=True)
+
+        for key in ('total_songs', 'total_time', 'total_time_formatted', 'peak_hour', 'peak_minutes',
+                    'energy_level', 'mood_level', 'top_songs', 'top_artists', 'top_albums', 'leaderboards'):
+            assert rollup[key] == plays[key], key
+        assert rollup['most_popular']['song'] == plays['most_popular']['song']
+        assert get_rollup_day_analysis('2025-03-16')['total_songs'] == 0
+
+    def test_top_items_across_days(self, store):
+        """Item rollups should sum across dates and order by listening time"""
+        songs = [make_song(i, f'2025-03-1{4 + i % 2}T18:{i:02d}:00Z') for i in range(4)]
+        songs[0]['artist'] = 'Other'
+        store.upsert_songs(songs)
+
+        top = store.top_items('artist', ['2025-03-14', '2025-03-15'], limit=2)
+
+        assert [(item['name'], item['plays'], item['seconds']) for item in top] == [
+            ('Artist', 3, 600.0), ('Other', 1, 200.0)]
+
+    def test_existing_mirror_is_backfilled(self, tmp_path):
+        """Opening a mirror without rollups should build them from its plays"""
+        path = str(tmp_path / 'mirror.db')
+        store = LocalStore(path)
+        store.upsert_songs([make_song(1, '2025-03-15T18:00:00Z')])
+        store.conn.execute("DELETE FROM hourly_rollup")
+        store.conn.execute("DELETE FROM sync_state")
+        store.conn.commit()
+        store.close()
+
+        reopened = LocalStore(path)
+
+        assert reopened.daily_totals(['2025-03-15'])['2025-03-15']['plays'] == 1
+        reopened.close()
@@ -0,0 +1,113 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from spotispy.messages import format_personal_record
+from spotispy.personal_records import PersonalRecords, current_streak, update_personal_records
+
+
+@pytest.fixture
+def history(make_play, serve_plays):
+    """Ten listening days (Mar 1-10), a silent Mar 11, then Mar 12-13"""
+    songs = [make_play(f'Song {day}', f'2025-03-{day:02d}T18:00:00Z', album='Singles')
+             for day in list(range(1, 11)) + [12, 13]]
+    # Mar 4: one song on repeat
+    songs.extend(make_play('Anthem', f'2025-03-04T19:{minute:02d}:00Z', album='Singles')
+                 for minute in range(0, 40, 4))
+    # Mar 12: an album run from 23:30 Central into Mar 13
+    start = datetime(2025, 3, 13, 4, 30, tzinfo=timezone.utc)
+    songs.extend(make_play(f'Track {i}', (start + timedelta(seconds=i * 300)).isoformat(), artist='Band',
+                           album='Late Show', duration=300)
+                 for i in range(8))
+    serve_plays(songs)
+
+
+class TestPersonalRecords:
+
+    def test_records_span_the_whole_history(self, history, tmp_path):
+        """Streaks and bests should reach past any seven-day window"""
+        path = str(tmp_path / 'records.json')
+
+        records = update_personal_records('2025-03-13', since='2025-03-01', path=path, workers=1)
+
+        assert records['last_date'] == '2025-03-13'
+        assert records['longest_streak'] == {'days': 10, 'start_date': '2025-03-01', 'end_date': '2025-03-10'}
+        assert records['current_streak'] == {'days': 2, 'start_date': '2025-03-12', 'end_date': '2025-03-13'}
+        assert records['top_song_day'] == {'date': '2025-03-04', 'song': 'Anthem', 'artist': 'Artist', 'plays': 10}
+        assert records['best_day']['date'] == '2025-03-04'
+        assert records['best_week']['start_date'] == '2025-03-03'
+        assert records['longest_binge']['song_count'] == 8
+        assert (records['longest_binge']['date'], records['longest_binge']['end_date']) == ('2025-03-12', '2025-03-13')
+
+    def test_days_close_incrementally_and_once(self, history, tmp_path):
+        """Catching up later should match closing the range in one go, and repeating is a no-op"""
+        path = str(tmp_path / 'records.json')
+        update_personal_records('2025-03-12', since='2025-03-01', path=path, workers=1)
+
+        records = update_personal_records('2025-03-13', path=path, workers=1)
+        assert records['longest_binge']['song_count'] == 8  # Stitched across the saved open run
+        # Only the part after midnight takes the run past the Mar 4 repeat session
+        assert records['new_records'] == ['longest_binge']
+
+        again = update_personal_records('2025-03-13', path=path, workers=1)
+        assert again['current_streak']['days'] == 2
+        assert again['new_records'] == []
+
+        fresh = update_personal_records('2025-03-13', since='2025-03-01', path=str(tmp_path / 'all.json'), workers=1)
+        fresh.pop('new_records')
+        again.pop('new_records')
+        assert again == fresh
+
+    def test_failed_fetch_stops_before_the_day(self, history, tmp_path, monkeypatch):
+        """An outage shouldn't close a day as silent; the days before it are kept and it is retried"""
+        import requests
+        from spotispy import database
+        path = str(tmp_path / 'records.json')
+        serve = database.get_songs_in_window
+
+        def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+            if start.date().isoformat() == '2025-03-06':
+                if strict:
+                    raise requests.ConnectionError("Supabase is down")
+                return []
+            return serve(start, end, columns, compact)
+        monkeypatch.setattr(database, 'get_songs_in_window', get_songs_in_window)
+
+        records = update_personal_records('2025-03-13', since='2025-03-01', path=path, workers=1)
+        assert records['last_date'] == '2025-03-05'
+        assert records['current_streak']['days'] == 5
+
+        monkeypatch.setattr(database, 'get_songs_in_window', serve)
+        records = update_personal_records('2025-03-13', path=path, workers=1)
+        assert records['longest_streak'] == {'days': 10, 'start_date': '2025-03-01', 'end_date': '2025-03-10'}
+        assert records['current_streak']['days'] == 2
+
+    def test_new_records_only_when_beating_another_holder(self, make_play):
+        """Extending the record streak shouldn't be announced again every day"""
+        from spotispy.range_analysis import ListeningAggregate
+
+        records = PersonalRecords()
+        names = []
+        for day in range(1, 4):
+            local_date = f'2025-03-{day:02d}'
+            songs = [make_play('Song', f'{local_date}T18:00:00Z')]
+            names.append(records.close_day(local_date, ListeningAggregate([local_date]).add_songs(songs)))
+
+        assert names[0] == ['longest_streak', 'best_day', 'best_week', 'top_song_day']
+        assert names[1] == names[2] == []
+        assert records.longest_streak['days'] == 3
+        assert PersonalRecords.from_dict(records.to_dict()).summary() == records.summary()
+
+    def test_streak_extends_through_open_days(self):
+        """Days after the last closed one extend the all-time streak"""
+        records = {'last_date': '2025-03-13', 'current_streak': {'days': 9}}
+
+        assert current_streak(records, {'2025-03-13': {'total_minutes': 5}, '2025-03-14': {'total_minutes': 5}}) == 10
+        assert current_streak(records, {'2025-03-14': {'total_minutes': 0}}) == 0
+        assert current_streak(records, {'2025-03-15': {'total_minutes': 5}}) == 1
+
+    def test_formats_records(self, history, tmp_path):
+        """Each record should read as one line for the reports"""
+        records = update_personal_records('2025-03-13', since='2025-03-01', path=str(tmp_path / 'r.json'), workers=1)
+
+        assert format_personal_record('longest_streak', records) == 'Longest streak: 10 days'
+        assert format_personal_record('top_song_day', records) == 'Most plays in a day: Anthem by Artist (10x)'
+        assert format_personal_record('longest_binge', records).startswith('Longest album binge: "Late Show" by Band')
@@ -0,0 +1,133 @@
+import pytest
+from spotispy import database, local_store
+from spotispy.local_store import LocalStore
+from spotispy.range_analysis import ListeningAggregate, analyze_range, partition_dates
+
+
+def inherited_state(dates):
+    """Worker-side stand-in for aggregate_partition: the parent's shared clients it can still see"""
+    return database._client, local_store._store, database._window_cache
+
+
+@pytest.fixture
+def range_songs(make_play):
+    """Plays over ten Central days, including one after UTC midnight"""
+    songs = [make_play(f'Song {i % 4}', f'2025-03-{10 + i % 10:02d}T{12 + i % 5}:00:00Z', artist=f'Artist {i % 3}',
+                       album=f'Album {i % 2}', duration=100 + i * 7, id=f'id-{i}',
+                       energy=0.5 if i % 2 else None, valence=0.25)
+             for i in range(30)]
+    songs.append(make_play('Late', '2025-03-20T03:00:00Z', artist='Artist 0', album='Album 0', duration=300,
+                           id='late', valence=0.75))
+    return songs
+
+
+class TestPartitions:
+
+    def test_week_partitions_follow_calendar_weeks(self):
+        """Weeks should run Monday to Sunday, with partial weeks at either end"""
+        partitions = partition_dates('2025-03-13', '2025-03-25', 'week')
+
+        assert [(dates[0], dates[-1]) for dates in partitions] == [
+            ('2025-03-13', '2025-03-16'), ('2025-03-17', '2025-03-23'), ('2025-03-24', '2025-03-25')]
+        assert len(partition_dates('2025-03-13', '2025-03-25', 'day')) == 13
+
+    def test_rejects_bad_ranges(self):
+        """Reversed ranges and unknown granularities should raise ValueError"""
+        with pytest.raises(ValueError):
+            partition_dates('2025-03-20', '2025-03-10')
+        with pytest.raises(ValueError):
+            partition_dates('2025-03-10', '2025-03-20', 'month')
+
+
+class TestRangeAnalysis:
+
+    def test_merge_is_associative(self, range_songs):
+        """Day partitions merged in any grouping should equal one aggregate over the range"""
+        songs = range_songs
+        dates = [dates[0] for dates in partition_dates('2025-03-09', '2025-03-20')]
+        days = [ListeningAggregate([d]).add_songs([s for s in songs if database.local_time_fields(s)[0] == d])
+                for d in dates]
+
+        whole = ListeningAggregate(dates).add_songs(songs).summary()
+        pairwise = ListeningAggregate.combine(
+            [ListeningAggregate.combine(days[:5]), ListeningAggregate.combine(days[5:])]).summary()
+
+        assert pairwise['total_seconds'] == pytest.approx(whole.pop('total_seconds'))
+        pairwise.pop('total_seconds')
+        assert pairwise == whole
+
+    def test_day_and_week_granularity_agree(self, range_songs, serve_plays):
+        """The range totals shouldn't depend on how it was partitioned"""
+        serve_plays(range_songs)
+
+        by_day = analyze_range('2025-03-09', '2025-03-20', 'day', workers=1, use_rollups=False)
+        by_week = analyze_range('2025-03-09', '2025-03-20', 'week', workers=1, use_rollups=False)
+
+        assert len(by_day['periods']) == 12
+        assert len(by_week['periods']) == 3
+        for results in (by_day, by_week):
+            del results['periods'], results['granularity']
+        assert by_day == by_week
+        assert by_day['total_songs'] == 31
+        assert by_day['daily_stats']['2025-03-19']['songs'] == 4  # The 03:00 UTC play is on Mar 19 in Central
+
+    def test_process_pool_matches_inline(self, range_songs, serve_plays):
+        """Partitions aggregated in worker processes should merge to the same result"""
+        serve_plays(range_songs)
+
+        pooled = analyze_range('2025-03-09', '2025-03-20', 'week', workers=2, use_rollups=False)
+        inline = analyze_range('2025-03-09', '2025-03-20', 'week', workers=1, use_rollups=False)
+
+        assert pooled == inline
+
+    def test_workers_drop_the_parents_clients(self, monkeypatch):
+        """Forked workers shouldn't share the parent's pooled session, SQLite handle or window cache"""
+        from spotispy import range_analysis
+        monkeypatch.setattr(database, '_client', 'parent session')
+        monkeypatch.setattr(database, '_window_cache', 'parent window')
+        monkeypatch.setattr(local_store, '_store', 'parent store')
+        monkeypatch.setattr(range_analysis, 'aggregate_partition', inherited_state)
+
+        results = list(range_analysis.iter_range_aggregates('2025-03-10', '2025-03-12', 'day', workers=2,
+                                                            use_rollups=False))
+
+        assert [state for _, state in results] == [(None, None, None)] * 3
+
+    def test_rollups_match_raw_plays(self, range_songs, serve_plays, tmp_path, monkeypatch):
+        """Aggregating from the local store's rollups should match aggregating the plays"""
+        songs = range_songs
+        store = LocalStore(str(tmp_path / 'mirror.db'))
+        store.upsert_songs(songs)
+        monkeypatch.setattr(store, 'sync', lambda force=False: 0)
+        monkeypatch.setattr(local_store, '_store', store)
+        serve_plays(songs)
+        monkeypatch.setenv('SPOTISPY_LOCAL_STORE', '1')
+
+        from_rollups = analyze_range('2025-03-09', '2025-03-20', 'week', workers=1)
+        raw = analyze_range('2025-03-09', '2025-03-20', 'week', workers=1, use_rollups=False)
+
+        assert from_rollups['total_songs'] == raw['total_songs']
+        assert from_rollups['daily_stats'] == raw['daily_stats']
+        assert from_rollups['hourly_seconds'] == raw['hourly_seconds']
+        assert (from_rollups['energy_level'], from_rollups['mood_level']) == (raw['energy_level'], raw['mood_level'])
+        for key in ('top_songs', 'top_artists', 'top_albums'):
+            assert sorted(from_rollups[key]) == sorted(raw[key])
+        store.close()
+
+    def test_failed_fetch_raises_instead_of_under_reporting(self, range_songs, serve_plays, monkeypatch):
+        """A partition whose plays can't be fetched should fail the range, not count as silence"""
+        import requests
+
+        serve = serve_plays(range_songs)
+
+        def get_songs_in_window(start, end=None, columns=None, compact=False, strict=False):
+            if start.date().isoformat() == '2025-03-17':
+                if strict:
+                    raise requests.ConnectionError("Supabase is down")
+                return []
+            return serve(start, end, columns, compact)
+
+        monkeypatch.setattr(database, 'get_songs_in_window', get_songs_in_window)
+
+        with pytest.raises(requests.RequestException):
+            analyze_range('2025-03-09', '2025-03-20', 'week', workers=1, use_rollups=False)
@@ -0,0 +1,72 @@
+import pickle
+import pytest
+from spotispy.analysis import analyze_listening_day
+from spotispy.database import add_time_fields, compact_rows
+from spotispy.records import Play, ValuePool, to_plays
+
+
+def make_row(i, energy=None):
+    return {'id': f'id-{i}', 'song': f'Song {i % 2}', 'artist': 'Artist', 'album': 'Album',
+            'duration': 200, 'played_at': f'2025-03-15T1{i}:00:00Z', 'energy': energy,
+            'song_popularity': 50 + i}
+
+
+class TestPlay:
+
+    def test_reads_like_a_compact_dict(self):
+        """Null columns should be absent, and the record should compare equal to a dict"""
+        play = Play(make_row(1))
+
+        assert 'energy' not in play
+        assert play.get('energy', 0.5) == 0.5
+        assert play['artist'] == 'Artist'
+        assert play == {key: value for key, value in make_row(1).items() if value is not None}
+        with pytest.raises(KeyError):
+            play['genre']
+
+    def test_accepts_derived_time_fields(self):
+        """add_time_fields should be able to annotate records in place"""
+        play = add_time_fields([Play(make_row(1))])[0]
+
+        assert play['local_date'] == '2025-03-15'
+        assert play['local_hour'] == 6
+
+    def test_pool_shares_repeated_strings(self):
+        """Equal artist names from different rows should become one object"""
+        rows = [make_row(i) for i in range(4)]
+        for row in rows:
+            row['artist'] = ''.join(['Art', 'ist'])  # Distinct objects, as json.loads returns
+
+        pool = ValuePool()
+        plays = to_plays(rows, pool=pool)
+
+        assert len({id(play['artist']) for play in plays}) == 1
+        assert len({id(play['duration']) for play in plays}) == 1
+
+    def test_pickles_for_process_pools(self):
+        play = Play(make_row(1))
+        assert pickle.loads(pickle.dumps(play)) == play
+
+    def test_compact_rows_returns_records(self):
+        """Readers' compact mode should hand out Plays with only the requested columns"""
+        plays = compact_rows([make_row(1, energy=0.4)], ('song', 'energy'))
+
+        assert isinstance(plays[0], Play)
+        assert dict(plays[0]) == {'song': 'Song 1', 'energy': 0.4}
+
+
+class TestLeanAnalysis:
+
+    @pytest.mark.parametrize('backend', ['python', 'pandas'])
+    def test_lean_result_omits_raw_copies(self, backend):
+        """Lean mode should give the same metrics without raw_data or structured_data"""
+        if backend == 'pandas':
+            pytest.importorskip('pandas')
+        songs = to_plays([make_row(i, energy=0.1 * i) for i in range(4)])
+
+        full = analyze_listening_day(songs, backend=backend)
+        lean = analyze_listening_day(songs, backend=backend, lean=True)
+
+        assert 'raw_data' not in lean and 'structured_data' not in lean
+        del full['raw_data'], full['structured_data']
+        assert lean == full
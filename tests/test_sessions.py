@@ -0,0 +1,72 @@
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+from spotispy.sessions import find_album_binges, find_sessions
+from spotispy.weekly_analysis import detect_album_binges, partition_songs_by_day
+
+# 23:30 Central on Mar 14
+LATE_NIGHT = datetime(2025, 3, 15, 4, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def album_run(make_play):
+    """Factory for back-to-back plays of one album"""
+    def run(album, start, count, duration=240, artist='Band'):
+        return [make_play(f'{album} {i}', (start + timedelta(seconds=i * duration)).isoformat(), artist=artist,
+                          album=album, duration=duration)
+                for i in range(count)]
+    return run
+
+
+class TestSessions:
+
+    def test_sessions_split_on_gaps_not_midnight(self, album_run):
+        """A session carries on past midnight and ends at a long silence"""
+        songs = album_run('Night', LATE_NIGHT, 10) + album_run('Morning', LATE_NIGHT + timedelta(hours=8), 2)
+
+        sessions = find_sessions(list(reversed(songs)), gap_seconds=1800)
+
+        assert [(s['date'], s['song_count']) for s in sessions] == [('2025-03-14', 10), ('2025-03-15', 2)]
+        assert sessions[0]['total_duration'] == 2400
+        assert sessions[0]['end_played_at'] == '2025-03-15T05:10:00Z'
+
+    def test_binge_across_midnight_counts_once(self, album_run):
+        """An album run from 23:30 to 00:10 is one binge on the day it started"""
+        songs = album_run('Night', LATE_NIGHT, 10)
+        songs_by_day = partition_songs_by_day(songs, ['2025-03-15', '2025-03-14'])
+
+        binges = detect_album_binges(songs_by_day, backend='python')
+
+        assert len(binges) == 1
+        assert (binges[0]['date'], binges[0]['end_date'], binges[0]['song_count']) == ('2025-03-14', '2025-03-15', 10)
+        assert binges == find_album_binges(songs)
+
+    def test_silence_ends_a_binge(self, album_run):
+        """The same album after a long break starts a new run"""
+        songs = album_run('Loop', LATE_NIGHT, 3) + album_run('Loop', LATE_NIGHT + timedelta(hours=2), 3)
+
+        assert [b['song_count'] for b in find_album_binges(songs, gap_seconds=1800)] == [3, 3]
+        assert [b['song_count'] for b in find_album_binges(songs, gap_seconds=3 * 3600)] == [6]
+
+
+class TestStitchedRanges:
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_day_partitions_stitch_binges(self, seed, album_run, serve_plays, monkeypatch):
+        """Merged day partitions should find the same binges as one pass over the range"""
+        from spotispy import range_analysis
+
+        rng = random.Random(seed)
+        songs = []
+        start = datetime(2025, 3, 10, 3, tzinfo=timezone.utc)
+        for _ in range(60):
+            songs.extend(album_run(f'Album {rng.randrange(3)}', start, rng.randrange(1, 6), artist='Band'))
+            start += timedelta(minutes=rng.choice([20, 25, 90, 600]))
+        serve_plays(songs)
+        monkeypatch.setattr(range_analysis, 'MAX_BINGES', len(songs))
+        results = range_analysis.analyze_range('2025-03-09', '2025-03-22', 'day', workers=1, use_rollups=False)
+
+        expected = find_album_binges([dict(song) for song in songs])
+        assert len(expected) > 5
+        assert sorted((b['start_ts'], b['end_ts'], b['song_count']) for b in results['album_binges']) == \
+            sorted((b['start_ts'], b['end_ts'], b['song_count']) for b in expected)
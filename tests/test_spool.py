@@ -0,0 +1,140 @@
+import json
+import os
+import pytest
+from spotispy import database
+from spotispy.spool import Spool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return Spool(str(tmp_path / 'spool'), segment_bytes=1024 * 1024)
+
+
+def make_song(i):
+    return {'song': f'Song {i}', 'artist': 'Artist', 'played_at': f'2025-03-15T10:{i:02d}:00Z'}
+
+
+def fake_writer(monkeypatch, failed=lambda rows: [], rejected=lambda rows: []):
+    """Replace write_songs with one that saves everything except the given rows"""
+    saved = []
+    monkeypatch.setattr(database, 'check_for_duplicates', lambda songs: [song for song in songs if song not in saved])
+
+    def write_songs(songs, upsert=None):
+        bad = failed(songs)
+        refused = rejected(songs)
+        good = [song for song in songs if song not in bad and song not in refused]
+        saved.extend(good)
+        return {'saved': len(good), 'failed': bad + refused, 'rejected': refused, 'chunks': []}
+
+    monkeypatch.setattr(database, 'write_songs', write_songs)
+    return saved
+
+
+class TestSpoolAppend:
+
+    def test_appends_json_lines(self, spool):
+        """Spooled songs should be readable back in order"""
+        spool.append([make_song(1), make_song(2)])
+        spool.append([make_song(3)])
+
+        assert [song['song'] for song in spool.read_segment(spool.active_path)] == ['Song 1', 'Song 2', 'Song 3']
+        assert spool.pending_count() == 3
+
+    def test_rotates_segments_by_size(self, tmp_path):
+        """The active segment should be sealed once it passes the size limit"""
+        spool = Spool(str(tmp_path / 'spool'), segment_bytes=60)
+
+        spool.append([make_song(1), make_song(2)])
+        spool.append([make_song(3)])
+
+        assert len(spool.sealed_segments()) == 2
+        assert not os.path.exists(spool.active_path)
+
+    def test_torn_final_line_is_skipped(self, spool):
+        """A crash mid-append should not poison the whole segment"""
+        spool.append([make_song(1)])
+        with open(spool.active_path, 'a') as f:
+            f.write('{"song": "Half')
+
+        assert [song['song'] for song in spool.read_segment(spool.active_path)] == ['Song 1']
+
+
+class TestSpoolDrain:
+
+    def test_successful_drain_empties_spool(self, spool, monkeypatch):
+        """Saved segments should be removed"""
+        saved = fake_writer(monkeypatch)
+        spool.append([make_song(1), make_song(2)])
+
+        report = spool.drain()
+
+        assert report == {'saved': 2, 'rejected': 0, 'pending': 0}
+        assert len(saved) == 2
+        assert spool.pending_count() == 0
+
+    def test_transient_failures_stay_spooled(self, spool, monkeypatch):
+        """Rows that couldn't be written should be kept, without the ones that were"""
+        saved = fake_writer(monkeypatch, failed=lambda rows: [row for row in rows if row['song'] == 'Song 2'])
+        spool.append([make_song(1), make_song(2), make_song(3)])
+
+        report = spool.drain()
+
+        assert report['pending'] == 1
+        assert [song['song'] for song in saved] == ['Song 1', 'Song 3']
+        assert [song['song'] for song in spool.read_segment(spool.sealed_segments()[0])] == ['Song 2']
+
+    def test_rejected_rows_are_set_aside(self, spool, monkeypatch):
+        """Rows the database refuses should not block later drains"""
+        fake_writer(monkeypatch, rejected=lambda rows: [row for row in rows if row['song'] == 'Song 1'])
+        spool.append([make_song(1), make_song(2)])
+
+        report = spool.drain()
+
+        assert report == {'saved': 1, 'rejected': 1, 'pending': 0}
+        with open(spool.rejected_path) as f:
+            assert [json.loads(line)['song'] for line in f] == ['Song 1']
+        assert spool.sealed_segments() == []
+
+    def test_resent_segment_skips_rows_already_stored(self, spool, monkeypatch):
+        """In insert mode, rows that reached the database before a crash shouldn't be sent again"""
+        saved = fake_writer(monkeypatch, failed=lambda rows: [row for row in rows if row['song'] == 'Song 2'])
+        spool.append([make_song(1), make_song(2), make_song(3)])
+        # Crash after the write went through, before the segment was trimmed
+        saved.extend(spool.read_segment(spool.active_path))
+
+        report = spool.drain(upsert=False)
+
+        assert report == {'saved': 0, 'rejected': 0, 'pending': 0}
+        assert [song['song'] for song in saved] == ['Song 1', 'Song 2', 'Song 3']
+        assert spool.pending_count() == 0
+
+    def test_drains_into_stand_in_idempotently(self, spool, monkeypatch):
+        """End to end: a spooled batch drained twice is stored once"""
+        from tests.fake_services import FakeServices
+        with FakeServices() as services:
+            client = database.SupabaseClient(base_url=services.url, api_key='test-key', max_retries=0)
+            monkeypatch.setattr(database, '_client', client)
+
+            spool.append([make_song(1), make_song(2)])
+            spool.drain(upsert=True)
+            spool.append([make_song(2)])
+            spool.drain(upsert=True)
+            client.close()
+
+            assert len(services.postgrest.rows) == 2
+
+    def test_insert_mode_drains_into_stand_in_idempotently(self, spool, monkeypatch):
+        """End to end: without play_key upserts, a re-spooled play is still stored once"""
+        from tests.fake_services import FakeServices
+        with FakeServices() as services:
+            client = database.SupabaseClient(base_url=services.url, api_key='test-key', max_retries=0)
+            monkeypatch.setattr(database, '_client', client)
+
+            spool.append([make_song(1), make_song(2)])
+            spool.drain(upsert=False)
+            spool.append([make_song(2), make_song(3)])
+            report = spool.drain(upsert=False)
+            client.close()
+
+            assert report['saved'] == 1
+            assert len(services.postgrest.rows) == 3
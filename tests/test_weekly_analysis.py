@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime, timezone
+from spotispy.weekly_analysis import get_week_window, partition_songs_by_day
+
+
+class TestWeeklyWindow:
+
+    def test_window_starts_at_central_midnight(self):
+        """Window should cover 7 Central-time calendar days including today"""
+        now = datetime(2025, 3, 16, 3, 0, tzinfo=timezone.utc)  # 22:00 on Mar 15 in Central
+
+        window_start, dates = get_week_window(7, now=now)
+
+        assert dates[0] == '2025-03-15'
+        assert dates[-1] == '2025-03-09'
+        assert window_start.isoformat() == '2025-03-09T00:00:00-05:00'
+
+    def test_partitions_by_central_day(self):
+        """Songs after UTC midnight but before Central midnight belong to the earlier day"""
+        songs = [
+            {'song': 'Late', 'played_at': '2025-03-16T03:30:00+00:00'},
+            {'song': 'Morning', 'played_at': '2025-03-15T14:00:00Z'},
+            {'song': 'Too old', 'played_at': '2025-03-01T14:00:00Z'},
+        ]
+
+        songs_by_day = partition_songs_by_day(songs, ['2025-03-15', '2025-03-14'])
+
+        assert [song['song'] for song in songs_by_day['2025-03-15']] == ['Late', 'Morning']
+        assert songs_by_day['2025-03-14'] == []
+
+
+class TestRollupStats:
+
+    def test_rollup_stats_match_raw_calculation(self, tmp_path, monkeypatch):
+        """Daily totals and top artists from rollups should equal the raw-play versions"""
+        from spotispy import local_store
+        from spotispy.local_store import LocalStore
+        from spotispy.weekly_analysis import (calculate_daily_totals, find_weekly_top_artists,
+                                              get_rollup_weekly_stats)
+
+        songs = [{'id': f'id-{i}', 'song': f'Song {i}', 'artist': f'Artist {i % 3}', 'album': 'Album',
+                  'duration': 100 + i * 10, 'played_at': f'2025-03-1{4 + i % 2}T1{i}:00:00Z'}
+                 for i in range(8)]
+        store = LocalStore(str(tmp_path / 'mirror.db'))
+        store.upsert_songs(songs)
+        monkeypatch.setattr(store, 'sync', lambda force=False: 0)
+        monkeypatch.setattr(local_store, '_store', store)
+        monkeypatch.setenv('SPOTISPY_LOCAL_STORE', '1')
+        dates = ['2025-03-15', '2025-03-14', '2025-03-13']
+
+        daily_stats, top_artists = get_rollup_weekly_stats(dates, limit=3)
+        songs_by_day = partition_songs_by_day(songs, dates)
+
+        assert daily_stats == calculate_daily_totals(songs_by_day)
+        assert top_artists == find_weekly_top_artists(songs_by_day, limit=3)
+        store.close()
+
+    def test_rollup_day_summaries_match_raw_plays(self, tmp_path, monkeypatch):
+        """Day summaries from rollups should equal the ones computed from the plays"""
+        from spotispy import local_store
+        from spotispy.analysis import summarize_day
+        from spotispy.local_store import LocalStore
+        from spotispy.weekly_analysis import summarize_days
+
+        songs = [{'id': f'id-{i}', 'song': f'Song {i % 4}', 'artist': f'Artist {i % 3}', 'album': f'Album {i % 2}',
+                  'duration': 100 + i * 10, 'played_at': f'2025-03-1{4 + i % 2}T1{i}:00:00Z'}
+                 for i in range(10)]
+        dates = ['2025-03-15', '2025-03-14', '2025-03-13']
+        songs_by_day = partition_songs_by_day(songs, dates)
+        raw = summarize_days(songs_by_day)
+
+        store = LocalStore(str(tmp_path / 'mirror.db'))
+        store.upsert_songs(songs)
+        monkeypatch.setattr(store, 'sync', lambda force=False: 0)
+        monkeypatch.setattr(local_store, '_store', store)
+        monkeypatch.setenv('SPOTISPY_LOCAL_STORE', '1')
+
+        assert summarize_days(songs_by_day) == raw
+        assert raw['2025-03-13'] == summarize_day([])
+        store.close()
@@ -0,0 +1,69 @@
+import pytest
+from datetime import date
+from spotispy import messages
+from spotispy.messages import create_listening_heatmap, format_wrapped_summary
+from spotispy.wrapped import build_wrapped, wrapped_window
+
+
+@pytest.fixture
+def report(make_play, serve_plays):
+    """Daily plays from Jan 1 to Jan 12 and a three-track album run on Feb 3"""
+    songs = [make_play(f'Song {day % 3}', f'2025-01-{day:02d}T18:00:00Z', artist=f'Artist {day % 2}',
+                       album='Singles', energy=0.6, valence=0.4)
+             for day in range(1, 13)]
+    songs.extend(make_play(f'Track {track}', f'2025-02-03T20:{track * 7:02d}:00Z', artist='Band',
+                           album='Deep Cut', duration=500)
+                 for track in range(3))
+    serve_plays(songs)
+    return build_wrapped(2025, workers=1, today=date(2025, 12, 31))
+
+
+class TestWrappedWindow:
+
+    def test_month_and_year_bounds(self):
+        """Windows should cover whole months and years, clipped to today"""
+        assert wrapped_window(2024, 2, today=date(2025, 1, 1)) == (date(2024, 2, 1), date(2024, 2, 29))
+        assert wrapped_window(2025, today=date(2025, 3, 15)) == (date(2025, 1, 1), date(2025, 3, 15))
+
+        with pytest.raises(ValueError):
+            wrapped_window(2026, today=date(2025, 3, 15))
+
+
+class TestWrappedReport:
+
+    def test_year_report_totals(self, report):
+        """The yearly report should total the year and find its streaks, binges and peaks"""
+        assert report['title'] == '2025'
+        assert report['days'] == 365
+        assert report['total_songs'] == 15
+        assert report['longest_streak'] == {'days': 12, 'start_date': '2025-01-01', 'end_date': '2025-01-12'}
+        assert report['album_binges'][0]['album'] == 'Deep Cut'
+        assert report['top_artists'][0][0] == 'Band'
+        assert report['peak_hour'] == '13:00'
+        assert report['monthly_seconds']['2025-01'] == 2400
+        assert report['weekday_seconds'][0] == 200 + 1500  # Mondays: Jan 6 and the Feb 3 binge
+        assert len(report['monthly_seconds']) == 12
+
+    def test_formats_through_character_messages(self, report, monkeypatch):
+        """The Wrapped message should include the headline sections"""
+        monkeypatch.setattr(messages, 'get_character_gif', lambda search: None)
+
+        message = format_wrapped_summary(report)
+
+        assert '2025 WRAPPED' in message
+        assert 'Longest streak: 12 days' in message
+        assert '"Deep Cut" by Band' in message
+        assert 'MONTH BY MONTH' in message
+        assert 'Mon  ' in message
+
+    def test_heatmap_shades_by_listening(self):
+        """The busiest cell should be darkest and empty hours blank"""
+        grid = [[0.0] * 24 for _ in range(7)]
+        grid[2][9] = 100.0
+        grid[4][21] = 10.0
+
+        lines = create_listening_heatmap(grid).split('\n')
+
+        assert lines[3][5 + 9] == '█'
+        assert lines[5][5 + 21] == '░'
+        assert lines[1][5:].strip() == ''
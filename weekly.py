@@ -15,7 +15,7 @@ sys.path.insert(0, project_root)
 
 from spotispy.helpers import get_logger, get_date_string
 from spotispy.database import get_songs_for_date_range
-from spotispy.analysis import analyze_listening_day
+from spotispy.weekly_analysis import summarize_days
 from spotispy.messages import send_slack_message, create_progress_bar
 
 
@@ -29,37 +29,22 @@ def analyze_weekly_data(songs_by_day):
     Returns:
         Dictionary with weekly analysis results
     """
-    logger = get_logger()
-    
-    # Calculate daily totals
+    # Calculate daily totals - just totals and leaders, not the full daily analysis
     daily_stats = {}
     total_songs = 0
     total_minutes = 0
     
-    for date, songs in songs_by_day.items():
-        if songs:
-            day_analysis = analyze_listening_day(songs)
-            
-            # Extract just the time in minutes for easier comparison
-            time_parts = day_analysis['total_time'].split(':')
-            minutes = int(time_parts[0]) * 60 + int(time_parts[1]) + int(time_parts[2]) / 60
-            
-            daily_stats[date] = {
-                'songs': len(songs),
-                'minutes': minutes,
-                'formatted_time': day_analysis['total_time'],
-                'top_artist': list(day_analysis['top_artists'].keys())[0] if day_analysis['top_artists'] else None
-            }
-            
-            total_songs += len(songs)
-            total_minutes += minutes
-        else:
-            daily_stats[date] = {
-                'songs': 0,
-                'minutes': 0,
-                'formatted_time': '0:00:00',
-                'top_artist': None
-            }
+    for date, day in summarize_days(songs_by_day).items():
+        minutes = day['total_seconds'] / 60
+        daily_stats[date] = {
+            'songs': day['total_songs'],
+            'minutes': minutes,
+            'formatted_time': day['total_time'],
+            'top_artist': day['top_artist']
+        }
+        
+        total_songs += day['total_songs']
+        total_minutes += minutes
     
     # Find peak day
     peak_day = max(daily_stats.keys(), key=lambda d: daily_stats[d]['minutes'])
@@ -152,7 +137,7 @@ def format_weekly_message(weekly_analysis):
         peak_hours = int(peak_stats['minutes'] // 60)
         peak_mins = int(peak_stats['minutes'] % 60)
         
-        numbers_section += f"\n🏆 Personal record: {peak_day_name[list(weekly_analysis['daily_stats'].keys()).index(peak_date)]} with {peak_hours}h {peak_mins}m!"
+        numbers_section += f"\n🏆 Peak day: {peak_day_name[list(weekly_analysis['daily_stats'].keys()).index(peak_date)]} with {peak_hours}h {peak_mins}m!"
     
     message_parts.append(numbers_section)
     